@@ -0,0 +1,366 @@
+#!/usr/bin/env python3
+"""Offline benchmarks for date-planner, against a local API stub.
+
+Starts lib/stub_server.py in-process, runs the fetch scripts as
+subprocesses against it (each with its own HOME, so caches start empty),
+times in-process hot paths, and writes the results as JSON for comparing
+versions. Nothing touches the real APIs, ~/.cache/datekit or this repo's
+data/ (scripts run from a temporary copy of the tree).
+
+Benchmarks:
+    events_all_cold / events_all_warm    fetch_events.py --all, empty vs primed cache
+    watchlist_cold / watchlist_warm      fetch_events.py --watchlist
+    venues_bulk                          fetch_venues.py over --venues unresolved venues
+    parse_events                         json decode + _parse_events of one large page
+    parse_events_stream                  the same page through the streaming decoder the client uses
+    cache_hit_sqlite / cache_hit_memory  cached_fetch on a fresh entry
+
+Usage:
+    python3 bench.py run --output before.json
+    python3 bench.py run --only parse_events --only cache_hit_sqlite
+    python3 bench.py run --latency 0.05 --error-rate 0.02 --throttle-rate 0.05
+    python3 bench.py compare before.json after.json
+    python3 bench.py stub --port 8765 --latency 0.1      # serve the stub for manual runs
+"""
+
+import argparse
+import json
+import os
+import platform
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import date, datetime, timedelta
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional
+
+sys.path.insert(0, str(Path(__file__).parent))
+from lib import cache
+from lib.stub_server import NOT_FOUND_PREFIX, StubConfig, StubServer, make_events_page
+from lib.http import STREAM_CHUNK
+from lib.ticketmaster import _parse_event_stream, _parse_events
+
+SCRIPTS_DIR = Path(__file__).parent
+BENCHMARKS = [
+    "events_all_cold", "events_all_warm", "watchlist_cold", "watchlist_warm",
+    "venues_bulk", "parse_events", "parse_events_stream", "cache_hit_sqlite", "cache_hit_memory",
+]
+SCRIPT_TIMEOUT = 300  # Seconds before a benchmarked script run is killed
+
+
+def summarize(runs: List[float], unit: str = "s", **extra) -> Dict[str, Any]:
+    """Summary stats for one benchmark. `median` is the number compare() uses."""
+    return {
+        "unit": unit,
+        "runs": [round(r, 6) for r in runs],
+        "median": round(statistics.median(runs), 6),
+        "mean": round(statistics.fmean(runs), 6),
+        "min": round(min(runs), 6),
+        "max": round(max(runs), 6),
+        **extra,
+    }
+
+
+class Workspace:
+    """A temporary copy of the scripts with synthetic data/, plus per-run HOME dirs."""
+
+    def __init__(self, root: Path, stub: StubServer, args):
+        self.root = root
+        self.stub = stub
+        self.args = args
+        self.repo = root / "repo"
+        shutil.copytree(SCRIPTS_DIR, self.repo / "scripts",
+                        ignore=shutil.ignore_patterns("__pycache__", "*.pyc"))
+        self.data = self.repo / "data"
+        self.data.mkdir()
+        self._homes = 0
+
+    def write_data(self, venue_count: int, with_ids: bool = True):
+        """Write venues.json, watchlist.json and preferences.json for a benchmark."""
+        venues = []
+        for i in range(venue_count):
+            # Every tenth venue isn't on Ticketmaster, as in real lists
+            name = f"{NOT_FOUND_PREFIX} Bar {i}" if i % 10 == 9 else f"Stub Venue {i}"
+            venue = {"slug": f"venue-{i}", "name": name, "neighborhood": f"Hood {i % 8}",
+                     "ticketing_platform": "ticketmaster"}
+            if with_ids:
+                venue["ticketmaster_venue_id"] = f"KVbench{i}"
+            venues.append(venue)
+        (self.data / "venues.json").write_text(json.dumps(venues, indent=2))
+        watchlist = {
+            "watched_venues": [{"slug": f"venue-{i}"} for i in range(min(self.args.watch_venues, venue_count))],
+            "watched_artists": [{"name": f"Artist {i}"} for i in range(self.args.watch_artists)],
+        }
+        (self.data / "watchlist.json").write_text(json.dumps(watchlist, indent=2))
+        (self.data / "preferences.json").write_text(json.dumps({"city": "Chicago"}))
+        (self.data / ".venues.journal").unlink(missing_ok=True)
+        (self.data / "watch-state.json").unlink(missing_ok=True)
+
+    def new_home(self) -> Path:
+        self._homes += 1
+        home = self.root / f"home-{self._homes}"
+        home.mkdir()
+        return home
+
+    def run(self, script: str, argv: List[str], home: Path) -> float:
+        """Run a script; returns wall seconds. Raises RuntimeError if it fails."""
+        env = dict(os.environ)
+        env.update(self.stub.client_env())
+        env.update({
+            "HOME": str(home),
+            "TICKETMASTER_API_KEY": "bench",
+            "GOOGLE_PLACES_API_KEY": "bench",
+            "DATEKIT_DAEMON": "0",
+            "no_proxy": ",".join(filter(None, [env.get("no_proxy"), "127.0.0.1"])),
+        })
+        started = time.perf_counter()
+        proc = subprocess.run(
+            [sys.executable, str(self.repo / "scripts" / script)] + argv,
+            env=env, capture_output=True, text=True, timeout=SCRIPT_TIMEOUT,
+        )
+        elapsed = time.perf_counter() - started
+        if proc.returncode != 0:
+            raise RuntimeError(f"{script} {' '.join(argv)} exited {proc.returncode}: {proc.stderr.strip()[-500:]}")
+        return elapsed
+
+
+def bench_script(ws: Workspace, script: str, argv: List[str], repeat: int, warm: bool) -> Dict[str, Any]:
+    """Time a script run: cold = fresh HOME each time, warm = one HOME primed by an untimed run."""
+    runs = []
+    home = ws.new_home()
+    if warm:
+        ws.run(script, argv, home)
+    for _ in range(repeat):
+        if not warm:
+            home = ws.new_home()
+        runs.append(ws.run(script, argv, home))
+    return summarize(runs)
+
+
+def bench_venues_bulk(ws: Workspace, repeat: int) -> Dict[str, Any]:
+    runs = []
+    for _ in range(repeat):
+        ws.write_data(ws.args.venues, with_ids=False)
+        runs.append(ws.run("fetch_venues.py", ["--workers", str(ws.args.workers)], ws.new_home()))
+    ws.write_data(ws.args.venues)
+    return summarize(runs, venues=ws.args.venues)
+
+
+def bench_parse_events(page_size: int, repeat: int, stream: bool = False) -> Dict[str, Any]:
+    """Decode and parse one events.json page: whole (json.loads + _parse_events) or streamed.
+
+    Also reports peak_kb, the memory the parse needed (one extra untimed run).
+    """
+    start = date.today()
+    page = make_events_page("bench", 0, page_size, page_size, start, start + timedelta(days=30))
+    body = json.dumps(page).encode()
+
+    def parse() -> list:
+        if stream:
+            chunks = (body[i:i + STREAM_CHUNK] for i in range(0, len(body), STREAM_CHUNK))
+            return _parse_event_stream(chunks)[1]
+        return _parse_events(json.loads(body.decode("utf-8")))
+
+    runs = []
+    for _ in range(max(repeat, 5)):
+        started = time.perf_counter()
+        events = parse()
+        runs.append(time.perf_counter() - started)
+    assert len(events) == page_size
+    tracemalloc.start()
+    parse()
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    result = summarize(runs, events=page_size, page_bytes=len(body), peak_kb=round(peak / 1024, 1))
+    result["events_per_second"] = round(page_size / result["median"])
+    return result
+
+
+def bench_cache_hit(root: Path, memory: bool, iterations: int = 2000) -> Dict[str, Any]:
+    """Latency of cached_fetch when the entry is fresh (no fetch, no lock)."""
+    backend = cache.SQLiteBackend(root / f"cache-{'memory' if memory else 'sqlite'}.db")
+    if memory:
+        backend = cache.MemoryTier(backend)
+    start = date.today()
+    page = make_events_page("bench", 0, 50, 50, start, start + timedelta(days=7))
+    entry = {"events": _parse_events(page), "total": 50, "total_pages": 1}
+    key = cache.get_cache_key("tm-page-bench", "50", "0", "ticketmaster")
+
+    def fetch():
+        raise AssertionError("cache miss during cache_hit benchmark")
+
+    cache.set_backend(backend)
+    try:
+        backend.set(key, entry, ttl_hours=48)
+        runs = []
+        for _ in range(iterations):
+            started = time.perf_counter()
+            cache.cached_fetch(key, fetch)
+            runs.append(time.perf_counter() - started)
+    finally:
+        cache.set_backend(None)
+    runs.sort()
+    return summarize(runs, iterations=iterations, p95=round(runs[int(len(runs) * 0.95)], 6))
+
+
+def git_revision() -> Optional[str]:
+    try:
+        proc = subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=SCRIPTS_DIR,
+                              capture_output=True, text=True, timeout=10)
+    except (OSError, subprocess.SubprocessError):
+        return None
+    return proc.stdout.strip() or None
+
+
+def stub_config(args) -> StubConfig:
+    return StubConfig(
+        latency=args.latency,
+        jitter=args.jitter,
+        error_rate=args.error_rate,
+        throttle_rate=args.throttle_rate,
+        retry_after=args.retry_after,
+        events_per_query=args.events_per_query,
+        recorded_dir=args.recorded,
+    )
+
+
+def cmd_run(args) -> dict:
+    selected = args.only or BENCHMARKS
+    config = stub_config(args)
+    stub = StubServer(config).start()
+    root = Path(tempfile.mkdtemp(prefix="datekit-bench-"))
+    results: Dict[str, Any] = {}
+    try:
+        ws = Workspace(root, stub, args)
+        ws.write_data(args.venues)
+        days = ["--days", str(args.days)]
+        runners: Dict[str, Callable[[], Dict[str, Any]]] = {
+            "events_all_cold": lambda: bench_script(ws, "fetch_events.py", ["--all"] + days, args.repeat, warm=False),
+            "events_all_warm": lambda: bench_script(ws, "fetch_events.py", ["--all"] + days, args.repeat, warm=True),
+            "watchlist_cold": lambda: bench_script(ws, "fetch_events.py", ["--watchlist"] + days, args.repeat,
+                                                   warm=False),
+            "watchlist_warm": lambda: bench_script(ws, "fetch_events.py", ["--watchlist"] + days, args.repeat,
+                                                   warm=True),
+            "venues_bulk": lambda: bench_venues_bulk(ws, args.repeat),
+            "parse_events": lambda: bench_parse_events(args.page_size, args.repeat * 10),
+            "parse_events_stream": lambda: bench_parse_events(args.page_size, args.repeat * 10, stream=True),
+            "cache_hit_sqlite": lambda: bench_cache_hit(root, memory=False),
+            "cache_hit_memory": lambda: bench_cache_hit(root, memory=True),
+        }
+        for name in selected:
+            print(f"  {name}...", file=sys.stderr)
+            try:
+                results[name] = runners[name]()
+            except (RuntimeError, subprocess.TimeoutExpired) as e:
+                results[name] = {"error": str(e)}
+    finally:
+        stub.close()
+        if args.keep:
+            print(f"Workspace kept at {root}", file=sys.stderr)
+        else:
+            shutil.rmtree(root, ignore_errors=True)
+
+    return {
+        "schema": 1,
+        "revision": git_revision(),
+        "timestamp": datetime.now().isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "config": {**config._asdict(), "repeat": args.repeat, "days": args.days, "venues": args.venues,
+                   "watch_venues": args.watch_venues, "watch_artists": args.watch_artists,
+                   "page_size": args.page_size, "workers": args.workers},
+        "stub_requests": dict(stub.counts),
+        "benchmarks": results,
+    }
+
+
+def compare(before: Dict[str, Any], after: Dict[str, Any]) -> Dict[str, Any]:
+    """Median change per benchmark present in both results (negative = faster)."""
+    changes = {}
+    for name, old in before.get("benchmarks", {}).items():
+        new = after.get("benchmarks", {}).get(name)
+        if not new or "median" not in old or "median" not in new:
+            continue
+        changes[name] = {
+            "before": old["median"],
+            "after": new["median"],
+            "change_pct": round((new["median"] - old["median"]) / old["median"] * 100, 1) if old["median"] else None,
+        }
+    return {
+        "before": before.get("revision"),
+        "after": after.get("revision"),
+        "benchmarks": changes,
+    }
+
+
+def cmd_stub(args):
+    stub = StubServer(stub_config(args), port=args.port).start()
+    print(json.dumps(stub.client_env(), indent=2))
+    print("Serving; Ctrl-C to stop.", file=sys.stderr)
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        stub.close()
+
+
+def add_stub_options(parser: argparse.ArgumentParser):
+    parser.add_argument("--latency", type=float, default=0.02, help="Seconds per stub request (default: 0.02)")
+    parser.add_argument("--jitter", type=float, default=0.0, help="Extra random latency, up to this many seconds")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Fraction of requests answered with 500")
+    parser.add_argument("--throttle-rate", type=float, default=0.0, help="Fraction answered with 429")
+    parser.add_argument("--retry-after", type=float, default=1.0, help="Retry-After seconds on 429s")
+    parser.add_argument("--events-per-query", type=int, default=200, help="Events each search matches")
+    parser.add_argument("--recorded", help="Directory of recorded events.json/venues.json/places.json to serve")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Offline benchmarks against a local API stub")
+    sub = parser.add_subparsers(dest="command")
+
+    run_parser = sub.add_parser("run", help="Run benchmarks and print JSON results")
+    run_parser.add_argument("--only", action="append", choices=BENCHMARKS, help="Benchmark to run (repeatable)")
+    run_parser.add_argument("--repeat", type=int, default=3, help="Timed runs per benchmark (default: 3)")
+    run_parser.add_argument("--days", type=int, default=7, help="--days for fetch_events.py runs")
+    run_parser.add_argument("--venues", type=int, default=100, help="Venues in the synthetic venues.json")
+    run_parser.add_argument("--watch-venues", type=int, default=12, help="Watched venues")
+    run_parser.add_argument("--watch-artists", type=int, default=4, help="Watched artists")
+    run_parser.add_argument("--workers", type=int, default=4, help="fetch_venues.py --workers")
+    run_parser.add_argument("--page-size", type=int, default=200, help="Events per page for parse_events")
+    run_parser.add_argument("--output", help="Also write the results to this file")
+    run_parser.add_argument("--keep", action="store_true", help="Keep the temporary workspace")
+    add_stub_options(run_parser)
+
+    compare_parser = sub.add_parser("compare", help="Compare two result files")
+    compare_parser.add_argument("before")
+    compare_parser.add_argument("after")
+
+    stub_parser = sub.add_parser("stub", help="Serve the API stub in the foreground")
+    stub_parser.add_argument("--port", type=int, default=8765)
+    add_stub_options(stub_parser)
+
+    args = parser.parse_args()
+
+    if args.command == "run":
+        result = cmd_run(args)
+        if args.output:
+            Path(args.output).write_text(json.dumps(result, indent=2) + "\n")
+    elif args.command == "compare":
+        with open(args.before) as f, open(args.after) as g:
+            result = compare(json.load(f), json.load(g))
+    elif args.command == "stub":
+        cmd_stub(args)
+        return
+    else:
+        parser.print_help()
+        return
+
+    print(json.dumps(result, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,110 @@
+#!/usr/bin/env python3
+"""Maintenance commands for date-planner.
+
+Usage:
+    python3 datekit.py cache stats
+    python3 datekit.py cache gc
+    python3 datekit.py cache gc --max-mb 20
+    python3 datekit.py cache clear --provider tm
+    python3 datekit.py breaker status
+    python3 datekit.py breaker reset
+    python3 datekit.py serve                 # warm daemon for fetch_*.py (foreground)
+    python3 datekit.py serve --status
+    python3 datekit.py serve --stop
+"""
+
+import argparse
+import json
+import sys
+from datetime import date
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent))
+from lib import breaker, cache, daemon, event_store
+
+
+def cmd_cache(args) -> dict:
+    """Run a cache subcommand and return its JSON result."""
+    if args.cache_command == "stats":
+        return cache.cache_stats()
+    if args.cache_command == "gc":
+        max_bytes = int(args.max_mb * 1024 * 1024) if args.max_mb is not None else None
+        result = cache.gc_cache(max_bytes)
+        result["past_events"] = event_store.prune(date.today().isoformat())
+        return result
+    prefix = f"{args.provider}-" if args.provider else ""
+    result = {"removed": cache.clear_cache(prefix)}
+    # A running daemon would otherwise keep serving its in-memory copies
+    daemon.call("forget", prefix=prefix)
+    return result
+
+
+def cmd_breaker(args) -> dict:
+    """Run a circuit breaker subcommand and return its JSON result."""
+    if args.breaker_command == "status":
+        return {"hosts": breaker.status()}
+    return {"reset": breaker.reset(args.host)}
+
+
+def cmd_serve(args) -> dict:
+    """Query or stop the daemon, or run it in the foreground (returns None when it exits)."""
+    if args.status:
+        return daemon.call("ping") or {"running": False}
+    if args.stop:
+        return daemon.call("stop") or {"running": False}
+    code = daemon.serve(idle_minutes=args.idle_minutes)
+    if code:
+        sys.exit(code)
+    return None
+
+
+def main():
+    parser = argparse.ArgumentParser(description="date-planner maintenance")
+    sub = parser.add_subparsers(dest="command")
+
+    cache_parser = sub.add_parser("cache", help="Inspect or clean the API response cache")
+    cache_sub = cache_parser.add_subparsers(dest="cache_command")
+    cache_sub.add_parser("stats", help="Show entries and size per provider")
+    gc_parser = cache_sub.add_parser("gc", help="Drop expired entries and past events, evict to the size cap")
+    gc_parser.add_argument("--max-mb", type=float, help="Size cap in MB (default: DATEKIT_CACHE_MAX_MB or 50)")
+    clear_parser = cache_sub.add_parser("clear", help="Remove cache entries")
+    clear_parser.add_argument("--provider", help="Only clear one provider's entries (e.g. tm, gp)")
+
+    breaker_parser = sub.add_parser("breaker", help="Inspect or reset per-host circuit breakers")
+    breaker_sub = breaker_parser.add_subparsers(dest="breaker_command")
+    breaker_sub.add_parser("status", help="Show each host's breaker state")
+    reset_parser = breaker_sub.add_parser("reset", help="Close breakers so requests go out again")
+    reset_parser.add_argument("--host", help="Only reset this host (e.g. app.ticketmaster.com)")
+
+    serve_parser = sub.add_parser("serve", help="Run a warm daemon that fetch_events/classes/venues.py hand their runs to")
+    serve_parser.add_argument("--idle-minutes", type=float, default=daemon.DEFAULT_IDLE_MINUTES,
+                              help=f"Exit after this long without requests; 0 = never "
+                                   f"(default: {daemon.DEFAULT_IDLE_MINUTES})")
+    serve_parser.add_argument("--status", action="store_true", help="Show whether a daemon is running")
+    serve_parser.add_argument("--stop", action="store_true", help="Stop the running daemon")
+
+    args = parser.parse_args()
+
+    if args.command == "cache" and args.cache_command:
+        result = cmd_cache(args)
+    elif args.command == "cache":
+        cache_parser.print_help()
+        return
+    elif args.command == "breaker" and args.breaker_command:
+        result = cmd_breaker(args)
+    elif args.command == "breaker":
+        breaker_parser.print_help()
+        return
+    elif args.command == "serve":
+        result = cmd_serve(args)
+        if result is None:
+            return
+    else:
+        parser.print_help()
+        return
+
+    print(json.dumps(result, indent=2))
+
+
+if __name__ == "__main__":
+    main()
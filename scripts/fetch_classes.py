@@ -16,6 +16,11 @@ import sys
 from pathlib import Path
 
 sys.path.insert(0, str(Path(__file__).parent))
+if __name__ == "__main__":
+    # Hand the run to a warm `datekit.py serve` daemon if one is listening
+    from lib.daemon import exit_if_served
+    exit_if_served(__file__)
+from lib import profiling
 from lib.env import get_city
 from lib.scrapers import class_search_queries
 
@@ -28,8 +33,8 @@ PLATFORMS = [
 ]
 
 
-def main():
-    parser = argparse.ArgumentParser(description="Find classes and experiences")
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog=Path(__file__).name, description="Find classes and experiences")
     parser.add_argument("--category", choices=[
         "martial-arts", "cooking", "pottery", "art", "general"
     ], help="Class category")
@@ -37,45 +42,50 @@ def main():
     parser.add_argument("--city", help="City to search in (default: from preferences.json)")
     parser.add_argument("--format", choices=["json", "compact"], default="json",
                         help="Output format")
-
-    args = parser.parse_args()
-
-    # Resolve city: CLI arg > preferences.json
-    city = args.city or get_city() or ""
-
-    if not city:
-        print("Warning: No city specified. Use --city or set city in data/preferences.json", file=sys.stderr)
-
-    if args.query:
-        if city:
-            queries = [f"{args.query} {city}"]
+    parser.add_argument("--profile", choices=["cpu", "mem"],
+                        help="Profile the run (cProfile or tracemalloc; also DATEKIT_PROFILE)")
+    parser.add_argument("--profile-dir",
+                        help="Where profiles go (default: DATEKIT_PROFILE_DIR or ~/.cache/datekit/profiles)")
+
+    args = parser.parse_args(argv)
+
+    with profiling.profiled(args.profile, __file__, args.profile_dir):
+        # Resolve city: CLI arg > preferences.json
+        city = args.city or get_city() or ""
+
+        if not city:
+            print("Warning: No city specified. Use --city or set city in data/preferences.json", file=sys.stderr)
+
+        if args.query:
+            if city:
+                queries = [f"{args.query} {city}"]
+            else:
+                queries = [args.query]
+            category = "custom"
+        elif args.category:
+            queries = class_search_queries(args.category, city)
+            category = args.category
+        else:
+            parser.print_help()
+            print("\n\nAvailable categories:")
+            print("  martial-arts  BJJ, taekwondo, kickboxing intro classes")
+            print("  cooking       Thai, Italian, sushi, pasta making")
+            print("  pottery       Ceramics, wheel throwing")
+            print("  art           Paint & sip, stained glass, drawing")
+            print("  general       Browse all class types")
+            return
+
+        output = {
+            "category": category,
+            "city": city,
+            "search_queries": queries,
+            "platforms": PLATFORMS,
+        }
+
+        if args.format == "json":
+            print(json.dumps(output, indent=2))
         else:
-            queries = [args.query]
-        category = "custom"
-    elif args.category:
-        queries = class_search_queries(args.category, city)
-        category = args.category
-    else:
-        parser.print_help()
-        print("\n\nAvailable categories:")
-        print("  martial-arts  BJJ, taekwondo, kickboxing intro classes")
-        print("  cooking       Thai, Italian, sushi, pasta making")
-        print("  pottery       Ceramics, wheel throwing")
-        print("  art           Paint & sip, stained glass, drawing")
-        print("  general       Browse all class types")
-        return
-
-    output = {
-        "category": category,
-        "city": city,
-        "search_queries": queries,
-        "platforms": PLATFORMS,
-    }
-
-    if args.format == "json":
-        print(json.dumps(output, indent=2))
-    else:
-        print(json.dumps(output, separators=(',', ':')))
+            print(json.dumps(output, separators=(',', ':')))
 
 
 if __name__ == "__main__":
@@ -7,6 +7,12 @@ Usage:
     python3 fetch_events.py --venue hollywood-bowl
     python3 fetch_events.py --artist "Radiohead" --city "Los Angeles"
     python3 fetch_events.py --all --days 7
+    python3 fetch_events.py --all --days 7 --timeout 10
+    python3 fetch_events.py --watchlist --days 30
+    python3 fetch_events.py --watchlist --changes --days 30
+    python3 fetch_events.py --category music --days 30 --limit 200
+    python3 fetch_events.py --category music --days 30 --stream
+    python3 fetch_events.py --category comedy --days 7 --offline --max-age 24
 """
 
 import argparse
@@ -14,14 +20,37 @@ import json
 import sys
 from datetime import datetime, timedelta
 from pathlib import Path
+from typing import Iterable, Optional
 
 # Add lib to path
 sys.path.insert(0, str(Path(__file__).parent))
+if __name__ == "__main__":
+    # Hand the run to a warm `datekit.py serve` daemon if one is listening
+    from lib.daemon import exit_if_served
+    exit_if_served(__file__)
+from lib import cache, event_store, profiling, trace, venue_index, watch_state
 from lib.env import get_city
-from lib.ticketmaster import search_events, get_venue_events, search_artist
+from lib.pool import fan_out
+from lib.http import HTTPError
+from lib.ticketmaster import (
+    collect_events, get_venue_events, iter_events, search_artist, search_events,
+)
 
 REPO_ROOT = Path(__file__).parent.parent
 VENUES_FILE = REPO_ROOT / "data" / "venues.json"
+WATCHLIST_FILE = REPO_ROOT / "data" / "watchlist.json"
+WATCH_STATE_FILE = REPO_ROOT / "data" / "watch-state.json"
+
+ALL_CATEGORIES = ["music", "comedy", "theatre"]
+CLASSIFICATION_MAP = {
+    "music": "Music",
+    "comedy": "Comedy",
+    "theatre": "Theatre",
+    "theater": "Theatre",
+}
+DEFAULT_TIMEOUT = 20  # Seconds per category/watch entry
+WATCHLIST_WORKERS = 4
+WATCH_DIFF_LIMIT = 200  # Events per watch entry when diffing (one full page)
 
 
 def load_venues() -> list:
@@ -34,78 +63,352 @@ def load_venues() -> list:
     return data.get("venues", [])
 
 
-def fetch_by_category(category: str, days: int = 14, city: str = "", state_code: str = "") -> dict:
-    """Fetch events for a category (music, comedy, theatre)."""
+def load_watchlist() -> dict:
+    """Load watchlist. Returns {"watched_venues": [...], "watched_artists": [...]}."""
+    if not WATCHLIST_FILE.exists():
+        return {"watched_venues": [], "watched_artists": []}
+    with open(WATCHLIST_FILE) as f:
+        data = json.load(f)
+    return {
+        "watched_venues": data.get("watched_venues", []),
+        "watched_artists": data.get("watched_artists", []),
+    }
+
+
+def date_window(days: int) -> tuple:
+    """Return (start, end) YYYY-MM-DD strings from today through days ahead."""
     start = datetime.now().strftime("%Y-%m-%d")
     end = (datetime.now() + timedelta(days=days)).strftime("%Y-%m-%d")
+    return start, end
 
-    classification_map = {
-        "music": "Music",
-        "comedy": "Comedy",
-        "theatre": "Theatre",
-        "theater": "Theatre",
-    }
 
-    classification = classification_map.get(category.lower())
+def category_filters(category: str, days: int = 14, city: str = "", state_code: str = "") -> Optional[dict]:
+    """Build Ticketmaster search filters for a category, or None if unknown."""
+    classification = CLASSIFICATION_MAP.get(category.lower())
     if not classification:
+        return None
+    start, end = date_window(days)
+    return {
+        "classification_name": classification,
+        "start_date": start,
+        "end_date": end,
+        "city": city,
+        "state_code": state_code,
+    }
+
+
+def fetch_by_category(category: str, days: int = 14, city: str = "", state_code: str = "",
+                      limit: Optional[int] = None) -> dict:
+    """Fetch events for a category (music, comedy, theatre).
+
+    With limit, walks result pages until limit events are collected;
+    otherwise returns the first page.
+    """
+    filters = category_filters(category, days, city=city, state_code=state_code)
+    if not filters:
         return {"error": f"Unknown category: {category}. Use: music, comedy, theatre", "events": []}
 
-    return search_events(
-        classification_name=classification,
-        start_date=start,
-        end_date=end,
-        city=city,
-        state_code=state_code,
-        size=20,
+    if limit:
+        return collect_events(limit, **filters)
+    return search_events(size=20, **filters)
+
+
+def fetch_all_categories(days: int = 14, city: str = "", state_code: str = "",
+                         timeout: float = DEFAULT_TIMEOUT, limit: Optional[int] = None) -> dict:
+    """Fetch every category concurrently, keyed by category name.
+
+    Requests still go through lib.http's per-host rate limit, so the
+    parallel categories share Ticketmaster's 5 req/s budget. A category
+    that takes longer than timeout seconds gets an error entry instead of
+    holding up the others.
+    """
+    tasks = {
+        category: (lambda c=category: fetch_by_category(c, days, city=city, state_code=state_code,
+                                                         limit=limit))
+        for category in ALL_CATEGORIES
+    }
+    return fan_out(
+        tasks,
+        max_workers=len(tasks),
+        timeout=timeout,
+        on_error=lambda msg: {"error": msg, "events": []},
     )
 
 
-def fetch_by_venue(venue_slug: str, days: int = 30) -> dict:
-    """Fetch events for a specific venue by slug."""
-    venues = load_venues()
-    venue = None
-    for v in venues:
-        if v["slug"] == venue_slug:
-            venue = v
-            break
+def resolve_venue(venue_slug: str, venues: Optional[list] = None) -> tuple:
+    """Look up a venue's Ticketmaster ID.
 
-    if not venue:
-        # Try partial match
-        for v in venues:
-            if venue_slug.lower() in v["slug"] or venue_slug.lower() in v["name"].lower():
-                venue = v
-                break
+    Without venues, matches against the venue index (see lib.venue_index)
+    instead of loading venues.json. Returns (venue, None) when the venue has an ID, or (venue, result)
+    where result is the error/note dict to report instead.
+    """
+    if venues is None:
+        matches = venue_index.open_index(VENUES_FILE).lookup(venue_slug)
+    else:
+        matches = venue_index.rank(venue_slug, venues)
+    venue = matches[0]["venue"] if matches else None
 
     if not venue:
-        return {"error": f"Venue not found: {venue_slug}. Use a slug from venues.json"}
+        return None, {"error": f"Venue not found: {venue_slug}. Use a slug from venues.json"}
+    if matches[0]["match"] == "fuzzy" and len(matches) > 1 and matches[1]["score"] >= matches[0]["score"] - 0.05:
+        # Two near-equal guesses: don't silently pick one
+        return None, {
+            "error": f"Venue not found: {venue_slug}. Did you mean: "
+                     + ", ".join(m["venue"]["slug"] for m in matches[:3]),
+        }
 
-    tm_id = venue.get("ticketmaster_venue_id")
-    if not tm_id:
-        return {
+    if not venue.get("ticketmaster_venue_id"):
+        return venue, {
             "venue": venue["name"],
             "note": f"No Ticketmaster ID for {venue['name']}. Check website: {venue.get('website', 'N/A')}",
             "events": []
         }
+    return venue, None
+
+
+def fetch_by_venue(venue_slug: str, days: int = 30, venues: Optional[list] = None,
+                   limit: Optional[int] = None) -> dict:
+    """Fetch events for a specific venue by slug.
 
-    result = get_venue_events(tm_id, days)
+    Pass venues to reuse an already-loaded venue database.
+    """
+    venue, problem = resolve_venue(venue_slug, venues)
+    if problem:
+        return problem
+
+    tm_id = venue["ticketmaster_venue_id"]
+    if limit:
+        start, end = date_window(days)
+        result = collect_events(limit, venue_id=tm_id, start_date=start, end_date=end)
+    else:
+        result = get_venue_events(tm_id, days)
     result["venue"] = venue["name"]
     return result
 
 
-def main():
-    parser = argparse.ArgumentParser(description="Fetch events from Ticketmaster")
+def fetch_by_artist(artist: str, city: str = "", state_code: str = "",
+                    limit: Optional[int] = None) -> dict:
+    """Fetch events for an artist (first page unless limit is given)."""
+    if limit:
+        return collect_events(limit, keyword=artist, city=city, state_code=state_code)
+    return search_artist(artist, city=city, state_code=state_code)
+
+
+def fetch_watchlist_changes(days: int = 30, city: str = "", state_code: str = "",
+                            timeout: float = DEFAULT_TIMEOUT) -> dict:
+    """Check the watchlist and report only what changed since the last check.
+
+    Each venue/artist entry gets "new", "changed" (time or price) and
+    "cancelled" event lists. Seen events are stored in watch-state.json
+    next to watchlist.json. Entries that fail keep their previous state
+    and report the error instead. Entries answered from cached data past
+    its soft TTL count as incomplete, like entries served stale after an
+    error.
+    """
+    report = fetch_watchlist(days, city=city, state_code=state_code, timeout=timeout,
+                             limit=WATCH_DIFF_LIMIT, flag_stale=True)
+    state = watch_state.load_state(WATCH_STATE_FILE)
+    _, window_end = date_window(days)
+
+    result = {"venues": {}, "artists": {}}
+    new_state = {"venues": {}, "artists": {}}
+    for section in ("venues", "artists"):
+        for name, fetched in report[section].items():
+            previous = state[section].get(name)
+            if fetched.get("error") or fetched.get("note"):
+                result[section][name] = fetched
+                if previous:
+                    new_state[section][name] = previous
+                continue
+
+            events = fetched.get("events", [])
+            complete = not fetched.get("stale") and len(events) >= fetched.get("total", len(events))
+            changes, snapshot = watch_state.diff_events(
+                previous, events, complete=complete,
+                window_end=window_end if section == "venues" else None,
+            )
+            new_state[section][name] = snapshot
+            if "venue" in fetched:
+                changes = {"venue": fetched["venue"], **changes}
+            if previous:
+                changes["last_checked"] = previous.get("checked_at")
+            result[section][name] = changes
+
+    watch_state.save_state(WATCH_STATE_FILE, new_state)
+    return result
+
+
+def artist_filters(artist: str, city: str = "", state_code: str = "") -> dict:
+    """Build Ticketmaster search filters for an artist."""
+    return {"keyword": artist, "city": city, "state_code": state_code}
+
+
+def venue_filters(venue: dict, days: int = 30) -> dict:
+    """Build Ticketmaster search filters for a resolved venue."""
+    start, end = date_window(days)
+    return {"venue_id": venue["ticketmaster_venue_id"], "start_date": start, "end_date": end}
+
+
+def query_offline(filters: dict, max_age: Optional[float] = None, limit: Optional[int] = None) -> dict:
+    """Answer a query from the local event store, without the network.
+
+    Past events are skipped. max_age limits results to events refreshed
+    from the API within that many hours.
+    """
+    filters = dict(filters)
+    filters.setdefault("start_date", datetime.now().strftime("%Y-%m-%d"))
+    events = event_store.query(max_age_hours=max_age, **filters)
+    return {"events": events[:limit] if limit else events, "total": len(events), "offline": True}
+
+
+def fetch_offline(args, city: str = "", state_code: str = "") -> Optional[dict]:
+    """Run the requested --artist/--venue/--category/--all/--watchlist query offline."""
+    def by_venue(slug: str) -> dict:
+        venue, problem = resolve_venue(slug)
+        if problem:
+            return problem
+        result = query_offline(venue_filters(venue, args.days), args.max_age, args.limit)
+        result["venue"] = venue["name"]
+        return result
+
+    def by_artist(name: str) -> dict:
+        return query_offline(artist_filters(name, city, state_code), args.max_age, args.limit)
+
+    def by_category(category: str) -> dict:
+        return query_offline(category_filters(category, args.days, city=city, state_code=state_code),
+                             args.max_age, args.limit)
+
+    if args.artist:
+        return by_artist(args.artist)
+    if args.venue:
+        return by_venue(args.venue)
+    if args.category:
+        return by_category(args.category)
+    if args.all:
+        return {category: by_category(category) for category in ALL_CATEGORIES}
+    if args.watchlist:
+        watchlist = load_watchlist()
+        report = {"venues": {}, "artists": {}}
+        for entry in watchlist["watched_venues"]:
+            slug = entry.get("slug") if isinstance(entry, dict) else entry
+            if slug:
+                report["venues"][slug] = by_venue(slug)
+        for entry in watchlist["watched_artists"]:
+            name = entry.get("name") if isinstance(entry, dict) else entry
+            if name:
+                report["artists"][name] = by_artist(name)
+        return report
+    return None
+
+
+def stream_events(events: Iterable[dict]):
+    """Print events as NDJSON, one line each, as soon as each page arrives.
+
+    A failure part-way through is reported as a final {"error": ...} line.
+    """
+    try:
+        for event in events:
+            print(json.dumps(event, separators=(',', ':')), flush=True)
+    except HTTPError as e:
+        print(json.dumps({"error": str(e)}), flush=True)
+
+
+def _flagging_stale(fetch):
+    """Wrap a watch entry fetch to mark its result "stale" if any lookup served old cached data."""
+    def run():
+        with cache.note_stale_reads() as reads:
+            result = fetch()
+        if reads["stale"] and isinstance(result, dict):
+            result = dict(result, stale=True)
+        return result
+    return run
+
+
+def fetch_watchlist(days: int = 30, city: str = "", state_code: str = "",
+                    timeout: float = DEFAULT_TIMEOUT, limit: Optional[int] = None,
+                    flag_stale: bool = False) -> dict:
+    """Check every watched venue and artist in one pass.
+
+    Reads watchlist.json once and resolves venues through the venue
+    index, then queries all entries concurrently. Every request goes through lib.http's shared rate limit.
+    With flag_stale, results built from cache entries past their soft TTL
+    get "stale": true.
+
+    Returns {"venues": {slug: result}, "artists": {name: result}}.
+    """
+    watchlist = load_watchlist()
+
+    tasks = {}
+    for entry in watchlist["watched_venues"]:
+        slug = entry.get("slug") if isinstance(entry, dict) else entry
+        if slug:
+            tasks[f"venue:{slug}"] = (lambda s=slug: fetch_by_venue(s, days, limit=limit))
+    for entry in watchlist["watched_artists"]:
+        name = entry.get("name") if isinstance(entry, dict) else entry
+        if name:
+            tasks[f"artist:{name}"] = (lambda n=name: fetch_by_artist(n, city=city, state_code=state_code,
+                                                                           limit=limit))
+
+    if flag_stale:
+        tasks = {key: _flagging_stale(fetch) for key, fetch in tasks.items()}
+    results = fan_out(
+        tasks,
+        max_workers=WATCHLIST_WORKERS,
+        timeout=timeout,
+        on_error=lambda msg: {"error": msg, "events": []},
+    )
+
+    report = {"venues": {}, "artists": {}}
+    for key, result in results.items():
+        kind, _, name = key.partition(":")
+        report["venues" if kind == "venue" else "artists"][name] = result
+    return report
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog=Path(__file__).name, description="Fetch events from Ticketmaster")
     parser.add_argument("--category", choices=["music", "comedy", "theatre", "theater"],
                         help="Event category to search")
     parser.add_argument("--venue", help="Venue slug from venues.json")
     parser.add_argument("--artist", help="Search for artist events")
     parser.add_argument("--all", action="store_true", help="Fetch all categories")
+    parser.add_argument("--watchlist", action="store_true",
+                        help="Check every venue and artist in watchlist.json")
+    parser.add_argument("--changes", action="store_true",
+                        help="With --watchlist: only report new, changed and cancelled events since the last check")
     parser.add_argument("--days", type=int, default=14, help="Days ahead to search (default: 14)")
     parser.add_argument("--city", help="City to search in (default: from preferences.json)")
     parser.add_argument("--state", help="State code (e.g., CA, NY)")
+    parser.add_argument("--timeout", type=float, default=DEFAULT_TIMEOUT,
+                        help=f"Per-query timeout in seconds for --all/--watchlist (default: {DEFAULT_TIMEOUT})")
+    parser.add_argument("--limit", type=int,
+                        help="Follow result pages until this many events (default: first page only)")
+    parser.add_argument("--stream", action="store_true",
+                        help="Emit events as NDJSON while pages download (--category/--venue/--artist)")
+    parser.add_argument("--offline", action="store_true",
+                        help="Answer from the local event store only (no API calls)")
+    parser.add_argument("--max-age", type=float,
+                        help="With --offline: only events refreshed within this many hours")
     parser.add_argument("--format", choices=["json", "compact"], default="compact",
                         help="Output format (default: compact)")
+    parser.add_argument("--stats", action="store_true",
+                        help="Print HTTP, cache and parse timings to stderr when done")
+    parser.add_argument("--profile", choices=["cpu", "mem"],
+                        help="Profile the run (cProfile or tracemalloc; also DATEKIT_PROFILE)")
+    parser.add_argument("--profile-dir",
+                        help="Where profiles go (default: DATEKIT_PROFILE_DIR or ~/.cache/datekit/profiles)")
+
+    args = parser.parse_args(argv)
 
-    args = parser.parse_args()
+    # Refresh soft-expired cache entries in a detached child, not in this run
+    cache.set_revalidate_mode("process")
+
+    if args.stream and not (args.artist or args.venue or args.category):
+        parser.error("--stream needs --category, --venue or --artist")
+    if args.stream and args.offline:
+        parser.error("--stream and --offline can't be combined")
+    if args.changes and (args.offline or not args.watchlist):
+        parser.error("--changes needs --watchlist (and can't be used with --offline)")
 
     # Resolve city: CLI arg > preferences.json
     city = args.city or get_city() or ""
@@ -114,26 +417,50 @@ def main():
     if not city and not args.venue:
         print("Warning: No city specified. Use --city or set city in data/preferences.json", file=sys.stderr)
 
-    if args.artist:
-        result = search_artist(args.artist, city=city, state_code=state_code)
-    elif args.venue:
-        result = fetch_by_venue(args.venue, args.days)
-    elif args.category:
-        result = fetch_by_category(args.category, args.days, city=city, state_code=state_code)
-    elif args.all:
-        result = {
-            "music": fetch_by_category("music", args.days, city=city, state_code=state_code),
-            "comedy": fetch_by_category("comedy", args.days, city=city, state_code=state_code),
-            "theatre": fetch_by_category("theatre", args.days, city=city, state_code=state_code),
-        }
-    else:
-        parser.print_help()
-        return
+    with trace.stats(args.stats), profiling.profiled(args.profile, __file__, args.profile_dir):
+        if args.stream:
+            if args.artist:
+                filters = artist_filters(args.artist, city, state_code)
+            elif args.venue:
+                venue, problem = resolve_venue(args.venue)
+                if problem:
+                    print(json.dumps(problem, separators=(',', ':')))
+                    return
+                filters = venue_filters(venue, args.days)
+            else:
+                filters = category_filters(args.category, args.days, city=city, state_code=state_code)
+            stream_events(iter_events(max_events=args.limit, prefetch=True, **filters))
+            return
 
-    if args.format == "json":
-        print(json.dumps(result, indent=2))
-    else:
-        print(json.dumps(result, separators=(',', ':')))
+        if args.offline:
+            result = fetch_offline(args, city=city, state_code=state_code)
+            if result is None:
+                parser.print_help()
+                return
+        elif args.artist:
+            result = fetch_by_artist(args.artist, city=city, state_code=state_code, limit=args.limit)
+        elif args.venue:
+            result = fetch_by_venue(args.venue, args.days, limit=args.limit)
+        elif args.category:
+            result = fetch_by_category(args.category, args.days, city=city, state_code=state_code,
+                                       limit=args.limit)
+        elif args.all:
+            result = fetch_all_categories(args.days, city=city, state_code=state_code,
+                                          timeout=args.timeout, limit=args.limit)
+        elif args.watchlist and args.changes:
+            result = fetch_watchlist_changes(args.days, city=city, state_code=state_code,
+                                             timeout=args.timeout)
+        elif args.watchlist:
+            result = fetch_watchlist(args.days, city=city, state_code=state_code,
+                                     timeout=args.timeout, limit=args.limit)
+        else:
+            parser.print_help()
+            return
+
+        if args.format == "json":
+            print(json.dumps(result, indent=2))
+        else:
+            print(json.dumps(result, separators=(',', ':')))
 
 
 if __name__ == "__main__":
@@ -0,0 +1,81 @@
+#!/usr/bin/env python3
+"""Find restaurants with the Google Places API.
+
+Every --query is searched in every --neighborhood (or city-wide if none
+is given). The searches run concurrently and the results are merged,
+with each place listed once.
+
+Usage:
+    python3 fetch_places.py --query Thai
+    python3 fetch_places.py --query Thai --query Ramen --neighborhood "Silver Lake" --neighborhood "Echo Park"
+    python3 fetch_places.py --query "romantic dinner" --max-results 40 --open-now
+    python3 fetch_places.py --query tapas --open-at 2026-02-14T21:30 --open-for 90
+"""
+
+import argparse
+import json
+import sys
+from datetime import datetime
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent))
+from lib import cache, profiling, trace
+from lib.env import get_city
+from lib.google_places import FIELD_PROFILES, DEFAULT_PROFILE, filter_open, search_restaurants_batch
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Find restaurants via Google Places")
+    parser.add_argument("--query", action="append", required=True,
+                        help="Cuisine or search phrase (repeatable)")
+    parser.add_argument("--neighborhood", action="append",
+                        help="Neighborhood to search in (repeatable)")
+    parser.add_argument("--city", help="City to search in (default: from preferences.json)")
+    parser.add_argument("--max-results", type=int, default=10,
+                        help="Max results per search (default: 10, up to 60)")
+    parser.add_argument("--open-now", action="store_true", help="Only places open right now")
+    parser.add_argument("--open-at", help="Only places open at this local time (YYYY-MM-DDTHH:MM); "
+                                          "checked against cached hours, implies --fields with-hours")
+    parser.add_argument("--open-for", type=int, default=0,
+                        help="With --open-at: minutes the place must stay open (default: 0)")
+    parser.add_argument("--fields", choices=list(FIELD_PROFILES), default=None,
+                        help=f"Field mask profile (default: {DEFAULT_PROFILE})")
+    parser.add_argument("--format", choices=["json", "compact"], default="json",
+                        help="Output format")
+    parser.add_argument("--stats", action="store_true",
+                        help="Print HTTP, cache and parse timings to stderr when done")
+    parser.add_argument("--profile", choices=["cpu", "mem"],
+                        help="Profile the run (cProfile or tracemalloc; also DATEKIT_PROFILE)")
+    parser.add_argument("--profile-dir",
+                        help="Where profiles go (default: DATEKIT_PROFILE_DIR or ~/.cache/datekit/profiles)")
+    args = parser.parse_args()
+
+    # Refresh soft-expired cache entries in a detached child, not in this run
+    cache.set_revalidate_mode("process")
+
+    open_at = None
+    if args.open_at:
+        try:
+            open_at = datetime.fromisoformat(args.open_at)
+        except ValueError:
+            parser.error(f"--open-at must look like 2026-02-14T21:30, got {args.open_at}")
+    profile = "with-hours" if open_at else (args.fields or DEFAULT_PROFILE)
+
+    city = args.city or get_city() or ""
+    neighborhoods = args.neighborhood or [None]
+    searches = [(q, n) for q in args.query for n in neighborhoods]
+
+    with trace.stats(args.stats), profiling.profiled(args.profile, __file__, args.profile_dir):
+        result = search_restaurants_batch(searches, city=city, open_now=args.open_now,
+                                          max_results=args.max_results, profile=profile)
+        if open_at:
+            result["places"] = filter_open(result["places"], open_at, args.open_for)
+
+        if args.format == "json":
+            print(json.dumps(result, indent=2))
+        else:
+            print(json.dumps(result, separators=(',', ':')))
+
+
+if __name__ == "__main__":
+    main()
@@ -5,20 +5,40 @@ Usage:
     python3 fetch_venues.py                    # Update all venues missing TM IDs
     python3 fetch_venues.py --check            # Show which venues need TM IDs
     python3 fetch_venues.py --state CA         # Search with state filter
+    python3 fetch_venues.py --retry-not-found  # Re-search venues cached as not found
+
+Lookups run concurrently (paced by the shared Ticketmaster rate limit).
+Each result is appended to a journal next to venues.json and venues.json
+is saved every few results, so an interrupted run resumes where it left off.
+The journal starts with the run's parameters and a digest of the venue
+list; a later run with different ones starts afresh.
 """
 
 import argparse
+import hashlib
 import json
+import os
 import sys
 import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from pathlib import Path
 
 sys.path.insert(0, str(Path(__file__).parent))
+if __name__ == "__main__":
+    # Hand the run to a warm `datekit.py serve` daemon if one is listening
+    from lib.daemon import exit_if_served
+    exit_if_served(__file__)
+from lib import profiling, trace
 from lib.env import get_config
-from lib.ticketmaster import search_venue_id
+from lib.ticketmaster import lookup_venue_id
 
 REPO_ROOT = Path(__file__).parent.parent
 VENUES_FILE = REPO_ROOT / "data" / "venues.json"
+JOURNAL_FILE = REPO_ROOT / "data" / ".venues.journal"
+
+DEFAULT_WORKERS = 4
+SAVE_EVERY = 25  # Results between checkpoint saves of venues.json
+SAVE_INTERVAL = 10.0  # ...or seconds, whichever comes first
 
 
 def load_venues_data():
@@ -36,17 +56,118 @@ def save_venues_data(venues: list, is_flat_array: bool):
         data = venues
     else:
         data = {"venues": venues}
-    with open(VENUES_FILE, 'w') as f:
+    tmp = VENUES_FILE.with_name(f"{VENUES_FILE.name}.{os.getpid()}.tmp")
+    with open(tmp, 'w') as f:
         json.dump(data, f, indent=2)
-
-
-def main():
-    parser = argparse.ArgumentParser(description="Populate Ticketmaster venue IDs")
+    os.replace(tmp, VENUES_FILE)
+
+
+def journal_header(venues: list, state_code: str, retry_not_found: bool) -> dict:
+    """What a journal's results depend on: the search parameters and the venues searched."""
+    names = sorted([v.get("slug") or "", v.get("name") or ""] for v in venues)
+    return {
+        "state": state_code,
+        "retry_not_found": retry_not_found,
+        "venues": hashlib.sha1(json.dumps(names).encode()).hexdigest(),
+    }
+
+
+def load_journal(header: dict) -> dict:
+    """Read results from an interrupted run. Returns {slug: venue_id or None}.
+
+    A journal written under a different header (another --state, a
+    --retry-not-found run, an edited venue list) is discarded.
+    """
+    results = {}
+    try:
+        with open(JOURNAL_FILE) as f:
+            try:
+                matches = json.loads(f.readline()).get("run") == header
+            except (json.JSONDecodeError, AttributeError):
+                matches = False
+            if not matches:
+                JOURNAL_FILE.unlink(missing_ok=True)
+                return {}
+            for line in f:
+                try:
+                    entry = json.loads(line)
+                except json.JSONDecodeError:
+                    continue  # Torn last line from a crash
+                results[entry["slug"]] = entry.get("id")
+    except OSError:
+        pass
+    return results
+
+
+def resolve_venues(venues: list, is_flat_array: bool, needs_id: list, state_code: str,
+                   header: dict, workers: int = DEFAULT_WORKERS, use_cache: bool = True) -> dict:
+    """Look up TM IDs concurrently, journaling and checkpointing as results arrive.
+
+    Returns counts of found / not_found / failed venues.
+    """
+    counts = {"found": 0, "not_found": 0, "failed": 0}
+    done_since_save = 0
+    last_save = time.monotonic()
+
+    executor = ThreadPoolExecutor(max_workers=max(1, workers))
+    futures = {
+        executor.submit(lookup_venue_id, v["name"], state_code, use_cache): v
+        for v in needs_id
+    }
+    try:
+        with open(JOURNAL_FILE, "a") as journal:
+            if not journal.tell():
+                journal.write(json.dumps({"run": header}) + "\n")
+                journal.flush()
+            for future in as_completed(futures):
+                v = futures[future]
+                try:
+                    tm_id = future.result()
+                except Exception as e:
+                    # Not journaled, so a rerun tries it again
+                    print(f"  Failed: {v['name']} ({e})")
+                    counts["failed"] += 1
+                    continue
+
+                if tm_id:
+                    v["ticketmaster_venue_id"] = tm_id
+                    print(f"  Found: {v['name']} -> {tm_id}")
+                    counts["found"] += 1
+                else:
+                    print(f"  Not found: {v['name']}")
+                    counts["not_found"] += 1
+                journal.write(json.dumps({"slug": v["slug"], "id": tm_id}) + "\n")
+                journal.flush()
+
+                done_since_save += 1
+                if done_since_save >= SAVE_EVERY or time.monotonic() - last_save >= SAVE_INTERVAL:
+                    save_venues_data(venues, is_flat_array)
+                    done_since_save = 0
+                    last_save = time.monotonic()
+    finally:
+        executor.shutdown(wait=False, cancel_futures=True)
+        save_venues_data(venues, is_flat_array)
+
+    return counts
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog=Path(__file__).name, description="Populate Ticketmaster venue IDs")
     parser.add_argument("--check", action="store_true",
                         help="Just show which venues need IDs (don't update)")
     parser.add_argument("--city", help="City filter (for consistency, not used in venue search)")
     parser.add_argument("--state", help="State code for Ticketmaster search (e.g., CA, NY)")
-    args = parser.parse_args()
+    parser.add_argument("--workers", type=int, default=DEFAULT_WORKERS,
+                        help=f"Concurrent lookups (default: {DEFAULT_WORKERS}; the rate limit still applies)")
+    parser.add_argument("--retry-not-found", action="store_true",
+                        help="Search again for venues cached as not found")
+    parser.add_argument("--stats", action="store_true",
+                        help="Print HTTP, cache and parse timings to stderr when done")
+    parser.add_argument("--profile", choices=["cpu", "mem"],
+                        help="Profile the run (cProfile or tracemalloc; also DATEKIT_PROFILE)")
+    parser.add_argument("--profile-dir",
+                        help="Where profiles go (default: DATEKIT_PROFILE_DIR or ~/.cache/datekit/profiles)")
+    args = parser.parse_args(argv)
 
     config = get_config()
     api_key = config.get("TICKETMASTER_API_KEY")
@@ -86,25 +207,40 @@ def main():
         return
 
     state_code = args.state or ""
+
+    header = journal_header(venues, state_code, args.retry_not_found)
+    journal = load_journal(header)
+    if journal:
+        by_slug = {v["slug"]: v for v in needs_id}
+        for slug, tm_id in journal.items():
+            if slug in by_slug and tm_id:
+                by_slug[slug]["ticketmaster_venue_id"] = tm_id
+        needs_id = [v for v in needs_id
+                    if not v.get("ticketmaster_venue_id")
+                    and (args.retry_not_found or v["slug"] not in journal)]
+        print(f"Resuming: {len(journal)} venue(s) already checked by an interrupted run")
+
     print(f"Searching Ticketmaster for {len(needs_id)} venues...")
     if state_code:
         print(f"  State filter: {state_code}")
     print()
 
-    updated = 0
-    for v in needs_id:
-        tm_id = search_venue_id(v["name"], state_code=state_code)
-        if tm_id:
-            v["ticketmaster_venue_id"] = tm_id
-            print(f"  Found: {v['name']} -> {tm_id}")
-            updated += 1
-        else:
-            print(f"  Not found: {v['name']}")
-        time.sleep(0.25)  # Rate limit: 5 req/sec
-
-    save_venues_data(venues, is_flat_array)
-
-    print(f"\nUpdated {updated} venue(s).")
+    try:
+        with trace.stats(args.stats), profiling.profiled(args.profile, __file__, args.profile_dir):
+            counts = resolve_venues(venues, is_flat_array, needs_id, state_code, header,
+                                    workers=args.workers, use_cache=not args.retry_not_found)
+    except KeyboardInterrupt:
+        print("\nInterrupted. Progress saved; run again to resume.")
+        sys.exit(130)
+
+    if not counts["failed"]:
+        JOURNAL_FILE.unlink(missing_ok=True)
+
+    print(f"\nUpdated {counts['found']} venue(s).")
+    if counts["not_found"]:
+        print(f"{counts['not_found']} not found (cached; use --retry-not-found to search again).")
+    if counts["failed"]:
+        print(f"{counts['failed']} failed. Run again to retry them.")
 
 
 if __name__ == "__main__":
@@ -0,0 +1,122 @@
+#!/usr/bin/env python3
+"""Log, rate and summarize dates.
+
+The history lives in data/date-history.jsonl (append-only; see
+lib/history.py). An existing data/date-history.json is imported on first use.
+
+Usage:
+    python3 history.py add --date 2026-02-08 --partner Jordan --category Adventure \\
+        --activity "Concert at The Metro + Thai" --neighborhood "Lakeview" --venue the-metro --cost 60
+    python3 history.py rate 8 --notes "Great show"
+    python3 history.py rate 7 --id date-004
+    python3 history.py stats
+    python3 history.py stats --partner Jordan
+    python3 history.py list --limit 10
+    python3 history.py compact
+"""
+
+import argparse
+import json
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent))
+from lib.history import History
+
+REPO_ROOT = Path(__file__).parent.parent
+HISTORY_LOG = REPO_ROOT / "data" / "date-history.jsonl"
+LEGACY_HISTORY_FILE = REPO_ROOT / "data" / "date-history.json"
+
+
+def open_history() -> History:
+    return History(HISTORY_LOG, legacy_path=LEGACY_HISTORY_FILE)
+
+
+def cmd_add(args) -> dict:
+    entry = json.loads(args.json) if args.json else {}
+    fields = {
+        "date": args.date,
+        "partner": args.partner,
+        "category": args.category,
+        "activity": args.activity,
+        "venues": args.venue,
+        "neighborhood": args.neighborhood,
+        "notes": args.notes,
+        "cost_estimate": args.cost,
+    }
+    entry.update({k: v for k, v in fields.items() if v is not None})
+    entry.setdefault("venues", [])
+    entry.setdefault("notes", "")
+    entry.setdefault("planned_via", "date-plan")
+    return open_history().add(entry)
+
+
+def cmd_rate(args) -> dict:
+    rated = open_history().rate(args.rating, date_id=args.id, notes=args.notes)
+    if rated is None:
+        return {"error": f"No date {args.id}" if args.id else "All dates are rated! Nothing to rate."}
+    return rated
+
+
+def cmd_list(args) -> dict:
+    entries = open_history().entries()
+    if args.partner:
+        entries = [e for e in entries if e.get("partner") == args.partner]
+    if args.limit:
+        entries = entries[-args.limit:]
+    return {"dates": entries}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Date history")
+    sub = parser.add_subparsers(dest="command")
+
+    add_parser = sub.add_parser("add", help="Log a date")
+    add_parser.add_argument("--json", help="Full entry as JSON (flags override its fields)")
+    add_parser.add_argument("--date", help="YYYY-MM-DD")
+    add_parser.add_argument("--partner")
+    add_parser.add_argument("--category", help="Adventure, Creative, Explore, Nourish or Recharge")
+    add_parser.add_argument("--activity")
+    add_parser.add_argument("--venue", action="append", help="Venue slug (repeatable)")
+    add_parser.add_argument("--neighborhood")
+    add_parser.add_argument("--notes")
+    add_parser.add_argument("--cost", type=float, help="Cost estimate in dollars")
+
+    rate_parser = sub.add_parser("rate", help="Rate a date (default: the last unrated one)")
+    rate_parser.add_argument("rating", type=float, help="Rating 1-10")
+    rate_parser.add_argument("--id", help="Date id, e.g. date-004")
+    rate_parser.add_argument("--notes")
+
+    stats_parser = sub.add_parser("stats", help="Category balance, recent neighborhoods, ratings")
+    stats_parser.add_argument("--partner", help="Only this partner's dates")
+
+    list_parser = sub.add_parser("list", help="Full date entries (reads the whole log)")
+    list_parser.add_argument("--partner")
+    list_parser.add_argument("--limit", type=int, help="Only the last N dates")
+
+    sub.add_parser("compact", help="Fold ratings into their entries and rewrite the log")
+    sub.add_parser("rebuild", help="Recompute the stats sidecar from the log")
+
+    args = parser.parse_args()
+
+    if args.command == "add":
+        result = cmd_add(args)
+    elif args.command == "rate":
+        result = cmd_rate(args)
+    elif args.command == "stats":
+        result = open_history().stats(partner=args.partner)
+    elif args.command == "list":
+        result = cmd_list(args)
+    elif args.command == "compact":
+        result = open_history().compact()
+    elif args.command == "rebuild":
+        result = open_history().rebuild()
+    else:
+        parser.print_help()
+        return
+
+    print(json.dumps(result, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,172 @@
+"""Per-host circuit breaker shared across date-planner processes.
+
+Each host's breaker state lives in a small JSON file under
+~/.cache/datekit/breaker, so one process noticing an outage spares every
+later invocation the full retry loop:
+
+- closed: requests flow; consecutive failures (connection errors, 5xx)
+  are counted.
+- open: after FAILURE_THRESHOLD failures, requests fail fast until the
+  cooldown ends. Callers that cache (lib.cache.cached_fetch) then serve
+  their last copy.
+- half-open: after the cooldown, one process gets to send a probe. Success
+  closes the breaker; failure reopens it with a doubled cooldown.
+
+Set DATEKIT_BREAKER=0 to disable.
+"""
+
+import json
+import os
+import threading
+import time
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+from .cache import CACHE_DIR
+from .locks import file_lock
+
+STATE_DIR = CACHE_DIR / "breaker"
+ENABLED = os.environ.get("DATEKIT_BREAKER", "1").lower() not in ("0", "false", "no")
+
+FAILURE_THRESHOLD = 5  # Consecutive failed attempts before opening
+OPEN_SECONDS = 30.0  # First cooldown; doubles after each failed probe
+MAX_OPEN_SECONDS = 600.0
+PROBE_SECONDS = 60.0  # How long one process's probe holds the half-open slot
+
+_thread_lock = threading.Lock()
+# Last state this process read or wrote per host; lets a healthy host skip writes
+_last_seen: Dict[str, Dict[str, Any]] = {}
+
+
+def _state_path(host: str) -> Path:
+    return STATE_DIR / f"{host}.json"
+
+
+def _closed() -> Dict[str, Any]:
+    return {"failures": 0, "open_until": 0.0, "cooldown": OPEN_SECONDS, "probe_until": 0.0}
+
+
+def _read(host: str) -> Dict[str, Any]:
+    try:
+        with open(_state_path(host)) as f:
+            state = {**_closed(), **json.load(f)}
+    except (json.JSONDecodeError, OSError):
+        state = _closed()
+    _last_seen[host] = state
+    return state
+
+
+def _write(host: str, state: Dict[str, Any]):
+    _last_seen[host] = state
+    path = _state_path(host)
+    try:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = path.with_suffix(f".{os.getpid()}.{threading.get_ident()}.tmp")
+        with open(tmp, "w") as f:
+            json.dump(state, f)
+        os.replace(tmp, path)
+    except OSError:
+        pass  # Unwritable cache dir: breaker just stays per-process
+
+
+def _is_clean(state: Dict[str, Any]) -> bool:
+    return not state["failures"] and not state["open_until"]
+
+
+def allow(host: str) -> bool:
+    """Whether a request to host may go out now.
+
+    While open, False. Once the cooldown is over, True for exactly one
+    caller (across processes), whose request is the half-open probe.
+    """
+    if not ENABLED:
+        return True
+    state = _read(host)
+    now = time.time()
+    if not state["open_until"]:
+        return True
+    if now < state["open_until"] or now < state["probe_until"]:
+        return False
+
+    with _thread_lock, file_lock(STATE_DIR / f"{host}.lock"):
+        state = _read(host)
+        if not state["open_until"]:
+            return True  # Someone else's probe already closed it
+        if now < state["open_until"] or now < state["probe_until"]:
+            return False
+        state["probe_until"] = now + PROBE_SECONDS
+        _write(host, state)
+        return True
+
+
+def record_success(host: str):
+    """The host answered: close its breaker."""
+    if not ENABLED:
+        return
+    seen = _last_seen.get(host)
+    if seen is not None and _is_clean(seen):
+        return
+    with _thread_lock, file_lock(STATE_DIR / f"{host}.lock"):
+        if not _is_clean(_read(host)):
+            _write(host, _closed())
+
+
+def record_failure(host: str):
+    """An attempt to reach host failed (connection error or 5xx)."""
+    if not ENABLED:
+        return
+    with _thread_lock, file_lock(STATE_DIR / f"{host}.lock"):
+        state = _read(host)
+        now = time.time()
+        state["failures"] += 1
+        if state["open_until"] and now >= state["open_until"]:
+            # Failed half-open probe: back off harder
+            state["cooldown"] = min(MAX_OPEN_SECONDS, state["cooldown"] * 2)
+            state["open_until"] = now + state["cooldown"]
+            state["probe_until"] = 0.0
+        elif not state["open_until"] and state["failures"] >= FAILURE_THRESHOLD:
+            state["open_until"] = now + state["cooldown"]
+        _write(host, state)
+
+
+def retry_in(host: str) -> float:
+    """Seconds until host's breaker allows a probe (0 if not open)."""
+    state = _last_seen.get(host) or _read(host)
+    return max(0.0, state["open_until"] - time.time()) if state["open_until"] else 0.0
+
+
+def status() -> List[Dict[str, Any]]:
+    """Breaker state for every host that has one."""
+    hosts = []
+    if STATE_DIR.exists():
+        for path in sorted(STATE_DIR.glob("*.json")):
+            host = path.stem
+            state = _read(host)
+            now = time.time()
+            if not state["open_until"]:
+                name = "closed"
+            elif now < state["open_until"]:
+                name = "open"
+            else:
+                name = "half-open"
+            hosts.append({
+                "host": host,
+                "state": name,
+                "failures": state["failures"],
+                "retry_in": round(max(0.0, state["open_until"] - now), 1) if name == "open" else 0,
+            })
+    return hosts
+
+
+def reset(host: Optional[str] = None) -> int:
+    """Close one host's breaker, or all of them. Returns how many were reset."""
+    paths = [_state_path(host)] if host else list(STATE_DIR.glob("*.json")) if STATE_DIR.exists() else []
+    count = 0
+    for path in paths:
+        try:
+            path.unlink()
+            count += 1
+        except OSError:
+            pass
+        _last_seen.pop(path.stem, None)
+    return count
@@ -1,13 +1,84 @@
-"""Caching utilities for date-planner."""
+"""Caching utilities for date-planner.
+
+Entries live in a pluggable backend:
+
+- "sqlite" (default): one SQLite file with per-entry metadata (provider,
+  created_at, ttl, size, last_access), a size cap with LRU eviction and
+  invalidation by provider prefix.
+- "file": one JSON file per key, validity from file mtime.
+
+Pick with DATEKIT_CACHE_BACKEND=sqlite|file. Cap the SQLite store with
+DATEKIT_CACHE_MAX_MB (default 50). Long-running processes (the
+`datekit.py serve` daemon) add an in-memory LRU tier in front of it with
+enable_memory_tier().
+
+cached_fetch() adds soft/hard TTL policies on top: entries past their
+soft TTL are served immediately while a refresh runs in the background,
+and when the upstream fails any cached copy is served with "stale": true.
+It is also single-flight: concurrent misses on one key (across threads
+and processes) wait on a per-key file lock while one caller fetches.
+"""
+
+import atexit
 
 import hashlib
 import json
+import os
+import subprocess
+import sys
+import threading
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
 from datetime import datetime, timezone
 from pathlib import Path
-from typing import Any, Optional
+from typing import Any, Callable, Dict, Iterator, NamedTuple, Optional, Tuple
+
+from . import trace
+from .locks import file_lock, prune_lock
+
+try:
+    import sqlite3
+except ImportError:  # Python built without sqlite: fall back to files
+    sqlite3 = None
 
 CACHE_DIR = Path.home() / ".cache" / "datekit"
 DEFAULT_TTL_HOURS = 6  # Events change frequently
+DEFAULT_BACKEND = "sqlite"
+DEFAULT_MAX_MB = 50
+MEMORY_MAX_ENTRIES = 512  # Entries kept by MemoryTier (see enable_memory_tier)
+
+
+class TTLPolicy(NamedTuple):
+    """Soft TTL: served as fresh. Hard TTL: latest an entry is served without revalidating."""
+    soft_hours: float
+    hard_hours: float
+
+
+class RefreshSpec(NamedTuple):
+    """How another process can redo a fetch: module.function(**kwargs).
+
+    kwargs go to the lib.revalidate worker as JSON, so they must be
+    JSON-serializable and hold no secrets (the function looks up API keys
+    itself). The function returns what the fetch callable would.
+    """
+    module: str
+    function: str
+    kwargs: Dict[str, Any]
+
+
+# Per provider prefix (see get_cache_key)
+POLICIES: Dict[str, TTLPolicy] = {
+    "tm": TTLPolicy(soft_hours=6, hard_hours=48),
+    "gp": TTLPolicy(soft_hours=24, hard_hours=24 * 7),
+}
+DEFAULT_POLICY = TTLPolicy(soft_hours=DEFAULT_TTL_HOURS, hard_hours=DEFAULT_TTL_HOURS * 4)
+
+# File backend has no per-entry TTL; gc uses the longest one in use
+FILE_MAX_AGE_HOURS = max(p.hard_hours for p in POLICIES.values())
+
+LOCK_DIR = CACHE_DIR / "locks"
+SINGLE_FLIGHT_TIMEOUT = 60  # Max seconds to wait for another process's fetch
 
 
 def ensure_cache_dir():
@@ -16,9 +87,21 @@ def ensure_cache_dir():
 
 
 def get_cache_key(topic: str, from_date: str, to_date: str, sources: str) -> str:
-    """Generate a cache key from query parameters."""
+    """Generate a cache key from query parameters.
+
+    Keys keep the topic's provider prefix (e.g. "tm-", "gp-") in the clear
+    so entries can be invalidated per provider.
+    """
     key_data = f"{topic}|{from_date}|{to_date}|{sources}"
-    return hashlib.sha256(key_data.encode()).hexdigest()[:16]
+    digest = hashlib.sha256(key_data.encode()).hexdigest()[:16]
+    prefix, sep, _ = topic.partition("-")
+    return f"{prefix}-{digest}" if sep and prefix.isalnum() else digest
+
+
+def get_provider(cache_key: str) -> str:
+    """Provider prefix of a cache key ("tm", "gp", or "" if none)."""
+    prefix, sep, _ = cache_key.partition("-")
+    return prefix if sep else ""
 
 
 def get_cache_path(cache_key: str) -> Path:
@@ -41,37 +124,561 @@ def is_cache_valid(cache_path: Path, ttl_hours: int = DEFAULT_TTL_HOURS) -> bool
         return False
 
 
-def load_cache(cache_key: str, ttl_hours: int = DEFAULT_TTL_HOURS) -> Optional[dict]:
-    """Load data from cache if valid."""
-    cache_path = get_cache_path(cache_key)
+class FileBackend:
+    """One JSON file per key under CACHE_DIR."""
+
+    name = "file"
+
+    def get(self, cache_key: str) -> Optional[Tuple[Any, float]]:
+        """Return (data, created_at) or None."""
+        cache_path = get_cache_path(cache_key)
+        try:
+            created_at = cache_path.stat().st_mtime
+            with open(cache_path, 'r') as f:
+                return json.load(f), created_at
+        except (json.JSONDecodeError, OSError):
+            return None
+
+    def set(self, cache_key: str, data: Any, ttl_hours: Optional[float] = None):
+        """Write via a temp file + os.replace so readers never see a partial file."""
+        ensure_cache_dir()
+        cache_path = get_cache_path(cache_key)
+        tmp_path = cache_path.with_name(f"{cache_key}.{os.getpid()}.{threading.get_ident()}.tmp")
+        try:
+            with open(tmp_path, 'w') as f:
+                json.dump(data, f)
+            os.replace(tmp_path, cache_path)
+        except BaseException:
+            try:
+                tmp_path.unlink()
+            except OSError:
+                pass
+            raise
+
+    def clear(self, prefix: str = "") -> int:
+        removed = 0
+        if CACHE_DIR.exists():
+            for f in CACHE_DIR.glob(f"{prefix}*.json"):
+                try:
+                    f.unlink()
+                    removed += 1
+                except OSError:
+                    pass
+        return removed
+
+    def stats(self) -> Dict[str, Any]:
+        providers: Dict[str, Dict[str, int]] = {}
+        if CACHE_DIR.exists():
+            for f in CACHE_DIR.glob("*.json"):
+                try:
+                    size = f.stat().st_size
+                except OSError:
+                    continue
+                p = providers.setdefault(get_provider(f.stem), {"entries": 0, "bytes": 0})
+                p["entries"] += 1
+                p["bytes"] += size
+        return {
+            "backend": self.name,
+            "path": str(CACHE_DIR),
+            "entries": sum(p["entries"] for p in providers.values()),
+            "bytes": sum(p["bytes"] for p in providers.values()),
+            "providers": providers,
+        }
+
+    def gc(self, max_bytes: Optional[int] = None) -> Dict[str, int]:
+        """Drop files older than FILE_MAX_AGE_HOURS."""
+        expired = 0
+        if CACHE_DIR.exists():
+            for f in CACHE_DIR.glob("*.json"):
+                if not is_cache_valid(f, FILE_MAX_AGE_HOURS):
+                    try:
+                        f.unlink()
+                        expired += 1
+                    except OSError:
+                        pass
+        return {"expired": expired, "evicted": 0}
+
+
+class SQLiteBackend:
+    """Single-file SQLite store with metadata, size cap and LRU eviction."""
+
+    name = "sqlite"
+
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS entries (
+            key TEXT PRIMARY KEY,
+            provider TEXT NOT NULL,
+            created_at REAL NOT NULL,
+            ttl REAL,
+            size INTEGER NOT NULL,
+            last_access REAL NOT NULL,
+            data TEXT NOT NULL
+        );
+        CREATE INDEX IF NOT EXISTS idx_entries_provider ON entries(provider);
+        CREATE INDEX IF NOT EXISTS idx_entries_last_access ON entries(last_access);
+    """
+
+    def __init__(self, path: Optional[Path] = None, max_bytes: Optional[int] = None):
+        self.path = path or CACHE_DIR / "cache.db"
+        if max_bytes is None:
+            try:
+                max_bytes = int(float(os.environ.get("DATEKIT_CACHE_MAX_MB", DEFAULT_MAX_MB)) * 1024 * 1024)
+            except ValueError:
+                max_bytes = DEFAULT_MAX_MB * 1024 * 1024
+        self.max_bytes = max_bytes
+        self._local = threading.local()
+
+    def _conn(self) -> "sqlite3.Connection":
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            conn = sqlite3.connect(str(self.path), timeout=10, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.executescript(self.SCHEMA)
+            self._local.conn = conn
+        return conn
+
+    def get(self, cache_key: str) -> Optional[Tuple[Any, float]]:
+        """Return (data, created_at) or None, marking the entry as used."""
+        conn = self._conn()
+        row = conn.execute(
+            "SELECT data, created_at FROM entries WHERE key = ?", (cache_key,)
+        ).fetchone()
+        if row is None:
+            return None
+        conn.execute("UPDATE entries SET last_access = ? WHERE key = ?", (time.time(), cache_key))
+        try:
+            return json.loads(row[0]), row[1]
+        except json.JSONDecodeError:
+            return None
+
+    def set(self, cache_key: str, data: Any, ttl_hours: Optional[float] = None):
+        payload = json.dumps(data)
+        now = time.time()
+        conn = self._conn()
+        conn.execute(
+            "INSERT OR REPLACE INTO entries (key, provider, created_at, ttl, size, last_access, data) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?)",
+            (cache_key, get_provider(cache_key), now,
+             ttl_hours * 3600 if ttl_hours else None, len(payload), now, payload),
+        )
+        self._evict(conn)
+
+    def _evict(self, conn: "sqlite3.Connection") -> int:
+        """Delete least-recently-used entries until under max_bytes (None = no cap)."""
+        if self.max_bytes is None:
+            return 0
+        total = conn.execute("SELECT COALESCE(SUM(size), 0) FROM entries").fetchone()[0]
+        if total <= self.max_bytes:
+            return 0
+        evicted = 0
+        for key, size in conn.execute(
+            "SELECT key, size FROM entries ORDER BY last_access ASC"
+        ).fetchall():
+            if total <= self.max_bytes:
+                break
+            conn.execute("DELETE FROM entries WHERE key = ?", (key,))
+            total -= size
+            evicted += 1
+        return evicted
+
+    def clear(self, prefix: str = "") -> int:
+        conn = self._conn()
+        provider = prefix.rstrip("-*")
+        if provider:
+            cur = conn.execute("DELETE FROM entries WHERE provider = ?", (provider,))
+        else:
+            cur = conn.execute("DELETE FROM entries")
+        return cur.rowcount
+
+    def stats(self) -> Dict[str, Any]:
+        conn = self._conn()
+        providers = {
+            provider or "(none)": {"entries": count, "bytes": size}
+            for provider, count, size in conn.execute(
+                "SELECT provider, COUNT(*), SUM(size) FROM entries GROUP BY provider ORDER BY provider"
+            )
+        }
+        expired = conn.execute(
+            "SELECT COUNT(*) FROM entries WHERE ttl IS NOT NULL AND created_at + ttl < ?", (time.time(),)
+        ).fetchone()[0]
+        try:
+            file_bytes = self.path.stat().st_size
+        except OSError:
+            file_bytes = 0
+        return {
+            "backend": self.name,
+            "path": str(self.path),
+            "entries": sum(p["entries"] for p in providers.values()),
+            "bytes": sum(p["bytes"] for p in providers.values()),
+            "file_bytes": file_bytes,
+            "max_bytes": self.max_bytes,
+            "expired": expired,
+            "providers": providers,
+        }
+
+    def gc(self, max_bytes: Optional[int] = None) -> Dict[str, int]:
+        """Drop expired entries and legacy JSON files, then evict to the size cap."""
+        conn = self._conn()
+        expired = conn.execute(
+            "DELETE FROM entries WHERE ttl IS NOT NULL AND created_at + ttl < ?", (time.time(),)
+        ).rowcount
+        # Legacy per-key JSON files age out on the file backend's own schedule
+        expired += FileBackend().gc()["expired"]
+        if max_bytes is not None:
+            self.max_bytes = max_bytes
+        evicted = self._evict(conn)
+        conn.execute("VACUUM")
+        return {"expired": expired, "evicted": evicted}
+
+
+class MemoryTier:
+    """In-process LRU in front of another backend, for long-running processes.
+
+    Entries are kept as their JSON text (each get decodes a fresh copy, so
+    callers may mutate what they get back) along with their created_at, so
+    TTL policies see the same ages as the backend. Writes go through to
+    the backend; another process's newer write is only picked up once the
+    in-memory copy ages out or is evicted.
+    """
+
+    def __init__(self, backend, max_entries: int = MEMORY_MAX_ENTRIES):
+        self.backend = backend
+        self.name = backend.name
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[str, Tuple[str, float]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _remember(self, cache_key: str, payload: str, created_at: float):
+        with self._lock:
+            self._entries[cache_key] = (payload, created_at)
+            self._entries.move_to_end(cache_key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def get(self, cache_key: str) -> Optional[Tuple[Any, float]]:
+        with self._lock:
+            cached = self._entries.get(cache_key)
+            if cached is not None:
+                self._entries.move_to_end(cache_key)
+        if cached is not None:
+            return json.loads(cached[0]), cached[1]
+        entry = self.backend.get(cache_key)
+        if entry is not None:
+            self._remember(cache_key, json.dumps(entry[0]), entry[1])
+        return entry
+
+    def set(self, cache_key: str, data: Any, ttl_hours: Optional[float] = None):
+        self.backend.set(cache_key, data, ttl_hours)
+        self._remember(cache_key, json.dumps(data), time.time())
+
+    def forget(self, prefix: str = "") -> int:
+        """Drop in-memory entries (all, or those whose key starts with prefix)."""
+        with self._lock:
+            keys = [k for k in self._entries if k.startswith(prefix)]
+            for key in keys:
+                del self._entries[key]
+        return len(keys)
+
+    def clear(self, prefix: str = "") -> int:
+        self.forget(prefix)
+        return self.backend.clear(prefix)
+
+    def stats(self) -> Dict[str, Any]:
+        result = self.backend.stats()
+        result["memory_entries"] = len(self._entries)
+        return result
+
+    def gc(self, max_bytes: Optional[int] = None) -> Dict[str, int]:
+        self.forget()
+        return self.backend.gc(max_bytes)
+
+
+_backend = None
+_backend_lock = threading.Lock()
 
-    if not is_cache_valid(cache_path, ttl_hours):
-        return None
 
+def get_backend():
+    """Return the configured cache backend (created on first use)."""
+    global _backend
+    with _backend_lock:
+        if _backend is None:
+            name = os.environ.get("DATEKIT_CACHE_BACKEND", DEFAULT_BACKEND).lower()
+            if name == "sqlite" and sqlite3 is not None:
+                _backend = SQLiteBackend()
+            else:
+                _backend = FileBackend()
+        return _backend
+
+
+def set_backend(backend):
+    """Override the cache backend (e.g. FileBackend() or SQLiteBackend(path))."""
+    global _backend
+    with _backend_lock:
+        _backend = backend
+
+
+def enable_memory_tier(max_entries: int = MEMORY_MAX_ENTRIES) -> MemoryTier:
+    """Put a MemoryTier in front of the current backend (idempotent)."""
+    backend = get_backend()
+    if not isinstance(backend, MemoryTier):
+        backend = MemoryTier(backend, max_entries)
+        set_backend(backend)
+    return backend
+
+
+def forget_memory(prefix: str = "") -> int:
+    """Drop this process's in-memory entries, if a MemoryTier is enabled."""
+    backend = _backend
+    return backend.forget(prefix) if isinstance(backend, MemoryTier) else 0
+
+
+def _trace_lookup(cache_key: str, result: str, entry: Optional[Tuple[Any, float]], started: float):
+    if trace.active():
+        trace.record("cache", result=result, key=cache_key, provider=get_provider(cache_key),
+                     age_hours=round((time.time() - entry[1]) / 3600, 3) if entry else None,
+                     ms=round((time.perf_counter() - started) * 1000, 3))
+
+
+def load_cache(cache_key: str, ttl_hours: int = DEFAULT_TTL_HOURS) -> Optional[dict]:
+    """Load data from cache if valid."""
+    started = time.perf_counter()
     try:
-        with open(cache_path, 'r') as f:
-            return json.load(f)
-    except (json.JSONDecodeError, OSError):
+        entry = get_backend().get(cache_key)
+    except Exception:
+        return None  # Cache trouble should never break a fetch
+    if entry is None:
+        _trace_lookup(cache_key, "miss", None, started)
         return None
 
+    data, created_at = entry
+    age_hours = (time.time() - created_at) / 3600
+    if age_hours >= ttl_hours:
+        _trace_lookup(cache_key, "expired", entry, started)
+        return None
+    _trace_lookup(cache_key, "hit", entry, started)
+    return data
 
-def save_cache(cache_key: str, data: dict):
-    """Save data to cache."""
-    ensure_cache_dir()
-    cache_path = get_cache_path(cache_key)
 
+def save_cache(cache_key: str, data: dict, ttl_hours: Optional[float] = None):
+    """Save data to cache. ttl_hours is recorded so gc can expire the entry."""
     try:
-        with open(cache_path, 'w') as f:
-            json.dump(data, f)
-    except OSError:
+        get_backend().set(cache_key, data, ttl_hours)
+    except Exception:
         pass  # Silently fail on cache write errors
 
 
-def clear_cache():
-    """Clear all cache files."""
-    if CACHE_DIR.exists():
-        for f in CACHE_DIR.glob("*.json"):
+def clear_cache(prefix: str = ""):
+    """Clear cache entries, optionally only those for one provider (e.g. "tm-")."""
+    try:
+        return get_backend().clear(prefix)
+    except Exception:
+        return 0
+
+
+def cache_stats() -> Dict[str, Any]:
+    """Summarize cache contents per provider."""
+    return get_backend().stats()
+
+
+def gc_cache(max_bytes: Optional[int] = None) -> Dict[str, int]:
+    """Expire stale entries, evict down to the size cap and prune unused lock files."""
+    result = get_backend().gc(max_bytes)
+    cutoff = time.time() - 3600
+    if LOCK_DIR.exists():
+        for f in LOCK_DIR.glob("*.lock"):
             try:
-                f.unlink()
+                if f.stat().st_mtime < cutoff:
+                    prune_lock(f)  # Skips locks that are held
             except OSError:
                 pass
+    return result
+
+
+def get_policy(cache_key: str) -> TTLPolicy:
+    """TTL policy for a cache key, by provider prefix."""
+    return POLICIES.get(get_provider(cache_key), DEFAULT_POLICY)
+
+
+_revalidate_mode = "thread"
+_revalidate_mode_pinned = False
+_refreshing: set = set()
+_refresh_lock = threading.Lock()
+_pending_refreshes: Dict[str, Dict[str, Any]] = {}
+_stale_reads = threading.local()
+
+
+def set_revalidate_mode(mode: str, pin: bool = False):
+    """Choose how stale entries are refreshed in the background.
+
+    "thread" (default) refreshes in a daemon thread, which suits
+    long-running processes. "process" hands the stale keys to a detached
+    lib.revalidate worker when this process exits, so short-lived CLI runs
+    can print and exit without waiting for (or killing) the refresh. Only
+    the stale keys are refetched, from their RefreshSpec; keys without one
+    fall back to a thread.
+
+    pin=True fixes the mode for the rest of the process: the daemon pins
+    "thread" so the scripts it runs can't switch it to "process".
+    """
+    global _revalidate_mode, _revalidate_mode_pinned
+    if _revalidate_mode_pinned:
+        return
+    _revalidate_mode = mode
+    _revalidate_mode_pinned = pin
+
+
+def _spawn_revalidation():
+    """Start a detached lib.revalidate worker for the keys queued by this process."""
+    with _refresh_lock:
+        specs = list(_pending_refreshes.values())
+        _pending_refreshes.clear()
+    if not specs:
+        return
+    env = dict(os.environ)
+    # One profile or trace per command the user ran, not per refresh
+    for name in ("DATEKIT_PROFILE", "DATEKIT_TRACE"):
+        env.pop(name, None)
+    try:
+        worker = subprocess.Popen(
+            [sys.executable, "-m", "lib.revalidate"],
+            cwd=str(Path(__file__).parent.parent),
+            env=env,
+            stdin=subprocess.PIPE,
+            stdout=subprocess.DEVNULL,
+            stderr=subprocess.DEVNULL,
+            start_new_session=True,
+        )
+        with worker.stdin:
+            worker.stdin.write(json.dumps(specs).encode())
+    except OSError:
+        pass
+
+
+def _refresh_in_background(cache_key: str, fetch: Callable[[], Any], policy: TTLPolicy,
+                           refresh: Optional[RefreshSpec] = None):
+    if _revalidate_mode == "process" and refresh is not None:
+        with _refresh_lock:
+            if not _pending_refreshes:
+                atexit.register(_spawn_revalidation)
+            _pending_refreshes[cache_key] = {"key": cache_key, "ttl_hours": policy.hard_hours,
+                                             **refresh._asdict()}
+        return
+
+    with _refresh_lock:
+        if cache_key in _refreshing:
+            return
+        _refreshing.add(cache_key)
+
+    def refresh():
+        try:
+            # Skip if another thread or process is already fetching this key
+            with key_lock(cache_key, timeout=0) as locked:
+                if locked:
+                    save_cache(cache_key, fetch(), ttl_hours=policy.hard_hours)
+        except Exception:
+            pass  # Keep serving the stale copy; the next lookup retries
+        finally:
+            with _refresh_lock:
+                _refreshing.discard(cache_key)
+
+    threading.Thread(target=refresh, daemon=True).start()
+
+
+@contextmanager
+def note_stale_reads() -> Iterator[Dict[str, int]]:
+    """Count cached_fetch calls in this thread answered with data past its soft TTL.
+
+    That covers entries served while they refresh in the background as
+    well as fallbacks after a failed fetch. Callers that must not mistake
+    old data for the current state (the watchlist diff) check the count.
+    """
+    counter = {"stale": 0}
+    previous = getattr(_stale_reads, "counter", None)
+    _stale_reads.counter = counter
+    try:
+        yield counter
+    finally:
+        _stale_reads.counter = previous
+
+
+def _note_stale():
+    counter = getattr(_stale_reads, "counter", None)
+    if counter is not None:
+        counter["stale"] += 1
+
+
+def _lock_path(cache_key: str) -> Path:
+    return LOCK_DIR / f"{cache_key}.lock"
+
+
+def key_lock(cache_key: str, timeout: Optional[float] = SINGLE_FLIGHT_TIMEOUT):
+    """Per-key cross-process lock for single-flight updates (see locks.file_lock)."""
+    return file_lock(_lock_path(cache_key), timeout=timeout)
+
+
+def _read_entry(cache_key: str) -> Optional[Tuple[Any, float]]:
+    try:
+        return get_backend().get(cache_key)
+    except Exception:
+        return None  # Cache trouble should never break a fetch
+
+
+def cached_fetch(cache_key: str, fetch: Callable[[], Any], policy: Optional[TTLPolicy] = None,
+                 refresh: Optional[RefreshSpec] = None) -> Any:
+    """Return cached data for cache_key, calling fetch() when needed.
+
+    - Younger than the soft TTL: returned as-is.
+    - Between soft and hard TTL: returned immediately; fetch() runs in the
+      background to refresh the entry (in "process" mode, refresh runs in a
+      worker instead; see set_revalidate_mode).
+    - Missing or past the hard TTL: fetch() runs now, under a per-key
+      lock. Callers that find the lock held wait and then reuse the
+      winner's result. If fetch() raises and a cached copy of any age
+      exists, that copy is returned with "stale": true; otherwise the
+      exception propagates.
+    """
+    policy = policy or get_policy(cache_key)
+    started = time.perf_counter()
+
+    def usable(entry: Optional[Tuple[Any, float]]) -> bool:
+        if entry is None:
+            return False
+        age_hours = (time.time() - entry[1]) / 3600
+        return age_hours < policy.soft_hours
+
+    entry = _read_entry(cache_key)
+    if usable(entry):
+        _trace_lookup(cache_key, "hit", entry, started)
+        return entry[0]
+    if entry is not None:
+        if (time.time() - entry[1]) / 3600 < policy.hard_hours:
+            _refresh_in_background(cache_key, fetch, policy, refresh)
+            _trace_lookup(cache_key, "stale", entry, started)
+            _note_stale()
+            return entry[0]
+
+    with key_lock(cache_key):
+        # Whoever held the lock may have just filled the entry
+        latest = _read_entry(cache_key)
+        if usable(latest):
+            _trace_lookup(cache_key, "hit", latest, started)
+            return latest[0]
+        entry = latest or entry
+
+        try:
+            result = fetch()
+        except Exception:
+            if entry is None:
+                raise
+            stale = dict(entry[0]) if isinstance(entry[0], dict) else {"data": entry[0]}
+            stale["stale"] = True
+            stale["stale_age_hours"] = round((time.time() - entry[1]) / 3600, 2)
+            _trace_lookup(cache_key, "fallback", entry, started)
+            _note_stale()
+            return stale
+
+        save_cache(cache_key, result, ttl_hours=policy.hard_hours)
+        _trace_lookup(cache_key, "miss", entry, started)
+        return result
@@ -0,0 +1,85 @@
+"""Persistent keep-alive connection pool for date-planner (stdlib only).
+
+Keeps idle http.client connections per (scheme, host, port) so repeated
+calls to the same API skip the TCP and TLS handshakes.
+"""
+
+import http.client
+import ssl
+import threading
+import time
+from collections import deque
+from typing import Deque, Dict, Optional, Tuple
+
+MAX_IDLE_PER_HOST = 4
+IDLE_TIMEOUT = 30.0  # Seconds an idle connection is kept before being dropped
+
+# Errors that mean a reused keep-alive connection was closed by the server
+STALE_ERRORS = (
+    http.client.RemoteDisconnected,
+    http.client.BadStatusLine,
+    ConnectionResetError,
+    BrokenPipeError,
+    ConnectionAbortedError,
+)
+
+PoolKey = Tuple[str, str, int]
+
+
+class ConnectionPool:
+    """Per-host pool of idle keep-alive connections."""
+
+    def __init__(self, max_idle_per_host: int = MAX_IDLE_PER_HOST, idle_timeout: float = IDLE_TIMEOUT):
+        self.max_idle_per_host = max_idle_per_host
+        self.idle_timeout = idle_timeout
+        self._idle: Dict[PoolKey, Deque[Tuple[http.client.HTTPConnection, float]]] = {}
+        self._lock = threading.Lock()
+        self._ssl_context: Optional[ssl.SSLContext] = None
+
+    def acquire(self, scheme: str, host: str, port: Optional[int], timeout: float) -> Tuple[PoolKey, http.client.HTTPConnection, bool]:
+        """Get a connection for the host.
+
+        Returns (key, connection, reused). Idle connections past
+        idle_timeout are closed rather than handed out.
+        """
+        key = (scheme, host, port or (443 if scheme == "https" else 80))
+        now = time.monotonic()
+        with self._lock:
+            idle = self._idle.get(key)
+            while idle:
+                conn, last_used = idle.pop()
+                if now - last_used < self.idle_timeout:
+                    conn.timeout = timeout
+                    if conn.sock is not None:
+                        conn.sock.settimeout(timeout)
+                    return key, conn, True
+                conn.close()
+        return key, self._connect(key, timeout), False
+
+    def release(self, key: PoolKey, conn: http.client.HTTPConnection, reusable: bool = True):
+        """Return a connection to the pool, or close it if it can't be reused."""
+        if not reusable or conn.sock is None:
+            conn.close()
+            return
+        with self._lock:
+            idle = self._idle.setdefault(key, deque())
+            if len(idle) >= self.max_idle_per_host:
+                conn.close()
+                return
+            idle.append((conn, time.monotonic()))
+
+    def close(self):
+        """Close every idle connection."""
+        with self._lock:
+            for idle in self._idle.values():
+                for conn, _ in idle:
+                    conn.close()
+            self._idle.clear()
+
+    def _connect(self, key: PoolKey, timeout: float) -> http.client.HTTPConnection:
+        scheme, host, port = key
+        if scheme == "https":
+            if self._ssl_context is None:
+                self._ssl_context = ssl.create_default_context()
+            return http.client.HTTPSConnection(host, port, timeout=timeout, context=self._ssl_context)
+        return http.client.HTTPConnection(host, port, timeout=timeout)
@@ -0,0 +1,360 @@
+"""Warm daemon for date-planner scripts, served over a local Unix socket.
+
+`datekit.py serve` imports the fetch scripts once and keeps what they load
+warm between runs: config and preferences (lib.env), the venue index, an
+in-memory cache tier (lib.cache.MemoryTier) and lib.http's keep-alive
+connections. The scripts stay runnable as before but act as thin clients:
+exit_if_served() forwards their argv to the daemon and replays its output,
+and when no daemon is listening they run in-process as usual. Each
+checkout gets its own socket (keyed by its scripts directory), so a
+client never reaches a daemon running another clone's code and data.
+
+Protocol: one JSON request line per connection, either
+{"script": "fetch_events.py", "argv": [...]} or {"command": "ping" |
+"stop" | "forget"}. A script's output streams back as JSON lines
+{"out": text} / {"err": text}, ending with {"exit": code}.
+
+Scripts run with the environment the daemon was started with. Set
+DATEKIT_DAEMON=0 to make a script ignore the daemon. Profiled runs
+(--profile or DATEKIT_PROFILE) are declined and run in-process: the
+profilers are process-wide and would cover every concurrent run.
+"""
+
+import hashlib
+import json
+import os
+import socket
+import sys
+import threading
+import time
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional
+
+SCRIPTS = ("fetch_events.py", "fetch_classes.py", "fetch_venues.py")
+SCRIPTS_DIR = Path(__file__).resolve().parent.parent
+# One daemon per checkout: it runs its own scripts against its own data/.
+# Under lib.cache.CACHE_DIR; not imported from there so clients stay light.
+SOCKET_PATH = (Path.home() / ".cache" / "datekit"
+               / f"daemon-{hashlib.sha1(str(SCRIPTS_DIR).encode()).hexdigest()[:12]}.sock")
+CONNECT_TIMEOUT = 0.5
+DEFAULT_IDLE_MINUTES = 60  # Exit after this long without requests (0: never)
+
+
+# --- Client -------------------------------------------------------------
+
+class _LocalOutputError(Exception):
+    """Writing the daemon's output to our own stdout/stderr failed."""
+
+
+def _disabled() -> bool:
+    if os.environ.get("DATEKIT_DAEMON", "1").lower() in ("0", "false", "no"):
+        return True
+    # Profile this process, not the daemon
+    return bool(os.environ.get("DATEKIT_PROFILE"))
+
+
+def _profiled(argv: List[str]) -> bool:
+    """Whether a run asks for lib.profiling (which can't be confined to one run)."""
+    if os.environ.get("DATEKIT_PROFILE"):
+        return True
+    return any(arg == "--profile" or arg.startswith("--profile=") for arg in argv)
+
+
+def _connect(path: Path = SOCKET_PATH) -> Optional[socket.socket]:
+    if not path.exists():
+        return None
+    sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    sock.settimeout(CONNECT_TIMEOUT)
+    try:
+        sock.connect(str(path))
+    except OSError:
+        sock.close()
+        return None  # Stale socket file: the daemon is gone
+    sock.settimeout(None)
+    return sock
+
+
+def call(command: str, path: Path = SOCKET_PATH, **params) -> Optional[Dict[str, Any]]:
+    """Send a control command to the daemon. Returns its reply, or None if none is running."""
+    sock = _connect(path)
+    if sock is None:
+        return None
+    try:
+        with sock, sock.makefile("rb") as reader:
+            sock.sendall(json.dumps({"command": command, **params}).encode() + b"\n")
+            line = reader.readline()
+        return json.loads(line) if line else None
+    except (OSError, ValueError):
+        return None
+
+
+def forward(script: str, argv: List[str], path: Path = SOCKET_PATH) -> Optional[int]:
+    """Run script in the daemon, writing its output to this process's stdout/stderr.
+
+    Returns the script's exit code, or None when no daemon took the run (the
+    caller then runs it in-process).
+    """
+    if _disabled():
+        return None
+    sock = _connect(path)
+    if sock is None:
+        return None
+
+    replied = False
+    try:
+        with sock, sock.makefile("rb") as reader:
+            sock.sendall(json.dumps({"script": script, "argv": argv}).encode() + b"\n")
+            for line in reader:
+                frame = json.loads(line)
+                if "exit" in frame:
+                    return frame["exit"]
+                if "declined" in frame:
+                    return None
+                replied = True
+                try:
+                    if "out" in frame:
+                        sys.stdout.write(frame["out"])
+                    else:
+                        sys.stderr.write(frame.get("err", ""))
+                except OSError as e:
+                    raise _LocalOutputError from e
+    except KeyboardInterrupt:
+        return 130  # Closing the socket stops the run in the daemon
+    except _LocalOutputError as e:
+        raise e.__cause__  # e.g. stdout piped into `head`: fail as an in-process run would
+    except (OSError, ValueError):
+        pass
+    if not replied:
+        return None  # Daemon went away before starting: run here instead
+    print("datekit daemon: connection lost", file=sys.stderr)
+    return 1
+
+
+def exit_if_served(script_path: str):
+    """Thin-client entry point: hand this run to the daemon if one is up."""
+    code = forward(Path(script_path).name, sys.argv[1:])
+    if code is not None:
+        sys.stdout.flush()
+        sys.exit(code)
+
+
+# --- Server -------------------------------------------------------------
+
+_local = threading.local()
+
+
+class _Redirect:
+    """Stands in for sys.stdout/sys.stderr; routes a request thread's writes to its client."""
+
+    def __init__(self, stream, channel: str):
+        self._stream = stream
+        self._channel = channel
+
+    def write(self, text: str) -> int:
+        session = getattr(_local, "session", None)
+        if session is None:
+            return self._stream.write(text)
+        session.write(self._channel, text)
+        return len(text)
+
+    def flush(self):
+        session = getattr(_local, "session", None)
+        if session is None:
+            self._stream.flush()
+        else:
+            session.flush()
+
+    def isatty(self) -> bool:
+        return False
+
+    def __getattr__(self, name: str):
+        return getattr(self._stream, name)
+
+
+class _Session:
+    """One client connection: buffers a script's output into line-sized frames."""
+
+    def __init__(self, wfile):
+        self._wfile = wfile
+        self._buffers: Dict[str, List[str]] = {"out": [], "err": []}
+        self._lock = threading.Lock()
+        self.broken = False
+
+    def send(self, frame: Dict[str, Any]):
+        with self._lock:
+            if self.broken:
+                raise BrokenPipeError("datekit client disconnected")
+            try:
+                self._wfile.write(json.dumps(frame).encode() + b"\n")
+                self._wfile.flush()
+            except OSError:
+                self.broken = True
+                raise
+
+    def write(self, channel: str, text: str):
+        buffer = self._buffers[channel]
+        buffer.append(text)
+        if "\n" in text:
+            self._flush_channel(channel)
+
+    def _flush_channel(self, channel: str):
+        buffer = self._buffers[channel]
+        if buffer:
+            text = "".join(buffer)
+            buffer.clear()
+            self.send({channel: text})
+
+    def flush(self):
+        for channel in self._buffers:
+            self._flush_channel(channel)
+
+
+def _exit_code(code: Any, session: _Session) -> int:
+    """Map SystemExit.code to a process exit code, as the interpreter would."""
+    if code is None:
+        return 0
+    if isinstance(code, int):
+        return code
+    session.write("err", f"{code}\n")
+    return 1
+
+
+def _warm(modules: Dict[str, Any]):
+    """Load what the scripts would otherwise load on every run."""
+    from . import cache, env, venue_index
+
+    # Stale entries refresh in this long-lived process, not in a worker
+    cache.set_revalidate_mode("thread", pin=True)
+    cache.enable_memory_tier()
+    env.get_config()
+    env.get_city()
+    venues_file = getattr(modules.get("fetch_events.py"), "VENUES_FILE", None)
+    if venues_file is not None and Path(venues_file).exists():
+        venue_index.open_index(venues_file)
+
+
+def serve(path: Path = SOCKET_PATH, idle_minutes: float = DEFAULT_IDLE_MINUTES,
+          log: Callable[[str], None] = lambda msg: print(msg, file=sys.stderr)) -> int:
+    """Run the daemon in the foreground until stopped. Returns an exit code."""
+    import importlib
+    import signal
+    import socketserver
+    import traceback
+
+    from . import cache
+
+    if call("ping", path) is not None:
+        log(f"datekit daemon already running on {path}")
+        return 1
+
+    if str(SCRIPTS_DIR) not in sys.path:
+        sys.path.insert(0, str(SCRIPTS_DIR))
+    modules = {name: importlib.import_module(Path(name).stem) for name in SCRIPTS}
+    _warm(modules)
+
+    started = time.time()
+    stats = {"requests": 0, "active": 0, "last_activity": time.monotonic()}
+    stats_lock = threading.Lock()
+
+    class Handler(socketserver.StreamRequestHandler):
+        def handle(self):
+            try:
+                request = json.loads(self.rfile.readline())
+            except ValueError:
+                return
+            session = _Session(self.wfile)
+            with stats_lock:
+                stats["requests"] += 1
+                stats["active"] += 1
+                stats["last_activity"] = time.monotonic()
+            try:
+                if "command" in request:
+                    session.send(handle_command(request))
+                    return
+                module = modules.get(request.get("script"))
+                if module is None:
+                    session.send({"declined": f"{request.get('script')} is not served by the daemon"})
+                    return
+                if _profiled(request.get("argv") or []):
+                    session.send({"declined": "profiled runs are not served by the daemon"})
+                    return
+                session.send({"exit": run_script(module, request.get("argv") or [], session)})
+            except OSError:
+                pass  # Client went away
+            finally:
+                with stats_lock:
+                    stats["active"] -= 1
+                    stats["last_activity"] = time.monotonic()
+
+    def run_script(module, argv: List[str], session: _Session) -> int:
+        _local.session = session
+        try:
+            module.main(argv)
+            code = 0
+        except SystemExit as e:
+            code = _exit_code(e.code, session)
+        except Exception:
+            if session.broken:
+                raise BrokenPipeError("datekit client disconnected")
+            session.write("err", traceback.format_exc())
+            code = 1
+        finally:
+            _local.session = None
+        session.flush()
+        return code
+
+    def handle_command(request: Dict[str, Any]) -> Dict[str, Any]:
+        command = request["command"]
+        if command == "ping":
+            return {
+                "pid": os.getpid(),
+                "socket": str(path),
+                "scripts_dir": str(SCRIPTS_DIR),
+                "uptime": round(time.time() - started, 1),
+                "requests": stats["requests"],
+                "scripts": list(SCRIPTS),
+            }
+        if command == "stop":
+            threading.Thread(target=server.shutdown, daemon=True).start()
+            return {"stopping": True}
+        if command == "forget":
+            return {"forgotten": cache.forget_memory(request.get("prefix", ""))}
+        return {"error": f"Unknown command: {command}"}
+
+    class Server(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+        daemon_threads = True
+
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.unlink(missing_ok=True)
+    old_umask = os.umask(0o177)  # Socket is for this user only
+    try:
+        server = Server(str(path), Handler)
+    finally:
+        os.umask(old_umask)
+
+    def watch_idle():
+        while True:
+            time.sleep(min(30.0, idle_minutes * 60))
+            with stats_lock:
+                idle = not stats["active"] and time.monotonic() - stats["last_activity"] >= idle_minutes * 60
+            if idle:
+                log(f"datekit daemon idle for {idle_minutes:g} min; exiting")
+                server.shutdown()
+                return
+
+    if idle_minutes:
+        threading.Thread(target=watch_idle, daemon=True).start()
+    signal.signal(signal.SIGTERM, lambda *_: threading.Thread(target=server.shutdown, daemon=True).start())
+
+    sys.stdout = _Redirect(sys.stdout, "out")
+    sys.stderr = _Redirect(sys.stderr, "err")
+    log(f"datekit daemon serving {', '.join(SCRIPTS)} on {path} (pid {os.getpid()})")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        path.unlink(missing_ok=True)
+        sys.stdout, sys.stderr = sys.stdout._stream, sys.stderr._stream
+    return 0
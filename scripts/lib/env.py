@@ -2,11 +2,39 @@
 
 import json
 import os
+import threading
 from pathlib import Path
-from typing import Optional, Dict, Any
+from typing import Any, Callable, Dict, Optional, Tuple
 
 CONFIG_DIR = Path.home() / ".config" / "datekit"
 CONFIG_FILE = CONFIG_DIR / ".env"
+PREFERENCES_FILE = Path(__file__).parent.parent.parent / "data" / "preferences.json"
+
+# Parsed files keyed by path, reused until the file's mtime or size changes
+_file_cache: Dict[Path, Tuple[Optional[Tuple[int, int]], Any]] = {}
+_file_cache_lock = threading.Lock()
+
+
+def _read_cached(path: Path, load: Callable[[Path], Any]) -> Any:
+    """Return load(path), re-running it only when the file has changed.
+
+    A long-running process (the `datekit.py serve` daemon) calls get_config
+    and get_city on every request; this makes those a stat() instead of a
+    re-parse, while still picking up edits.
+    """
+    try:
+        st = path.stat()
+        stamp = (st.st_mtime_ns, st.st_size)
+    except OSError:
+        stamp = None
+    with _file_cache_lock:
+        cached = _file_cache.get(path)
+        if cached is not None and cached[0] == stamp:
+            return cached[1]
+    value = load(path)
+    with _file_cache_lock:
+        _file_cache[path] = (stamp, value)
+    return value
 
 
 def load_env_file(path: Path) -> Dict[str, str]:
@@ -34,20 +62,21 @@ def load_env_file(path: Path) -> Dict[str, str]:
 
 def get_config() -> Dict[str, Any]:
     """Load configuration from ~/.config/datekit/.env and environment."""
-    file_env = load_env_file(CONFIG_FILE)
+    file_env = _read_cached(CONFIG_FILE, load_env_file)
 
     # Environment variables override file
     config = {
         'TICKETMASTER_API_KEY': os.environ.get('TICKETMASTER_API_KEY') or file_env.get('TICKETMASTER_API_KEY'),
         'GOOGLE_PLACES_API_KEY': os.environ.get('GOOGLE_PLACES_API_KEY') or file_env.get('GOOGLE_PLACES_API_KEY'),
+        # Optional requests/second overrides for lib.ratelimit
+        'TICKETMASTER_RATE_LIMIT': os.environ.get('TICKETMASTER_RATE_LIMIT') or file_env.get('TICKETMASTER_RATE_LIMIT'),
+        'GOOGLE_PLACES_RATE_LIMIT': os.environ.get('GOOGLE_PLACES_RATE_LIMIT') or file_env.get('GOOGLE_PLACES_RATE_LIMIT'),
     }
 
     return config
 
 
-def get_city() -> Optional[str]:
-    """Read city from data/preferences.json."""
-    prefs_path = Path(__file__).parent.parent.parent / "data" / "preferences.json"
+def _load_city(prefs_path: Path) -> Optional[str]:
     if not prefs_path.exists():
         return None
     try:
@@ -58,6 +87,11 @@ def get_city() -> Optional[str]:
         return None
 
 
+def get_city() -> Optional[str]:
+    """Read city from data/preferences.json."""
+    return _read_cached(PREFERENCES_FILE, _load_city)
+
+
 def config_exists() -> bool:
     """Check if configuration file exists."""
     return CONFIG_FILE.exists()
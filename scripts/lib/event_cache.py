@@ -0,0 +1,215 @@
+"""Date-range-aware event cache for date-planner.
+
+Events are cached per query scope (provider plus venue/classification/
+city filters), not per exact date window. Each scope entry holds the
+events seen so far and the date intervals they cover:
+
+    {"intervals": [{"start": "2026-03-01", "end": "2026-03-30", "fetched_at": 1700000000.0}],
+     "events": [{..., "date": "2026-03-02"}, ...],
+     "totals": {"2026-03-01|2026-03-30": {"total": 1500, "fetched_at": 1700000000.0}}}
+
+A query for any window inside the covered intervals is answered by
+filtering; only the uncovered gaps are fetched. So a cached 30-day venue
+lookup also answers a 7-day one, and tomorrow's query only fetches the
+new last day.
+
+With a limit, fetching stops once the first `limit` events of the window
+are known. A gap fetched only in part (for that reason, or because of the
+API's deep-paging cap) is recorded as covered up to the day before its
+last fetched event, so the next query picks up from there. The API's
+count for a window that is not fully covered is kept in "totals"; for
+a new window, the days it lacks are counted with a minimal request.
+"""
+
+import time
+from datetime import date, timedelta
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from . import cache
+
+# fetch_range(start, end, max_events) -> (events, total): events sorted by
+# date from the start of the range, at least max_events of them if there
+# are that many (None = all; 0 = just count), and the API's total for the
+# whole range.
+FetchRange = Callable[[str, str, Optional[int]], Tuple[List[Dict], int]]
+
+
+def _day(value: str) -> date:
+    return date.fromisoformat(value)
+
+
+def _day_before(value: str) -> str:
+    return (_day(value) - timedelta(days=1)).isoformat()
+
+
+def find_gaps(start: str, end: str, intervals: List[Dict]) -> List[Tuple[str, str]]:
+    """Return the sub-ranges of [start, end] (inclusive days) not covered by intervals."""
+    gaps = []
+    cursor = _day(start)
+    last = _day(end)
+    for iv in sorted(intervals, key=lambda iv: iv["start"]):
+        iv_start, iv_end = _day(iv["start"]), _day(iv["end"])
+        if iv_end < cursor:
+            continue
+        if iv_start > last:
+            break
+        if iv_start > cursor:
+            gaps.append((cursor.isoformat(), (iv_start - timedelta(days=1)).isoformat()))
+        cursor = max(cursor, iv_end + timedelta(days=1))
+        if cursor > last:
+            break
+    if cursor <= last:
+        gaps.append((cursor.isoformat(), last.isoformat()))
+    return gaps
+
+
+def _in_range(event: Dict, start: str, end: str) -> bool:
+    event_date = event.get("date")
+    return bool(event_date) and start <= event_date <= end
+
+
+def _prune(entry: Dict[str, Any], max_age_seconds: float):
+    """Drop past events and intervals, and intervals or totals too old to trust."""
+    today = date.today().isoformat()
+    now = time.time()
+    entry["intervals"] = [
+        iv for iv in entry["intervals"]
+        if iv["end"] >= today and now - iv["fetched_at"] < max_age_seconds
+    ]
+    entry["events"] = [ev for ev in entry["events"] if (ev.get("date") or "") >= today]
+    entry["totals"] = {
+        window: t for window, t in entry.get("totals", {}).items()
+        if window.split("|")[1] >= today and now - t["fetched_at"] < max_age_seconds
+    }
+
+
+def _window_total(
+    entry: Dict[str, Any],
+    start: str,
+    end: str,
+    gaps: List[Tuple[str, str]],
+    gap_totals: Dict[Tuple[str, str], int],
+    fetch_range: FetchRange,
+) -> Optional[int]:
+    """Count [start, end] for a query that did not fetch all its gaps (records it in entry["totals"]).
+
+    gaps are the days to count with the API (gap_totals has those already
+    fetched); events on other days are counted from the cache.
+    """
+    window = f"{start}|{end}"
+    totals = entry.setdefault("totals", {})
+    missing = [gap for gap in gaps if gap not in gap_totals]
+    if missing and window in totals:
+        return totals[window]["total"]
+    try:
+        for gap_start, gap_end in missing:
+            gap_totals[(gap_start, gap_end)] = fetch_range(gap_start, gap_end, 0)[1]
+    except Exception:
+        return totals[window]["total"] if window in totals else None
+    # API counts for the gaps, plus the cached events on the covered days
+    total = sum(gap_totals.values()) + sum(
+        1 for ev in entry["events"]
+        if _in_range(ev, start, end) and not any(_in_range(ev, a, b) for a, b in gaps)
+    )
+    totals[window] = {"total": total, "fetched_at": time.time()}
+    return total
+
+
+def range_query(
+    scope_key: str,
+    start: str,
+    end: str,
+    fetch_range: FetchRange,
+    policy: Optional[cache.TTLPolicy] = None,
+    limit: Optional[int] = None,
+) -> Dict[str, Any]:
+    """Return {"events": [...], "total": n} for [start, end], fetching only uncovered gaps.
+
+    Intervals younger than the policy's soft TTL count as covered. Events
+    from older intervals (up to the hard TTL) are kept only as a fallback:
+    if fetching a gap fails they are served with "stale": true. If a gap
+    fails with nothing cached for it, the error propagates.
+
+    With limit, gaps are fetched in date order only until the first limit
+    events of the window are known, and the events returned stop there.
+    total is the number of events in the whole window: counted when it is
+    all covered, else the API's count (gaps left unfetched are counted
+    with fetch_range(..., 0) unless an earlier query already knows the
+    window's total), else the number found.
+
+    Events come back sorted by date and time.
+    """
+    policy = policy or cache.get_policy(scope_key)
+    soft_seconds = policy.soft_hours * 3600
+
+    with cache.key_lock(scope_key):
+        entry = cache.load_cache(scope_key, ttl_hours=policy.hard_hours) or {"intervals": [], "events": []}
+        _prune(entry, policy.hard_hours * 3600)
+
+        now = time.time()
+        fresh = [iv for iv in entry["intervals"] if now - iv["fetched_at"] < soft_seconds]
+        gaps = find_gaps(start, end, fresh)
+
+        stale = False
+        changed = False
+        cut = None  # Last day the answer is complete through, when short of end
+        gap_totals: Dict[Tuple[str, str], int] = {}  # API count per fetched gap
+        fallback: List[Tuple[str, str]] = []  # Gaps answered from older coverage
+        try:
+            for gap_start, gap_end in gaps:
+                need = None
+                if limit is not None:
+                    need = limit - sum(1 for ev in entry["events"] if _in_range(ev, start, _day_before(gap_start)))
+                    if need <= 0:
+                        cut = _day_before(gap_start)
+                        break
+                try:
+                    events, gap_total = fetch_range(gap_start, gap_end, need)
+                except Exception:
+                    # Fall back to older (past soft TTL) coverage of this gap, if any
+                    if find_gaps(gap_start, gap_end, entry["intervals"]) == [(gap_start, gap_end)]:
+                        raise
+                    stale = True
+                    fallback.append((gap_start, gap_end))
+                    continue
+
+                changed = True
+                gap_totals[(gap_start, gap_end)] = gap_total
+                events = [ev for ev in events if _in_range(ev, gap_start, gap_end)]
+                # Fetched through `last`; older events past it stay as a fallback
+                last = gap_end
+                if len(events) < gap_total:
+                    last = max(ev["date"] for ev in events) if events else _day_before(gap_start)
+                entry["events"] = [ev for ev in entry["events"] if not _in_range(ev, gap_start, last)]
+                entry["events"].extend(events)
+                # Older intervals overlapping the refetched days no longer describe their events
+                entry["intervals"] = [
+                    iv for iv in entry["intervals"]
+                    if iv["end"] < gap_start or iv["start"] > last
+                ]
+                # A partial fetch may stop partway through its last day
+                covered = gap_end if last == gap_end else _day_before(last)
+                if covered >= gap_start:
+                    entry["intervals"].append({"start": gap_start, "end": covered, "fetched_at": time.time()})
+                if last != gap_end:
+                    cut = last
+                    break
+
+            total = None
+            if cut is not None or stale:
+                unfetched = [gap for gap in gaps if gap not in fallback]
+                total = _window_total(entry, start, end, unfetched, gap_totals, fetch_range)
+                changed = True
+        finally:
+            # Keep gaps that did succeed even if a later one raised
+            if changed:
+                cache.save_cache(scope_key, entry, ttl_hours=policy.hard_hours)
+
+    events = sorted(
+        (ev for ev in entry["events"] if _in_range(ev, start, cut or end)),
+        key=lambda ev: (ev.get("date") or "", ev.get("time") or ""),
+    )
+    result: Dict[str, Any] = {"events": events, "total": max(total or 0, len(events))}
+    if stale:
+        result["stale"] = True
+    return result
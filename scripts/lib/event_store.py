@@ -0,0 +1,236 @@
+"""Local indexed event store for date-planner.
+
+Every Ticketmaster event the client parses is upserted into a SQLite
+database (~/.cache/datekit/events.db) indexed by date, venue, city,
+segment, genre and price (text columns stored lowercased so equality
+lookups stay indexed). query() answers category, venue, artist and
+date-range lookups from it without touching the network.
+"""
+
+import json
+import threading
+import time
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+try:
+    import sqlite3
+except ImportError:  # Python built without sqlite: store disabled
+    sqlite3 = None
+
+from .cache import CACHE_DIR
+
+STORE_PATH = CACHE_DIR / "events.db"
+
+SCHEMA = """
+    CREATE TABLE IF NOT EXISTS events (
+        id TEXT PRIMARY KEY,
+        name TEXT,
+        date TEXT,
+        time TEXT,
+        venue_id TEXT,
+        venue_name TEXT,
+        city TEXT,
+        state_code TEXT,
+        segment TEXT,
+        genre TEXT,
+        price_min REAL,
+        price_max REAL,
+        search_text TEXT,
+        updated_at REAL NOT NULL,
+        data TEXT NOT NULL
+    );
+    CREATE INDEX IF NOT EXISTS idx_events_date ON events(date);
+    CREATE INDEX IF NOT EXISTS idx_events_venue ON events(venue_id, date);
+    CREATE INDEX IF NOT EXISTS idx_events_city ON events(city, date);
+    CREATE INDEX IF NOT EXISTS idx_events_segment ON events(segment, date);
+    CREATE INDEX IF NOT EXISTS idx_events_genre ON events(genre, date);
+    CREATE INDEX IF NOT EXISTS idx_events_price_min ON events(price_min);
+    CREATE INDEX IF NOT EXISTS idx_events_price_max ON events(price_max);
+"""
+
+_local = threading.local()
+
+
+def _conn(path: Optional[Path] = None) -> "sqlite3.Connection":
+    path = path or STORE_PATH
+    conns = getattr(_local, "conns", None)
+    if conns is None:
+        conns = _local.conns = {}
+    conn = conns.get(path)
+    if conn is None:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        conn = sqlite3.connect(str(path), timeout=10, isolation_level=None)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.executescript(SCHEMA)
+        conns[path] = conn
+    return conn
+
+
+def _lower(value: Optional[str]) -> Optional[str]:
+    return value.lower() if value else value
+
+
+def _row(raw: Dict, event: Dict, now: float) -> Optional[tuple]:
+    """Build an events row from a raw API event and its parsed form."""
+    event_id = raw.get("id")
+    if not event_id:
+        return None
+    venues = raw.get("_embedded", {}).get("venues", [])
+    venue = venues[0] if venues else {}
+    classifications = raw.get("classifications", [])
+    segment = classifications[0].get("segment", {}).get("name") if classifications else None
+    attractions = raw.get("_embedded", {}).get("attractions", [])
+    search_text = " ".join(
+        [raw.get("name") or ""] + [a.get("name") or "" for a in attractions]
+    ).lower()
+    price = event.get("price_range") or {}
+    return (
+        event_id,
+        event.get("name"),
+        event.get("date"),
+        event.get("time"),
+        venue.get("id"),
+        venue.get("name"),
+        _lower((venue.get("city") or {}).get("name")),
+        _lower((venue.get("state") or {}).get("stateCode")),
+        _lower(segment),
+        _lower(event.get("genre")),
+        price.get("min"),
+        price.get("max"),
+        search_text,
+        now,
+        json.dumps(event),
+    )
+
+
+def slim(raw: Dict) -> Dict:
+    """Just the parts of a raw API event that _row reads, for callers that drop the rest early."""
+    embedded = raw.get("_embedded", {})
+    venues = embedded.get("venues", [])
+    classifications = raw.get("classifications", [])
+    return {
+        "id": raw.get("id"),
+        "name": raw.get("name"),
+        "_embedded": {
+            "venues": [{k: venues[0].get(k) for k in ("id", "name", "city", "state")}] if venues else [],
+            "attractions": [{"name": a.get("name")} for a in embedded.get("attractions", [])],
+        },
+        "classifications": [{"segment": classifications[0].get("segment", {})}] if classifications else [],
+    }
+
+
+def upsert_events(raw_events: List[Dict], events: List[Dict], path: Optional[Path] = None) -> int:
+    """Insert or refresh events. raw_events and events are parallel lists.
+
+    Returns the number of rows written. Never raises: the store is a
+    side channel and must not break a fetch.
+    """
+    if sqlite3 is None:
+        return 0
+    now = time.time()
+    rows = [r for r in (_row(raw, ev, now) for raw, ev in zip(raw_events, events)) if r]
+    if not rows:
+        return 0
+    try:
+        conn = _conn(path)
+        conn.execute("BEGIN")
+        try:
+            conn.executemany(
+                "INSERT OR REPLACE INTO events (id, name, date, time, venue_id, venue_name, city, "
+                "state_code, segment, genre, price_min, price_max, search_text, updated_at, data) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                rows,
+            )
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+    except Exception:
+        return 0
+    return len(rows)
+
+
+def query(
+    venue_id: Optional[str] = None,
+    keyword: Optional[str] = None,
+    classification_name: Optional[str] = None,
+    start_date: Optional[str] = None,
+    end_date: Optional[str] = None,
+    city: str = "",
+    state_code: str = "",
+    genre: Optional[str] = None,
+    max_price: Optional[float] = None,
+    max_age_hours: Optional[float] = None,
+    limit: Optional[int] = None,
+    path: Optional[Path] = None,
+) -> List[Dict]:
+    """Find stored events. Takes the same filters as ticketmaster.iter_events.
+
+    Args:
+        genre: Exact genre name (case-insensitive)
+        max_price: Only events whose minimum price is at most this
+        max_age_hours: Only events refreshed from the API within this many hours
+        limit: Max events to return
+
+    Returns parsed event dicts sorted by date and time.
+    """
+    if sqlite3 is None:
+        return []
+
+    clauses = []
+    params: List[Any] = []
+    if venue_id:
+        clauses.append("venue_id = ?")
+        params.append(venue_id)
+    if keyword:
+        # Match the keyword literally: % and _ are LIKE wildcards
+        escaped = keyword.lower().replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+        clauses.append("search_text LIKE ? ESCAPE '\\'")
+        params.append(f"%{escaped}%")
+    if classification_name:
+        clauses.append("segment = ?")
+        params.append(classification_name.lower())
+    if start_date:
+        clauses.append("date >= ?")
+        params.append(start_date)
+    if end_date:
+        clauses.append("date <= ?")
+        params.append(end_date)
+    if city:
+        clauses.append("city = ?")
+        params.append(city.lower())
+    if state_code:
+        clauses.append("state_code = ?")
+        params.append(state_code.lower())
+    if genre:
+        clauses.append("genre = ?")
+        params.append(genre.lower())
+    if max_price is not None:
+        clauses.append("price_min <= ?")
+        params.append(max_price)
+    if max_age_hours is not None:
+        clauses.append("updated_at >= ?")
+        params.append(time.time() - max_age_hours * 3600)
+
+    sql = "SELECT data FROM events"
+    if clauses:
+        sql += " WHERE " + " AND ".join(clauses)
+    sql += " ORDER BY date, time"
+    if limit:
+        sql += " LIMIT ?"
+        params.append(limit)
+
+    try:
+        rows = _conn(path).execute(sql, params).fetchall()
+    except Exception:
+        return []
+    return [json.loads(r[0]) for r in rows]
+
+
+def prune(before_date: str, path: Optional[Path] = None) -> int:
+    """Delete events dated before before_date (YYYY-MM-DD)."""
+    if sqlite3 is None:
+        return 0
+    return _conn(path).execute("DELETE FROM events WHERE date < ?", (before_date,)).rowcount
@@ -5,12 +5,51 @@ Free $200/month credit covers typical usage.
 """
 
 import json
-from typing import Any, Dict, List, Optional
+import os
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Optional, Sequence, Tuple
 
-from . import http, cache
+from . import http, cache, trace
 from .env import get_config
+from .pool import fan_out
 
-SEARCH_TEXT_URL = "https://places.googleapis.com/v1/places:searchText"
+# Override to point at a stand-in server (see lib/stub_server.py)
+SEARCH_TEXT_URL = os.environ.get("DATEKIT_PLACES_URL", "https://places.googleapis.com/v1/places:searchText")
+
+# Dropped when normalizing queries for cache keys: "Thai food" == "thai"
+STOP_WORDS = {
+    "a", "an", "the", "and", "of", "in", "near", "for", "with",
+    "food", "restaurant", "restaurants", "place", "places", "spot", "spots",
+}
+
+# Named X-Goog-FieldMask profiles. Each step up adds fields billed at a
+# higher SKU tier, so ask for hours only when they'll be used.
+FIELD_PROFILES: Dict[str, List[str]] = {
+    "minimal": ["places.id", "places.displayName", "places.formattedAddress", "places.googleMapsUri"],
+}
+FIELD_PROFILES["standard"] = FIELD_PROFILES["minimal"] + [
+    "places.priceLevel", "places.rating", "places.userRatingCount", "places.websiteUri",
+]
+FIELD_PROFILES["with-hours"] = FIELD_PROFILES["standard"] + ["places.regularOpeningHours"]
+DEFAULT_PROFILE = "standard"
+
+# Field mask entry -> key in parsed place dicts
+PLACE_KEYS = {
+    "places.id": "id",
+    "places.displayName": "name",
+    "places.formattedAddress": "address",
+    "places.googleMapsUri": "maps_url",
+    "places.priceLevel": "price_level",
+    "places.rating": "rating",
+    "places.userRatingCount": "review_count",
+    "places.websiteUri": "website",
+    "places.regularOpeningHours": "hours",
+}
+
+MINUTES_PER_DAY = 24 * 60
+
+MAX_PAGE_SIZE = 20  # searchText serves at most 20 places per page (60 per query)
+BATCH_WORKERS = 4  # Concurrent searchText queries; lib.http also applies the Places rate limit
 
 
 def _get_api_key() -> Optional[str]:
@@ -18,12 +57,61 @@ def _get_api_key() -> Optional[str]:
     return config.get('GOOGLE_PLACES_API_KEY')
 
 
+def normalize_query(text: Optional[str]) -> str:
+    """Canonical form of a search phrase for cache keys.
+
+    Lowercases, collapses whitespace and drops STOP_WORDS. Falls back to
+    the lowercased words if nothing else is left.
+    """
+    words = (text or "").lower().split()
+    kept = [w for w in words if w not in STOP_WORDS]
+    return " ".join(kept or words)
+
+
+def _place_key(place_id: str) -> str:
+    return cache.get_cache_key(f"gp-place-{place_id}", "", "", "google_places")
+
+
+def store_places(places: List[Dict]):
+    """Write places to the shared entity cache (one entry per place id).
+
+    Every cached query that lists a place reads it from here, so
+    refreshing one place updates all of them.
+    """
+    ttl = cache.get_policy("gp-").hard_hours
+    for place in places:
+        if not place.get("id"):
+            continue
+        key = _place_key(place["id"])
+        # Keep fields a richer profile fetched earlier (e.g. hours)
+        existing = cache.load_cache(key, ttl_hours=ttl) or {}
+        cache.save_cache(key, {**existing, **place}, ttl_hours=ttl)
+
+
+def load_places(place_ids: List[str], profile: str = DEFAULT_PROFILE) -> Optional[List[Dict]]:
+    """Read places from the entity cache.
+
+    None if any has expired or been evicted, or was cached with fewer
+    fields than profile needs.
+    """
+    ttl = cache.get_policy("gp-").hard_hours
+    needed = [PLACE_KEYS[f] for f in FIELD_PROFILES[profile]]
+    places = []
+    for place_id in place_ids:
+        place = cache.load_cache(_place_key(place_id), ttl_hours=ttl)
+        if place is None or any(key not in place for key in needed):
+            return None
+        places.append(place)
+    return places
+
+
 def search_restaurants(
     query: str,
     city: str = "",
     neighborhood: Optional[str] = None,
     open_now: bool = False,
     max_results: int = 10,
+    profile: str = DEFAULT_PROFILE,
 ) -> Dict[str, Any]:
     """Search for restaurants in a city.
 
@@ -32,24 +120,29 @@ def search_restaurants(
         city: City to search in (e.g., "Los Angeles", "New York")
         neighborhood: Optional neighborhood to focus on
         open_now: Only return currently open places
-        max_results: Max results to return (default 10)
+        max_results: Max results to return (default 10; above 20, result
+            pages are followed up to the API's limit of 60)
+        profile: Field mask profile from FIELD_PROFILES; "with-hours" adds
+            'hours' (see parse_hours) for use with open_at
 
     Returns:
         Dict with 'places' list or 'error' string
     """
+    if profile not in FIELD_PROFILES:
+        return {"error": f"Unknown field profile: {profile}. Use one of {', '.join(FIELD_PROFILES)}",
+                "places": []}
+
     api_key = _get_api_key()
     if not api_key:
         return {"error": "No GOOGLE_PLACES_API_KEY configured. Add to ~/.config/datekit/.env", "places": []}
 
-    # Cache key
+    # Keyed on the normalized query; the entry holds place ids only
     cache_key = cache.get_cache_key(
-        f"gp-{query}-{city}-{neighborhood}",
+        f"gp-{normalize_query(query)}-{normalize_query(city)}-{normalize_query(neighborhood)}"
+        f"-{open_now}-{max_results}-{profile}",
         "", "",
         "google_places"
     )
-    cached = cache.load_cache(cache_key, ttl_hours=24)
-    if cached:
-        return cached
 
     if city:
         search_query = f"{query} restaurant {city}"
@@ -58,42 +151,224 @@ def search_restaurants(
     if neighborhood:
         search_query += f" {neighborhood}"
 
-    headers = {
-        "X-Goog-Api-Key": api_key,
-        "X-Goog-FieldMask": "places.displayName,places.formattedAddress,places.priceLevel,places.rating,places.userRatingCount,places.websiteUri,places.googleMapsUri,places.regularOpeningHours",
-        "Content-Type": "application/json",
-    }
-
     body = {
         "textQuery": search_query,
-        "maxResultCount": max_results,
+        "pageSize": min(max_results, MAX_PAGE_SIZE),
     }
 
     if open_now:
         body["openNow"] = True
 
+    fetched: Dict[str, List[Dict]] = {}
+
+    def fetch():
+        fetched["places"] = _fetch_pages(body, max_results, profile)
+        return _place_ids(fetched["places"])
+
     try:
-        data = http.post(SEARCH_TEXT_URL, json_data=body, headers=headers)
-        places = _parse_places(data)
-        result = {"places": places}
-        cache.save_cache(cache_key, result)
-        return result
+        result = cache.cached_fetch(
+            cache_key, fetch,
+            refresh=cache.RefreshSpec(__name__, "_search_ids",
+                                      {"body": body, "max_results": max_results, "profile": profile}))
+        places = fetched.get("places")
+        if places is None and result.get("ids") is not None:
+            places = load_places(result["ids"], profile)
+        if places is None:
+            # Some places aged out of the entity cache: refetch the query and
+            # replace its ids entry, or every later call would miss again
+            with cache.key_lock(cache_key):
+                result = fetch()
+                cache.save_cache(cache_key, result, ttl_hours=cache.get_policy(cache_key).hard_hours)
+            places = fetched["places"]
     except http.HTTPError as e:
         return {"error": str(e), "places": []}
 
+    response: Dict[str, Any] = {"places": places}
+    if result.get("stale"):
+        response["stale"] = True
+        response["stale_age_hours"] = result.get("stale_age_hours")
+    return response
+
+
+def _place_ids(places: List[Dict]) -> Dict[str, List[str]]:
+    """Store places in the entity cache; returns the query entry that refers to them."""
+    store_places(places)
+    return {"ids": [p["id"] for p in places if p.get("id")]}
+
 
-def _parse_places(data: Dict) -> List[Dict]:
-    """Parse Google Places response into clean dicts."""
+def _search_ids(body: Dict[str, Any], max_results: int, profile: str = DEFAULT_PROFILE) -> Dict[str, List[str]]:
+    """Refetch a search_restaurants query entry (uncached)."""
+    return _place_ids(_fetch_pages(body, max_results, profile))
+
+
+def _fetch_pages(body: Dict[str, Any], max_results: int, profile: str = DEFAULT_PROFILE) -> List[Dict]:
+    """Fetch searchText pages, following nextPageToken only until max_results are in."""
+    headers = {
+        "X-Goog-Api-Key": _get_api_key(),
+        "X-Goog-FieldMask": ",".join(FIELD_PROFILES[profile] + ["nextPageToken"]),
+        "Content-Type": "application/json",
+    }
+    places: List[Dict] = []
+    page_body = dict(body)
+    while True:
+        data = http.post(SEARCH_TEXT_URL, json_data=page_body, headers=headers)
+        places.extend(_parse_places(data, profile))
+        token = data.get("nextPageToken")
+        if len(places) >= max_results or not token:
+            return places[:max_results]
+        page_body = {**body, "pageToken": token}
+
+
+def search_restaurants_batch(
+    searches: Sequence[Tuple[str, Optional[str]]],
+    city: str = "",
+    open_now: bool = False,
+    max_results: int = 10,
+    max_workers: int = BATCH_WORKERS,
+    profile: str = DEFAULT_PROFILE,
+) -> Dict[str, Any]:
+    """Run several restaurant searches concurrently and merge the results.
+
+    Args:
+        searches: (query, neighborhood) pairs, e.g. [("Thai", "Silver Lake"), ("Ramen", None)]
+        city: City to search in
+        open_now: Only return currently open places
+        max_results: Max results per search (pages are followed up to this)
+        max_workers: Max searches in flight at once
+        profile: Field mask profile (see search_restaurants)
+
+    Returns:
+        Dict with 'places' and 'searches' (see merge_searches)
+    """
+    tasks = {}
+    for query, neighborhood in searches:
+        tasks[search_label(query, neighborhood)] = (lambda q=query, n=neighborhood: search_restaurants(
+            q, city=city, neighborhood=n, open_now=open_now, max_results=max_results,
+            profile=profile))
+
+    results = fan_out(tasks, max_workers=max_workers,
+                      on_error=lambda msg: {"error": msg, "places": []})
+    return merge_searches(results)
+
+
+def search_label(query: str, neighborhood: Optional[str] = None) -> str:
+    """Label for one (query, neighborhood) search in merged results."""
+    return f"{query} ({neighborhood})" if neighborhood else query
+
+
+def merge_searches(results: Dict[str, Dict[str, Any]]) -> Dict[str, Any]:
+    """Merge search_restaurants results keyed by search label.
+
+    Places are de-duplicated by place id, each with the 'matched' searches
+    that found it, and interleaved so every search's top results come
+    first. 'searches' maps each label to its count or error.
+    """
+    merged: Dict[str, Dict] = {}
+    summary: Dict[str, Any] = {}
+    ranked = []
+    for label, result in results.items():
+        if result.get("error"):
+            summary[label] = {"error": result["error"]}
+        else:
+            summary[label] = {"count": len(result.get("places", []))}
+        ranked.append((label, result.get("places", [])))
+
+    # Round-robin by rank so one broad query can't crowd out the others
+    depth = max((len(places) for _, places in ranked), default=0)
+    for i in range(depth):
+        for label, places in ranked:
+            if i >= len(places):
+                continue
+            place = places[i]
+            key = place.get("id") or f"{place.get('name')}|{place.get('address')}"
+            if key in merged:
+                merged[key]["matched"].append(label)
+            else:
+                merged[key] = {**place, "matched": [label]}
+
+    return {"places": list(merged.values()), "searches": summary}
+
+
+def _parse_places(data: Dict, profile: str = DEFAULT_PROFILE) -> List[Dict]:
+    """Parse Google Places response into clean dicts (only the profile's fields)."""
+    fields = FIELD_PROFILES[profile]
     places = []
-    for p in data.get("places", []):
-        place = {
-            "name": p.get("displayName", {}).get("text"),
-            "address": p.get("formattedAddress"),
-            "price_level": p.get("priceLevel"),
-            "rating": p.get("rating"),
-            "review_count": p.get("userRatingCount"),
-            "website": p.get("websiteUri"),
-            "maps_url": p.get("googleMapsUri"),
-        }
-        places.append(place)
+    with trace.span("parse", stage="gp.places") as span:
+        for p in data.get("places", []):
+            values = {
+                "id": p.get("id"),
+                "name": p.get("displayName", {}).get("text"),
+                "address": p.get("formattedAddress"),
+                "maps_url": p.get("googleMapsUri"),
+                "price_level": p.get("priceLevel"),
+                "rating": p.get("rating"),
+                "review_count": p.get("userRatingCount"),
+                "website": p.get("websiteUri"),
+                "hours": parse_hours(p.get("regularOpeningHours")),
+            }
+            places.append({PLACE_KEYS[f]: values[PLACE_KEYS[f]] for f in fields})
+        span["items"] = len(places)
     return places
+
+
+def parse_hours(opening_hours: Optional[Dict]) -> Optional[List[List[List[int]]]]:
+    """Compact regularOpeningHours into per-weekday open intervals.
+
+    Returns 7 lists (Monday first, like datetime.weekday()) of [open, close]
+    minute-of-day pairs. Periods past midnight are split across the two
+    days. None when the place reports no hours (or an empty periods list).
+    """
+    if not opening_hours or not opening_hours.get("periods"):
+        return None
+    week: List[List[List[int]]] = [[] for _ in range(7)]
+    for period in opening_hours["periods"]:
+        start = period.get("open") or {}
+        end = period.get("close")
+        # Places days run Sunday=0..Saturday=6
+        day = (start.get("day", 0) + 6) % 7
+        opens = start.get("hour", 0) * 60 + start.get("minute", 0)
+        if end is None:
+            # Open 24 hours: a single period with no close
+            return [[[0, MINUTES_PER_DAY]] for _ in range(7)]
+        close_day = (end.get("day", 0) + 6) % 7
+        closes = end.get("hour", 0) * 60 + end.get("minute", 0)
+        span = ((close_day - day) % 7) * MINUTES_PER_DAY + closes - opens
+        if span <= 0:
+            span += 7 * MINUTES_PER_DAY
+        while span > 0:
+            chunk = min(span, MINUTES_PER_DAY - opens)
+            week[day].append([opens, opens + chunk])
+            span -= chunk
+            day, opens = (day + 1) % 7, 0
+    for intervals in week:
+        intervals.sort()
+    return week
+
+
+def open_at(place: Dict, when: datetime, minutes: int = 0) -> Optional[bool]:
+    """Whether a place is open at when (its local time) for the next minutes.
+
+    Answered from cached hours, no API call. None if the place has no
+    hours (fetch with profile="with-hours").
+    """
+    week = place.get("hours")
+    if not week:
+        return None
+    moment = when
+    remaining = minutes
+    while True:
+        minute = moment.hour * 60 + moment.minute
+        interval = next((iv for iv in week[moment.weekday()] if iv[0] <= minute < iv[1]), None)
+        if interval is None:
+            return False
+        covered = interval[1] - minute
+        if covered >= remaining or interval[1] < MINUTES_PER_DAY:
+            return covered >= remaining
+        # Open until midnight: continue into the next day's first interval
+        remaining -= covered
+        moment = (moment + timedelta(days=1)).replace(hour=0, minute=0)
+
+
+def filter_open(places: List[Dict], when: datetime, minutes: int = 0) -> List[Dict]:
+    """Places open at when (see open_at). Places without hours are dropped."""
+    return [p for p in places if open_at(p, when, minutes)]
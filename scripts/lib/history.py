@@ -0,0 +1,387 @@
+"""Append-only date-history log with incrementally maintained aggregates.
+
+The history is a JSONL log of operations:
+
+    {"op": "add", "entry": {"id": "date-001", "date": "2026-02-08", ...}}
+    {"op": "update", "id": "date-001", "fields": {"rating": 8, "notes": "..."}}
+
+Logging or rating a date appends one line; nothing is rewritten. A small
+stats sidecar holds rolling aggregates (per-category and per-neighborhood
+counts, the last few dates, per-partner rating sums, unrated dates) plus
+the log size they reflect, with a fingerprint of the log's first and
+last few KB up to that size. Appends update it in place, so stats() is
+constant-time however long the history grows. If the log grew behind
+the sidecar's back (a git pull, a manual edit) only the new tail is
+replayed; if it shrank or the fingerprint no longer matches (the log
+was compacted or rewritten elsewhere), the sidecar is rebuilt.
+
+compact() folds updates into their entries and rewrites the log with one
+"add" per date. It runs automatically once COMPACT_AFTER updates pile up.
+"""
+
+import hashlib
+import json
+import os
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional
+
+from .cache import LOCK_DIR
+from .locks import file_lock
+
+CATEGORIES = ["Adventure", "Creative", "Explore", "Nourish", "Recharge"]
+RECENT_SIZE = 10  # Dates kept in the rolling "recent" window
+VARIETY_WINDOW = 3  # Categories unused in this many dates get suggested
+COMPACT_AFTER = 50  # Update records before the log is compacted
+FINGERPRINT_BYTES = 4096  # Read from each end of the log for its fingerprint
+STATS_VERSION = 2
+
+
+def _empty_stats() -> Dict[str, Any]:
+    return {
+        "version": STATS_VERSION,
+        "log_size": 0,
+        "log_fingerprint": None,
+        "updates_since_compact": 0,
+        "total": 0,
+        "last_number": 0,
+        "categories": {},
+        "neighborhoods": {},
+        "partners": {},
+        "recent": [],
+        "unrated": {},
+        "ratings": {},  # id -> [partner, rating]: lets re-rating adjust averages without a log scan
+    }
+
+
+def _summary(entry: Dict) -> Dict:
+    """The slice of an entry kept in the recent window and unrated map."""
+    return {k: entry.get(k) for k in ("id", "date", "partner", "category", "neighborhood", "activity", "rating")}
+
+
+def _bump(counts: Dict[str, int], key: Optional[str]):
+    if key:
+        counts[key] = counts.get(key, 0) + 1
+
+
+def _rating(value: Any) -> Optional[float]:
+    return float(value) if isinstance(value, (int, float)) and not isinstance(value, bool) else None
+
+
+class History:
+    """A date-history log plus its stats sidecar."""
+
+    def __init__(self, log_path: Path, legacy_path: Optional[Path] = None):
+        """
+        Args:
+            log_path: JSONL log (e.g. data/date-history.jsonl)
+            legacy_path: Old single-array JSON file to import on first use
+        """
+        self.log_path = Path(log_path)
+        self.stats_path = self.log_path.with_suffix(".stats.json")
+        self.legacy_path = legacy_path
+        digest = hashlib.sha1(str(self.log_path.resolve()).encode()).hexdigest()[:12]
+        self.lock_path = LOCK_DIR / f"history-{digest}.lock"
+
+    # --- storage ---
+
+    @contextmanager
+    def _locked(self) -> Iterator[Dict[str, Any]]:
+        """Hold the history lock and yield up-to-date stats; saves them on exit."""
+        with file_lock(self.lock_path):
+            self._import_legacy()
+            stats = self._sync(self._load_stats())
+            yield stats
+            self._save_stats(stats)
+
+    def _load_stats(self) -> Dict[str, Any]:
+        try:
+            with open(self.stats_path) as f:
+                stats = json.load(f)
+            if stats.get("version") == STATS_VERSION:
+                return stats
+        except (json.JSONDecodeError, OSError):
+            pass
+        return _empty_stats()
+
+    def _save_stats(self, stats: Dict[str, Any]):
+        tmp = self.stats_path.with_name(f".{self.stats_path.name}.{os.getpid()}.tmp")
+        with open(tmp, "w") as f:
+            json.dump(stats, f, separators=(",", ":"))
+        os.replace(tmp, self.stats_path)
+
+    def _log_size(self) -> int:
+        try:
+            return self.log_path.stat().st_size
+        except OSError:
+            return 0
+
+    def _fingerprint(self, size: int) -> Optional[str]:
+        """Hash of the log's first and last FINGERPRINT_BYTES up to size."""
+        if not size:
+            return None
+        try:
+            with open(self.log_path, "rb") as f:
+                head = f.read(min(size, FINGERPRINT_BYTES))
+                f.seek(max(0, size - FINGERPRINT_BYTES))
+                tail = f.read(size - f.tell())
+        except OSError:
+            return None
+        return hashlib.sha1(head + b"|" + tail).hexdigest()
+
+    def _sync(self, stats: Dict[str, Any]) -> Dict[str, Any]:
+        """Bring stats in line with the log, replaying only what they haven't seen."""
+        size = self._log_size()
+        if size < stats["log_size"] or self._fingerprint(stats["log_size"]) != stats["log_fingerprint"]:
+            stats = _empty_stats()  # Log was rewritten or truncated
+        if size == stats["log_size"]:
+            return stats
+        for record in self._read_log(stats["log_size"]):
+            self._apply(stats, record)
+        stats["log_size"] = size
+        stats["log_fingerprint"] = self._fingerprint(size)
+        return stats
+
+    def _read_log(self, offset: int = 0) -> Iterator[Dict]:
+        try:
+            f = open(self.log_path, "rb")
+        except OSError:
+            return
+        with f:
+            f.seek(offset)
+            for line in f:
+                line = line.strip()
+                if not line:
+                    continue
+                try:
+                    yield json.loads(line)
+                except json.JSONDecodeError:
+                    continue  # Torn write from a crash
+
+    def _append(self, stats: Dict[str, Any], record: Dict):
+        self.log_path.parent.mkdir(parents=True, exist_ok=True)
+        with open(self.log_path, "a") as f:
+            f.write(json.dumps(record) + "\n")
+            f.flush()
+            os.fsync(f.fileno())
+        self._apply(stats, record)
+        stats["log_size"] = self._log_size()
+        stats["log_fingerprint"] = self._fingerprint(stats["log_size"])
+
+    def _import_legacy(self):
+        """Seed the log from the old date-history.json array, once."""
+        if not self.legacy_path or self.log_path.exists():
+            return
+        try:
+            with open(self.legacy_path) as f:
+                entries = json.load(f)
+        except (json.JSONDecodeError, OSError):
+            return
+        if not isinstance(entries, list) or not entries:
+            return
+        self.log_path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = self.log_path.with_name(f".{self.log_path.name}.{os.getpid()}.tmp")
+        with open(tmp, "w") as f:
+            for entry in entries:
+                f.write(json.dumps({"op": "add", "entry": entry}) + "\n")
+        os.replace(tmp, self.log_path)
+
+    # --- aggregates ---
+
+    def _apply(self, stats: Dict[str, Any], record: Dict):
+        """Fold one log record into the aggregates."""
+        if record.get("op") == "add":
+            entry = record.get("entry") or {}
+            stats["total"] += 1
+            try:
+                number = int(str(entry.get("id", "")).rsplit("-", 1)[-1])
+                stats["last_number"] = max(stats["last_number"], number)
+            except ValueError:
+                pass
+            _bump(stats["categories"], entry.get("category"))
+            _bump(stats["neighborhoods"], entry.get("neighborhood"))
+
+            partner = stats["partners"].setdefault(
+                entry.get("partner") or "", {"dates": 0, "rated": 0, "rating_sum": 0.0,
+                                             "categories": {}, "recent_categories": [], "last_date": None}
+            )
+            partner["dates"] += 1
+            _bump(partner["categories"], entry.get("category"))
+            partner["recent_categories"] = (partner["recent_categories"] + [entry.get("category")])[-RECENT_SIZE:]
+            if entry.get("date") and (partner["last_date"] or "") < entry["date"]:
+                partner["last_date"] = entry["date"]
+
+            rating = _rating(entry.get("rating"))
+            stats["ratings"][entry.get("id")] = [entry.get("partner") or "", rating]
+            if rating is None:
+                stats["unrated"][entry.get("id")] = _summary(entry)
+            else:
+                partner["rated"] += 1
+                partner["rating_sum"] += rating
+            stats["recent"] = (stats["recent"] + [_summary(entry)])[-RECENT_SIZE:]
+
+        elif record.get("op") == "update":
+            stats["updates_since_compact"] += 1
+            fields = record.get("fields") or {}
+            if "rating" in fields:
+                self._apply_rating(stats, record.get("id"), _rating(fields["rating"]))
+            for item in stats["recent"]:
+                if item["id"] == record.get("id"):
+                    item.update({k: v for k, v in fields.items() if k in item})
+
+    def _apply_rating(self, stats: Dict[str, Any], date_id: str, rating: Optional[float]):
+        known = stats["ratings"].get(date_id)
+        if known is None:
+            return
+        partner_name, old = known
+        stats["unrated"].pop(date_id, None)
+        known[1] = rating
+
+        partner = stats["partners"].get(partner_name)
+        if partner is None:
+            return
+        if old is not None:
+            partner["rated"] -= 1
+            partner["rating_sum"] -= old
+        if rating is not None:
+            partner["rated"] += 1
+            partner["rating_sum"] += rating
+
+    def _find_entry(self, date_id: str, stats: Dict[str, Any]) -> Optional[Dict]:
+        """Current state of a date outside the recent window (scans the log)."""
+        for item in stats["recent"]:
+            if item["id"] == date_id:
+                return item
+        found = None
+        for record in self._read_log():
+            if record.get("op") == "add" and (record.get("entry") or {}).get("id") == date_id:
+                found = dict(record["entry"])
+            elif found and record.get("op") == "update" and record.get("id") == date_id:
+                found.update(record.get("fields") or {})
+        return found
+
+    # --- public API ---
+
+    def add(self, entry: Dict[str, Any]) -> Dict[str, Any]:
+        """Log a date. Assigns the next "date-NNN" id unless entry has one."""
+        with self._locked() as stats:
+            entry = dict(entry)
+            if not entry.get("id"):
+                entry["id"] = f"date-{stats['last_number'] + 1:03d}"
+            entry.setdefault("rating", None)
+            self._append(stats, {"op": "add", "entry": entry})
+        return entry
+
+    def update(self, date_id: Optional[str], fields: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        """Update a logged date (None = the most recent unrated one).
+
+        Returns the date's summary, or None if there is no such date.
+        """
+        with self._locked() as stats:
+            if date_id is None:
+                if not stats["unrated"]:
+                    return None
+                date_id = list(stats["unrated"])[-1]
+            current = stats["unrated"].get(date_id) or self._find_entry(date_id, stats)
+            if current is None:
+                return None
+            summary = {**_summary(current), **{k: v for k, v in fields.items() if k in _summary(current)}}
+            self._append(stats, {"op": "update", "id": date_id, "fields": fields})
+            if stats["updates_since_compact"] >= COMPACT_AFTER:
+                self._compact(stats)
+        return summary
+
+    def rate(self, rating: float, date_id: Optional[str] = None, notes: Optional[str] = None) -> Optional[Dict]:
+        """Rate a date (default: the most recent unrated one)."""
+        fields: Dict[str, Any] = {"rating": rating}
+        if notes:
+            fields["notes"] = notes
+        return self.update(date_id, fields)
+
+    def entries(self) -> List[Dict[str, Any]]:
+        """Every date with updates applied, in logged order (reads the whole log)."""
+        by_id: Dict[str, Dict] = {}
+        for record in self._read_log():
+            if record.get("op") == "add":
+                entry = dict(record.get("entry") or {})
+                by_id[entry.get("id")] = entry
+            elif record.get("op") == "update" and record.get("id") in by_id:
+                by_id[record["id"]].update(record.get("fields") or {})
+        return list(by_id.values())
+
+    def compact(self) -> Dict[str, int]:
+        """Rewrite the log as one "add" per date. Returns record counts before/after."""
+        with self._locked() as stats:
+            return self._compact(stats)
+
+    def _compact(self, stats: Dict[str, Any]) -> Dict[str, int]:
+        before = sum(1 for _ in self._read_log())
+        entries = self.entries()
+        tmp = self.log_path.with_name(f".{self.log_path.name}.{os.getpid()}.tmp")
+        with open(tmp, "w") as f:
+            for entry in entries:
+                f.write(json.dumps({"op": "add", "entry": entry}) + "\n")
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, self.log_path)
+        stats.clear()
+        stats.update(self._sync(_empty_stats()))
+        return {"records_before": before, "records_after": len(entries)}
+
+    def rebuild(self) -> Dict[str, Any]:
+        """Recompute the stats sidecar from the full log."""
+        with file_lock(self.lock_path):
+            self._import_legacy()
+            stats = self._sync(_empty_stats())
+            self._save_stats(stats)
+        return self._summarize(stats, None)
+
+    def stats(self, partner: Optional[str] = None) -> Dict[str, Any]:
+        """Category balance, recent neighborhoods and ratings, from the sidecar."""
+        with self._locked() as stats:
+            return self._summarize(stats, partner)
+
+    def _summarize(self, stats: Dict[str, Any], partner: Optional[str]) -> Dict[str, Any]:
+        if partner is not None:
+            p = stats["partners"].get(partner) or {"dates": 0, "rated": 0, "rating_sum": 0.0,
+                                                   "categories": {}, "recent_categories": [], "last_date": None}
+            recent_categories = p["recent_categories"]
+            totals = p["categories"]
+            recent = [d for d in stats["recent"] if d.get("partner") == partner]
+        else:
+            recent_categories = [d.get("category") for d in stats["recent"]]
+            totals = stats["categories"]
+            recent = stats["recent"]
+
+        balance = {c: 0 for c in CATEGORIES}
+        for c in recent_categories:
+            if c:
+                balance[c] = balance.get(c, 0) + 1
+        used_lately = set(recent_categories[-VARIETY_WINDOW:])
+
+        neighborhoods = []
+        for d in reversed(recent):
+            hood = d.get("neighborhood")
+            if hood and hood not in neighborhoods:
+                neighborhoods.append(hood)
+
+        summary = {
+            "total": p["dates"] if partner is not None else stats["total"],
+            "categories": totals,
+            "category_balance": balance,
+            "last_categories": recent_categories,
+            "suggest_categories": [c for c in CATEGORIES if c not in used_lately],
+            "recent_neighborhoods": neighborhoods,
+            "top_neighborhoods": sorted(stats["neighborhoods"], key=lambda n: -stats["neighborhoods"][n])[:5],
+            "recent": recent,
+            "partners": {
+                name or "(none)": {
+                    "dates": p["dates"],
+                    "avg_rating": round(p["rating_sum"] / p["rated"], 1) if p["rated"] else None,
+                    "last_date": p["last_date"],
+                }
+                for name, p in stats["partners"].items()
+            },
+            "unrated": list(stats["unrated"].values()),
+        }
+        return summary
@@ -1,13 +1,26 @@
 """HTTP utilities for date-planner (stdlib only)."""
 
+import atexit
+import gzip
+import http.client
 import json
 import os
+import queue
+import random
 import sys
+import threading
 import time
 import urllib.error
 import urllib.request
-from typing import Any, Dict, Optional
-from urllib.parse import urlencode
+import zlib
+from collections import deque
+from email.message import Message
+from email.utils import parsedate_to_datetime
+from typing import Any, Callable, Deque, Dict, Iterator, Optional, Tuple
+from urllib.parse import urlencode, urljoin, urlsplit
+
+from . import breaker, connpool, ratelimit, trace
+from .env import get_config
 
 DEFAULT_TIMEOUT = 30
 DEBUG = os.environ.get("DATEKIT_DEBUG", "").lower() in ("1", "true", "yes")
@@ -21,10 +34,59 @@ def log(msg: str):
 
 
 MAX_RETRIES = 3
-RETRY_DELAY = 1.0
+RETRY_DELAY = 1.0  # First backoff cap; doubles per attempt
+MAX_RETRY_DELAY = 10.0
+DEFAULT_DEADLINE = 45.0  # Total seconds across all attempts and waits
+
+# Hedging: for idempotent GETs, send a second copy of a request that is
+# slower than HEDGE_PERCENTILE of recent ones to the same host.
+HEDGE = os.environ.get("DATEKIT_HEDGE", "").lower() in ("1", "true", "yes")
+HEDGE_PERCENTILE = 0.95
+HEDGE_MIN_SAMPLES = 10  # Below this, use HEDGE_DEFAULT_DELAY
+HEDGE_DEFAULT_DELAY = 2.0
+HEDGE_MIN_DELAY = 0.25
+LATENCY_WINDOW = 50
 USER_AGENT = "date-planner/1.0 (Claude Code Skill)"
 
 
+_limits_configured = False
+
+
+def _configure_limits():
+    """Apply per-provider rate limit overrides from config (once)."""
+    global _limits_configured
+    if _limits_configured:
+        return
+    _limits_configured = True
+    config = get_config()
+    for provider in ratelimit.PROVIDER_HOSTS:
+        value = config.get(f"{provider.upper()}_RATE_LIMIT")
+        if not value:
+            continue
+        try:
+            ratelimit.set_provider_limit(provider, float(value))
+        except ValueError:
+            log(f"Ignoring invalid {provider.upper()}_RATE_LIMIT: {value}")
+
+
+def throttle(url: str, max_wait: Optional[float] = None) -> Optional[float]:
+    """Block until the URL's host has a rate-limit token available.
+
+    Tokens come from a token bucket shared by every date-planner process
+    on this machine (see lib.ratelimit). Returns the seconds waited, or
+    None (without waiting) if a token would take longer than max_wait.
+    """
+    _configure_limits()
+    host = urlsplit(url).hostname or ""
+    waited = ratelimit.acquire(host, max_wait)
+    if waited is None:
+        log(f"Rate limit: no token for {host} within {max_wait:.2f}s")
+        return None
+    if waited:
+        log(f"Rate limit: waited {waited:.2f}s for {host}")
+    return waited
+
+
 class HTTPError(Exception):
     """HTTP request error with status code."""
     def __init__(self, message: str, status_code: Optional[int] = None, body: Optional[str] = None):
@@ -33,6 +95,223 @@ class HTTPError(Exception):
         self.body = body
 
 
+class CircuitOpenError(HTTPError):
+    """The host's circuit breaker is open (see lib.breaker): not sent."""
+
+
+_pool = connpool.ConnectionPool()
+atexit.register(_pool.close)
+
+MAX_REDIRECTS = 3
+REDIRECT_CODES = (301, 302, 303, 307, 308)
+STREAM_CHUNK = 64 * 1024  # Bytes read at a time from a streamed body
+
+
+def close():
+    """Close all pooled keep-alive connections."""
+    _pool.close()
+
+
+def _decode_body(raw: bytes, content_encoding: Optional[str]) -> bytes:
+    """Undo gzip Content-Encoding."""
+    if (content_encoding or "").lower() != "gzip":
+        return raw
+    try:
+        return gzip.decompress(raw)
+    except (OSError, EOFError, zlib.error) as e:
+        raise OSError(f"Bad gzip body: {e}")
+
+
+def _iter_body(response, content_encoding: Optional[str]) -> Iterator[bytes]:
+    """Read a response body in chunks, undoing gzip Content-Encoding as it goes."""
+    gzipped = (content_encoding or "").lower() == "gzip"
+    decompressor = zlib.decompressobj(16 + zlib.MAX_WBITS) if gzipped else None
+    try:
+        while True:
+            chunk = response.read(STREAM_CHUNK)
+            if not chunk:
+                # Unlike read(), read(n) just stops at a connection closed mid-body
+                if getattr(response, "length", None):
+                    raise http.client.IncompleteRead(b"", response.length)
+                break
+            if decompressor is not None:
+                chunk = decompressor.decompress(chunk)
+            if chunk:
+                yield chunk
+        if decompressor is not None:
+            tail = decompressor.flush()
+            if tail:
+                yield tail
+    except zlib.error as e:
+        raise OSError(f"Bad gzip body: {e}")
+
+
+def _proxied(url: str) -> bool:
+    """Whether the environment routes this URL through a proxy."""
+    parts = urlsplit(url)
+    proxies = urllib.request.getproxies()
+    return parts.scheme in proxies and not urllib.request.proxy_bypass(parts.hostname or "")
+
+
+Response = Tuple[int, str, bytes, Message]
+# Takes a 2xx body as it arrives, in decompressed chunks (see request's parse)
+Consumer = Callable[[Iterator[bytes]], None]
+
+
+def _send_urllib(method: str, url: str, data: Optional[bytes], headers: Dict[str, str],
+                 timeout: float, consume: Optional[Consumer] = None) -> Response:
+    """Send via urllib (proxy support, no connection reuse)."""
+    req = urllib.request.Request(url, data=data, headers=headers, method=method)
+    try:
+        with urllib.request.urlopen(req, timeout=timeout) as response:
+            encoding = response.headers.get("Content-Encoding")
+            if consume is not None and 200 <= response.status < 300:
+                consume(_iter_body(response, encoding))
+                return response.status, response.reason, b"", response.headers
+            return response.status, response.reason, _decode_body(response.read(), encoding), response.headers
+    except urllib.error.HTTPError as e:
+        try:
+            raw = _decode_body(e.read(), e.headers.get("Content-Encoding"))
+        except OSError:
+            raw = b""
+        return e.code, str(e.reason), raw, e.headers
+
+
+def _send(method: str, url: str, data: Optional[bytes], headers: Dict[str, str],
+          timeout: float, consume: Optional[Consumer] = None) -> Response:
+    """Send one request over a pooled keep-alive connection.
+
+    Returns (status, reason, decoded body bytes, response headers). A
+    reused connection the server already closed is transparently replaced
+    with a fresh one. With consume, a 2xx body is passed to it as it is
+    read instead (the returned body is then empty).
+    """
+    if _proxied(url):
+        return _send_urllib(method, url, data, headers, timeout, consume)
+
+    for _ in range(MAX_REDIRECTS + 1):
+        parts = urlsplit(url)
+        path = parts.path or "/"
+        if parts.query:
+            path += f"?{parts.query}"
+
+        while True:
+            key, conn, reused = _pool.acquire(parts.scheme, parts.hostname or "", parts.port, timeout)
+            try:
+                conn.request(method, path, body=data, headers=headers)
+                response = conn.getresponse()
+                if consume is not None and 200 <= response.status < 300:
+                    consume(_iter_body(response, response.getheader("Content-Encoding")))
+                    response.read()  # Whatever the consumer left, so the connection can be reused
+                    raw = None
+                else:
+                    raw = response.read()
+            except connpool.STALE_ERRORS:
+                conn.close()
+                if reused:
+                    log(f"Stale connection to {parts.hostname}, reconnecting")
+                    continue
+                raise
+            except BaseException:
+                conn.close()
+                raise
+            _pool.release(key, conn, reusable=not response.will_close)
+            break
+
+        location = response.getheader("Location")
+        if response.status in REDIRECT_CODES and location and method in ("GET", "HEAD"):
+            url = urljoin(url, location)
+            log(f"Redirect {response.status} -> {url}")
+            continue
+        body = b"" if raw is None else _decode_body(raw, response.getheader("Content-Encoding"))
+        return response.status, response.reason, body, response.msg
+
+    raise HTTPError(f"Too many redirects: {url}")
+
+
+_latencies: Dict[str, Deque[float]] = {}
+_latencies_lock = threading.Lock()
+
+
+def _record_latency(host: str, seconds: float):
+    with _latencies_lock:
+        _latencies.setdefault(host, deque(maxlen=LATENCY_WINDOW)).append(seconds)
+
+
+def _hedge_delay(host: str) -> float:
+    """How long to wait before hedging a request to host."""
+    with _latencies_lock:
+        samples = sorted(_latencies.get(host, ()))
+    if len(samples) < HEDGE_MIN_SAMPLES:
+        return HEDGE_DEFAULT_DELAY
+    return max(HEDGE_MIN_DELAY, samples[min(len(samples) - 1, int(len(samples) * HEDGE_PERCENTILE))])
+
+
+def _send_hedged(method: str, url: str, data: Optional[bytes], headers: Dict[str, str],
+                 timeout: float) -> Response:
+    """Send a request, and a second copy if the first is unusually slow.
+
+    Whichever copy succeeds first wins; the other is abandoned (its
+    daemon thread finishes in the background). Both copies share the one
+    timeout: the hedge only gets what is left of it.
+    """
+    host = urlsplit(url).hostname or ""
+    results: "queue.Queue[Tuple[bool, Any]]" = queue.Queue()
+    ends_at = time.monotonic() + timeout
+
+    def remaining() -> float:
+        return max(0.0, ends_at - time.monotonic())
+
+    def attempt(timeout: float):
+        try:
+            results.put((True, _send(method, url, data, headers, timeout)))
+        except BaseException as e:
+            results.put((False, e))
+
+    threading.Thread(target=attempt, args=(timeout,), daemon=True).start()
+    launched = 1
+    delay = min(_hedge_delay(host), timeout)
+    try:
+        ok, value = results.get(timeout=delay)
+    except queue.Empty:
+        # The hedge spends a rate-limit token like any request, if one comes in time
+        if throttle(url, remaining()) is not None and remaining() > 0:
+            log(f"Hedging request to {host} after {delay:.2f}s")
+            threading.Thread(target=attempt, args=(remaining(),), daemon=True).start()
+            launched = 2
+        ok, value = results.get()
+
+    if not ok and launched == 2:
+        # First finisher failed: the other copy may still succeed
+        ok, value = results.get()
+    if not ok:
+        raise value
+    return value
+
+
+class _InvalidBody(Exception):
+    """A streamed body the parse callback rejected (wraps its ValueError)."""
+
+
+def _backoff(attempt: int) -> float:
+    """Exponential backoff with full jitter for the given (0-based) attempt."""
+    return random.uniform(0, min(MAX_RETRY_DELAY, RETRY_DELAY * (2 ** attempt)))
+
+
+def _retry_after(headers: Optional[Message]) -> Optional[float]:
+    """Seconds to wait from a Retry-After header (delta-seconds or HTTP date)."""
+    value = headers.get("Retry-After") if headers is not None else None
+    if not value:
+        return None
+    value = value.strip()
+    if value.isdigit():
+        return float(value)
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
 def request(
     method: str,
     url: str,
@@ -40,76 +319,196 @@ def request(
     json_data: Optional[Dict[str, Any]] = None,
     timeout: int = DEFAULT_TIMEOUT,
     retries: int = MAX_RETRIES,
+    deadline: Optional[float] = DEFAULT_DEADLINE,
+    hedge: Optional[bool] = None,
+    parse: Optional[Callable[[Iterator[bytes]], Any]] = None,
 ) -> Dict[str, Any]:
     """Make an HTTP request and return JSON response.
 
+    Connections are kept alive and reused per host; call close() to
+    release them early. Responses are requested gzip-compressed and
+    decompressed transparently.
+
+    Requests to a host whose circuit breaker is open fail immediately
+    with CircuitOpenError (see lib.breaker).
+
+    Failed attempts are retried with jittered exponential backoff, or
+    after the server's Retry-After on 429/503. deadline caps the total
+    time across attempts, rate-limit waits and backoff: each attempt's
+    timeout is cut to what is left, and a wait that would overrun it
+    fails immediately instead.
+
     Args:
         method: HTTP method (GET, POST, etc.)
         url: Request URL
         headers: Optional headers dict
         json_data: Optional JSON body (for POST)
-        timeout: Request timeout in seconds
-        retries: Number of retries on failure
+        timeout: Per-attempt timeout in seconds
+        retries: Max number of attempts
+        deadline: Total time budget in seconds (None = no limit)
+        hedge: For GETs, send a second copy if the first is slower than
+            most recent requests to the host (default: DATEKIT_HEDGE env)
+        parse: Decode the body incrementally instead of with json.loads:
+            called with the successful response body as an iterator of
+            (decompressed) byte chunks while it downloads; raises
+            ValueError on bad JSON. Streamed requests are never hedged.
 
     Returns:
-        Parsed JSON response
+        Parsed JSON response (parse's return value, if given)
 
     Raises:
         HTTPError: On request failure
     """
     headers = headers or {}
     headers.setdefault("User-Agent", USER_AGENT)
+    headers.setdefault("Accept-Encoding", "gzip")
 
     data = None
     if json_data is not None:
         data = json.dumps(json_data).encode('utf-8')
         headers.setdefault("Content-Type", "application/json")
 
-    req = urllib.request.Request(url, data=data, headers=headers, method=method)
-
     log(f"{method} {url}")
     if json_data:
         log(f"Payload keys: {list(json_data.keys())}")
 
+    if hedge is None:
+        hedge = HEDGE
+    send = _send_hedged if hedge and method in ("GET", "HEAD") else _send
+
+    streamed: Dict[str, Any] = {}
+    if parse is not None:
+        def consume(chunks: Iterator[bytes]):
+            # Runs again from scratch if the attempt is retried
+            streamed.clear()
+            streamed["bytes"] = 0
+
+            def counted() -> Iterator[bytes]:
+                for chunk in chunks:
+                    streamed["bytes"] += len(chunk)
+                    yield chunk
+
+            try:
+                streamed["result"] = parse(counted())
+            except ValueError as e:
+                raise _InvalidBody(e)
+
+        def send(method, url, data, headers, timeout):
+            # Hedging would run two consumers at once, so streamed bodies aren't hedged
+            return _send(method, url, data, headers, timeout, consume)
+    host = urlsplit(url).hostname or ""
+    give_up_at = time.monotonic() + deadline if deadline is not None else None
+
+    def remaining() -> float:
+        return give_up_at - time.monotonic() if give_up_at is not None else float(timeout)
+
+    def out_of_time(wait: float = 0.0) -> bool:
+        return give_up_at is not None and time.monotonic() + wait >= give_up_at
+
+    def traced(attempt: int, started: float, waited: float, sleep: float = 0.0, **fields):
+        if trace.active():
+            trace.record("http", method=method, host=host, attempt=attempt,
+                         ms=round((time.monotonic() - started) * 1000, 3),
+                         throttle=round(waited, 4), sleep=round(sleep, 4), **fields)
+
     last_error = None
+    out_of_rate = False
     for attempt in range(retries):
+        if not breaker.allow(host):
+            log(f"Circuit open for {host}")
+            raise CircuitOpenError(
+                f"Circuit open for {host} after repeated failures; retry in {breaker.retry_in(host):.0f}s"
+                + (f" (last error: {last_error})" if last_error else ""))
+        if out_of_time():
+            break
+        # Don't wait for a rate-limit token past the deadline
+        waited = throttle(url, remaining() if give_up_at is not None else None)
+        if waited is None:
+            out_of_rate = True
+            break
+        started = time.monotonic()
+        streamed.clear()
         try:
-            with urllib.request.urlopen(req, timeout=timeout) as response:
-                body = response.read().decode('utf-8')
-                log(f"Response: {response.status} ({len(body)} bytes)")
-                return json.loads(body) if body else {}
-        except urllib.error.HTTPError as e:
-            body = None
-            try:
-                body = e.read().decode('utf-8')
-            except:
-                pass
-            log(f"HTTP Error {e.code}: {e.reason}")
+            with trace.stage("http"):
+                status, reason, raw, response_headers = send(
+                    method, url, data, headers, min(timeout, remaining()))
+        except _InvalidBody as e:
+            _record_latency(host, time.monotonic() - started)
+            breaker.record_success(host)
+            traced(attempt, started, waited, error="InvalidJSON", bytes=streamed.get("bytes", 0))
+            log(f"JSON decode error: {e}")
+            raise HTTPError(f"Invalid JSON response: {e}")
+        except (OSError, http.client.HTTPException) as e:
+            breaker.record_failure(host)
+            log(f"Connection error: {type(e).__name__}: {e}")
+            last_error = HTTPError(f"Connection error: {type(e).__name__}: {e}")
+            wait = _backoff(attempt)
+            retrying = attempt < retries - 1 and not out_of_time(wait)
+            traced(attempt, started, waited, wait if retrying else 0.0, error=type(e).__name__, bytes=0)
+            if retrying:
+                time.sleep(wait)
+                continue
+            break
+        _record_latency(host, time.monotonic() - started)
+        if status >= 500:
+            breaker.record_failure(host)
+        elif status != 429:
+            breaker.record_success(host)
+
+        if status >= 400:
+            body = raw.decode('utf-8', errors='replace') or None
+            log(f"HTTP Error {status}: {reason}")
             if body:
                 log(f"Error body: {body[:500]}")
-            last_error = HTTPError(f"HTTP {e.code}: {e.reason}", e.code, body)
+            last_error = HTTPError(f"HTTP {status}: {reason}", status, body)
 
             # Don't retry client errors (4xx) except rate limits
-            if 400 <= e.code < 500 and e.code != 429:
+            if 400 <= status < 500 and status != 429:
+                traced(attempt, started, waited, status=status, bytes=len(raw))
                 raise last_error
 
-            if attempt < retries - 1:
-                time.sleep(RETRY_DELAY * (attempt + 1))
-        except urllib.error.URLError as e:
-            log(f"URL Error: {e.reason}")
-            last_error = HTTPError(f"URL Error: {e.reason}")
-            if attempt < retries - 1:
-                time.sleep(RETRY_DELAY * (attempt + 1))
-        except json.JSONDecodeError as e:
+            wait = None
+            if status in (429, 503):
+                wait = _retry_after(response_headers)
+                if wait is not None:
+                    log(f"Retry-After: {wait:.1f}s")
+            if wait is None:
+                wait = _backoff(attempt)
+            retrying = attempt < retries - 1 and not out_of_time(wait)
+            traced(attempt, started, waited, wait if retrying else 0.0, status=status, bytes=len(raw))
+            if retrying:
+                time.sleep(wait)
+                continue
+            break
+
+        if "result" in streamed:
+            traced(attempt, started, waited, status=status, bytes=streamed["bytes"])
+            log(f"Response: {status} ({streamed['bytes']} bytes, streamed)")
+            return streamed["result"]
+        traced(attempt, started, waited, status=status, bytes=len(raw))
+        if parse is not None:
+            try:
+                return parse(iter([raw]))
+            except ValueError as e:
+                log(f"JSON decode error: {e}")
+                raise HTTPError(f"Invalid JSON response: {e}")
+        try:
+            with trace.span("parse", stage="json", bytes=len(raw)):
+                body = raw.decode('utf-8')
+                log(f"Response: {status} ({len(body)} bytes)")
+                return json.loads(body) if body else {}
+        except (UnicodeDecodeError, json.JSONDecodeError) as e:
             log(f"JSON decode error: {e}")
-            last_error = HTTPError(f"Invalid JSON response: {e}")
-            raise last_error
-        except (OSError, TimeoutError, ConnectionResetError) as e:
-            log(f"Connection error: {type(e).__name__}: {e}")
-            last_error = HTTPError(f"Connection error: {type(e).__name__}: {e}")
-            if attempt < retries - 1:
-                time.sleep(RETRY_DELAY * (attempt + 1))
+            raise HTTPError(f"Invalid JSON response: {e}")
 
+    if out_of_rate or out_of_time():
+        message = f"Deadline of {deadline:g}s exceeded"
+        if out_of_rate:
+            message += " waiting for a rate-limit token"
+        if last_error:
+            message += f" (last error: {last_error})"
+        raise HTTPError(message, last_error.status_code if last_error else None,
+                        last_error.body if last_error else None)
     if last_error:
         raise last_error
     raise HTTPError("Request failed with no error details")
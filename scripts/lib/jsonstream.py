@@ -0,0 +1,138 @@
+"""Incremental JSON decoding for large API responses.
+
+load() reads a JSON document from an iterable of byte chunks. One array
+inside it (given by a key path, e.g. ("_embedded", "events")) is never
+held whole: each element is decoded on its own and handed to a callback,
+so memory stays proportional to one element plus a read chunk rather
+than the whole document. Everything else is decoded normally.
+
+Only the containers on the path are walked here; every other value,
+including each array element, goes through the stdlib decoder's
+raw_decode, so this is about as fast as json.loads.
+"""
+
+import codecs
+import json
+import re
+from typing import Any, Callable, Iterable, Iterator, Sequence
+
+_NON_WHITESPACE = re.compile(r"[^ \t\n\r]")
+_decoder = json.JSONDecoder()
+
+
+class _Reader:
+    """A text buffer over byte chunks, refilled as parsing reaches its end."""
+
+    def __init__(self, chunks: Iterable[bytes]):
+        self._chunks: Iterator[bytes] = iter(chunks)
+        self._decode = codecs.getincrementaldecoder("utf-8")().decode
+        self.buf = ""
+        self.pos = 0
+        self.eof = False
+
+    def _fill(self) -> bool:
+        """Append the next chunk (dropping consumed text). False at end of input."""
+        while not self.eof:
+            try:
+                chunk = next(self._chunks)
+            except StopIteration:
+                self.eof = True
+                text = self._decode(b"", final=True)
+            else:
+                text = self._decode(chunk)
+            if text or self.eof:
+                self.buf = self.buf[self.pos:] + text
+                self.pos = 0
+                return bool(text)
+        return False
+
+    def peek(self) -> str:
+        """Next non-whitespace character ("" at end of input), without consuming it."""
+        while True:
+            match = _NON_WHITESPACE.search(self.buf, self.pos)
+            if match:
+                self.pos = match.start()
+                return self.buf[self.pos]
+            self.pos = len(self.buf)
+            if not self._fill():
+                return ""
+
+    def expect(self, chars: str) -> str:
+        c = self.peek()
+        if not c or c not in chars:
+            expected = " or ".join(repr(ch) for ch in chars)
+            raise json.JSONDecodeError(f"Expecting {expected}", self.buf, self.pos)
+        self.pos += 1
+        return c
+
+    def value(self) -> Any:
+        """Decode one complete value at the current position."""
+        self.peek()
+        while True:
+            try:
+                value, end = _decoder.raw_decode(self.buf, self.pos)
+            except json.JSONDecodeError:
+                if self._fill():
+                    continue  # Value runs past the buffer
+                raise
+            # A number (or literal) ending exactly at the buffer edge may continue in the next chunk
+            if end == len(self.buf) and self._fill():
+                continue
+            self.pos = end
+            return value
+
+
+def _object(reader: _Reader, path: Sequence[str], on_item: Callable[[Any], None]) -> dict:
+    reader.expect("{")
+    result = {}
+    if reader.peek() == "}":
+        reader.pos += 1
+        return result
+    while True:
+        if reader.peek() != '"':
+            raise json.JSONDecodeError("Expecting property name enclosed in double quotes", reader.buf, reader.pos)
+        key = reader.value()
+        reader.expect(":")
+        if path and key == path[0] and reader.peek() == ("[" if len(path) == 1 else "{"):
+            result[key] = _array(reader, on_item) if len(path) == 1 else _object(reader, path[1:], on_item)
+        else:
+            result[key] = reader.value()
+        if reader.expect(",}") == "}":
+            return result
+
+
+def _array(reader: _Reader, on_item: Callable[[Any], None]) -> list:
+    reader.expect("[")
+    if reader.peek() == "]":
+        reader.pos += 1
+        return []
+    while True:
+        on_item(reader.value())
+        if reader.expect(",]") == "]":
+            return []
+
+
+def load(chunks: Iterable[bytes], path: Sequence[str], on_item: Callable[[Any], None]) -> Any:
+    """Decode a UTF-8 JSON document, streaming the array at path through on_item.
+
+    Args:
+        chunks: The document's bytes, in pieces of any size
+        path: Object keys leading to the array to stream
+        on_item: Called with each element of that array, in order
+
+    Returns:
+        The document, with the streamed array left empty ({} for an
+        empty body, like lib.http.request).
+
+    Raises:
+        ValueError: On invalid JSON or UTF-8 (json.JSONDecodeError /
+            UnicodeDecodeError)
+    """
+    reader = _Reader(chunks)
+    first = reader.peek()
+    if not first:
+        return {}
+    result = _object(reader, path, on_item) if first == "{" else reader.value()
+    if reader.peek():
+        raise json.JSONDecodeError("Extra data", reader.buf, reader.pos)
+    return result
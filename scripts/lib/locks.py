@@ -0,0 +1,106 @@
+"""Advisory file locks for coordinating date-planner processes."""
+
+import os
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Iterator, Optional
+
+try:
+    import fcntl
+except ImportError:  # Windows: no cross-process locking
+    fcntl = None
+
+POLL_INTERVAL = 0.05
+
+
+def _still_linked(lock_file, path: Path) -> bool:
+    """Whether path still names the file we locked (prune_lock may have removed it)."""
+    try:
+        return os.path.samestat(os.fstat(lock_file.fileno()), os.stat(path))
+    except OSError:
+        return False
+
+
+def _acquire(path: Path, deadline: Optional[float]):
+    """Open and lock path. Returns (file, locked), or (None, False) if it can't be opened."""
+    while True:
+        try:
+            path.parent.mkdir(parents=True, exist_ok=True)
+            lock_file = open(path, "a")
+        except OSError:
+            return None, False
+        try:
+            if deadline is None:
+                fcntl.flock(lock_file, fcntl.LOCK_EX)
+            else:
+                while True:
+                    try:
+                        fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                        break
+                    except BlockingIOError:
+                        if time.monotonic() >= deadline:
+                            return lock_file, False
+                        time.sleep(POLL_INTERVAL)
+        except BaseException:
+            lock_file.close()
+            raise
+        if _still_linked(lock_file, path):
+            return lock_file, True
+        # Pruned while we waited: lock the file that is there now instead
+        fcntl.flock(lock_file, fcntl.LOCK_UN)
+        lock_file.close()
+
+
+@contextmanager
+def file_lock(path: Path, timeout: Optional[float] = None) -> Iterator[bool]:
+    """Hold an exclusive lock on path for the duration of the block.
+
+    Yields True once the lock is held, or False if it could not be taken
+    within timeout seconds (None = wait forever, 0 = don't wait) or file
+    locking is unavailable. Callers decide whether to proceed unlocked.
+    """
+    if fcntl is None:
+        yield False
+        return
+    deadline = None if timeout is None else time.monotonic() + timeout
+    lock_file, acquired = _acquire(path, deadline)
+    if lock_file is None:
+        yield False
+        return
+    try:
+        yield acquired
+    finally:
+        if acquired:
+            fcntl.flock(lock_file, fcntl.LOCK_UN)
+        lock_file.close()
+
+
+def prune_lock(path: Path) -> bool:
+    """Delete a lock file if nobody holds it. Returns whether it was removed.
+
+    The file is unlinked while we hold the lock ourselves, and file_lock
+    re-checks after locking that the file is still in place, so a process
+    that opened it just before it went away retries on the new file.
+    """
+    if fcntl is None:
+        return False
+    try:
+        lock_file = open(path, "a")
+    except OSError:
+        return False
+    try:
+        fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+    except OSError:
+        lock_file.close()
+        return False  # Held (or can't be locked): leave it
+    try:
+        if not _still_linked(lock_file, path):
+            return False
+        path.unlink()
+        return True
+    except OSError:
+        return False
+    finally:
+        fcntl.flock(lock_file, fcntl.LOCK_UN)
+        lock_file.close()
@@ -0,0 +1,111 @@
+"""Asyncio orchestration for fetching everything a date plan needs at once.
+
+A plan is a set of jobs, each a blocking provider call (Ticketmaster,
+Google Places, local query builders) tagged with its provider. The engine
+runs them all concurrently on one event loop:
+
+- each provider has its own concurrency limit (an asyncio.Semaphore), on
+  top of lib.http's per-host rate limit;
+- one global deadline bounds the whole plan: whatever has finished by
+  then is returned, and the rest is reported as timed out.
+
+Provider calls stay synchronous (they share lib.http's keep-alive pool,
+rate limiter and cache), so each one runs in a daemon thread and is
+awaited as a future. A call still running at the deadline is abandoned
+rather than waited for, so it can't hold the process open.
+"""
+
+import asyncio
+import threading
+import time
+from typing import Any, Callable, Dict, List, NamedTuple, Optional
+
+# Max calls in flight per provider
+PROVIDER_LIMITS: Dict[str, int] = {
+    "ticketmaster": 4,
+    "google_places": 4,
+    "local": 8,
+}
+DEFAULT_LIMIT = 4
+DEFAULT_DEADLINE = 15.0  # Seconds for the whole plan
+
+
+class Job(NamedTuple):
+    """One provider call. key must be unique within a plan."""
+    key: str
+    provider: str
+    call: Callable[[], Any]
+
+
+def _run_in_daemon_thread(loop: asyncio.AbstractEventLoop, call: Callable[[], Any]) -> "asyncio.Future":
+    """Run a blocking call in a daemon thread and return a future for its result."""
+    future = loop.create_future()
+
+    def settle(value: Any, error: Optional[BaseException]):
+        if future.done():
+            return  # Cancelled at the deadline
+        if error is not None:
+            future.set_exception(error)
+        else:
+            future.set_result(value)
+
+    def run():
+        try:
+            value, error = call(), None
+        except Exception as e:
+            value, error = None, e
+        try:
+            loop.call_soon_threadsafe(settle, value, error)
+        except RuntimeError:
+            pass  # Loop already closed: the plan finished without us
+
+    threading.Thread(target=run, daemon=True).start()
+    return future
+
+
+async def run_jobs(
+    jobs: List[Job],
+    deadline: float = DEFAULT_DEADLINE,
+    limits: Optional[Dict[str, int]] = None,
+) -> Dict[str, Any]:
+    """Run jobs concurrently until they finish or deadline seconds pass.
+
+    Returns {"results": {key: result}, "timed_out": [keys], "elapsed": seconds}.
+    A job that raised gets {"error": "..."} as its result; a job cut off by
+    the deadline gets {"error": "Deadline of Ns reached"} and is listed in
+    timed_out.
+    """
+    limits = {**PROVIDER_LIMITS, **(limits or {})}
+    loop = asyncio.get_running_loop()
+    semaphores: Dict[str, asyncio.Semaphore] = {}
+    started = time.monotonic()
+
+    async def run(job: Job) -> Any:
+        semaphore = semaphores.setdefault(job.provider, asyncio.Semaphore(limits.get(job.provider, DEFAULT_LIMIT)))
+        async with semaphore:
+            return await _run_in_daemon_thread(loop, job.call)
+
+    tasks = {job.key: asyncio.ensure_future(run(job)) for job in jobs}
+    if tasks:
+        await asyncio.wait(tasks.values(), timeout=deadline)
+
+    results: Dict[str, Any] = {}
+    timed_out = []
+    for key, task in tasks.items():
+        if not task.done():
+            task.cancel()
+            timed_out.append(key)
+            results[key] = {"error": f"Deadline of {deadline:g}s reached"}
+        elif task.exception() is not None:
+            error = task.exception()
+            results[key] = {"error": f"{type(error).__name__}: {error}"}
+        else:
+            results[key] = task.result()
+
+    return {"results": results, "timed_out": timed_out, "elapsed": round(time.monotonic() - started, 2)}
+
+
+def run_plan(jobs: List[Job], deadline: float = DEFAULT_DEADLINE,
+             limits: Optional[Dict[str, int]] = None) -> Dict[str, Any]:
+    """Blocking wrapper around run_jobs for scripts."""
+    return asyncio.run(run_jobs(jobs, deadline=deadline, limits=limits))
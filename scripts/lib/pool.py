@@ -0,0 +1,76 @@
+"""Bounded concurrent fan-out for date-planner (stdlib only)."""
+
+import threading
+import time
+from typing import Any, Callable, Dict, Optional
+
+DEFAULT_WORKERS = 4
+
+
+def _error_result(message: str) -> Dict[str, Any]:
+    return {"error": message}
+
+
+def fan_out(
+    tasks: Dict[str, Callable[[], Any]],
+    max_workers: int = DEFAULT_WORKERS,
+    timeout: Optional[float] = None,
+    on_error: Callable[[str], Any] = _error_result,
+) -> Dict[str, Any]:
+    """Run tasks concurrently and collect their results by key.
+
+    At most max_workers tasks run at once. Each task gets its own timeout,
+    measured from when it starts; a task that overruns is abandoned (its
+    daemon thread is left to finish in the background) and its slot is
+    handed to the next pending task.
+
+    Args:
+        tasks: Mapping of result key to zero-argument callable
+        max_workers: Max tasks running at the same time
+        timeout: Per-task timeout in seconds (None = wait forever)
+        on_error: Builds the result for a task that raised or timed out
+
+    Returns:
+        Dict with the same keys (and order) as tasks
+    """
+    workers = max(1, max_workers)
+    results: Dict[str, Any] = {}
+    pending = list(tasks.items())
+    running: Dict[str, float] = {}
+    cond = threading.Condition()
+
+    def run(key: str, fn: Callable[[], Any]):
+        try:
+            value = fn()
+        except Exception as e:
+            value = on_error(f"{type(e).__name__}: {e}")
+        with cond:
+            # Ignore late results from tasks that already timed out
+            if key in running:
+                del running[key]
+                results[key] = value
+            cond.notify_all()
+
+    with cond:
+        while pending or running:
+            while pending and len(running) < workers:
+                key, fn = pending.pop(0)
+                running[key] = time.monotonic()
+                threading.Thread(target=run, args=(key, fn), daemon=True).start()
+
+            wait = None
+            if timeout is not None:
+                now = time.monotonic()
+                for key, started in list(running.items()):
+                    if now - started >= timeout:
+                        del running[key]
+                        results[key] = on_error(f"Timed out after {timeout:g}s")
+                if pending and len(running) < workers:
+                    continue
+                if running:
+                    wait = min(running.values()) + timeout - now
+
+            if running:
+                cond.wait(wait)
+
+    return {key: results[key] for key in tasks}
@@ -0,0 +1,199 @@
+"""cProfile / tracemalloc hooks for the fetch scripts (--profile cpu|mem).
+
+- cpu: profiles the run, including threads it starts (fan-out workers,
+  page prefetch), and writes a pstats file: <script>-<time>-<pid>.cpu.prof.
+- mem: traces allocations with tracemalloc. Around every HTTP send, JSON
+  decode (whole or streamed) and _parse_events/_parse_places call (the
+  lib.trace stages) it tracks peak and retained memory, and writes the
+  top allocation sites per stage and for the whole run to
+  <script>-<time>-<pid>.mem.json.
+
+Turn on with --profile or DATEKIT_PROFILE=cpu|mem. Output goes to
+--profile-dir, DATEKIT_PROFILE_DIR or ~/.cache/datekit/profiles.
+scripts/profile_summary.py summarizes or compares the files. Profilers
+are process-wide, so profiled runs never go to the daemon (lib.daemon).
+
+Stages in concurrent threads overlap, so per-stage memory numbers are
+approximate when a run fans out; run a single query for clean numbers.
+"""
+
+import cProfile
+import json
+import os
+import pstats
+import sys
+import threading
+import time
+import tracemalloc
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional
+
+from . import trace
+from .cache import CACHE_DIR
+
+MODES = ("cpu", "mem")
+DEFAULT_DIR = CACHE_DIR / "profiles"
+TOP_ALLOCATIONS = 15
+# Snapshot diffs per stage; later calls only update counters. Snapshots of a
+# large page's decode take a while, and fan-out threads wait on each other.
+SNAPSHOTS_PER_STAGE = 1
+
+
+def profile_mode(flag: Optional[str] = None) -> Optional[str]:
+    """The requested mode: the --profile flag, else DATEKIT_PROFILE, else None."""
+    mode = flag or os.environ.get("DATEKIT_PROFILE", "").lower() or None
+    return mode if mode in MODES else None
+
+
+def output_dir(flag: Optional[str] = None) -> Path:
+    return Path(flag or os.environ.get("DATEKIT_PROFILE_DIR") or DEFAULT_DIR)
+
+
+def _base_name(script: str) -> str:
+    return f"{Path(script).stem}-{time.strftime('%Y%m%d-%H%M%S')}-{os.getpid()}"
+
+
+def _top(stats: List["tracemalloc.StatisticDiff"], limit: int = TOP_ALLOCATIONS) -> List[Dict[str, Any]]:
+    top = []
+    for stat in stats[:limit]:
+        frame = stat.traceback[0]
+        top.append({
+            "where": f"{short_path(frame.filename)}:{frame.lineno}",
+            "size_kb": round(stat.size_diff / 1024, 1),
+            "count": stat.count_diff,
+        })
+    return top
+
+
+def short_path(filename: str) -> str:
+    """Trim a source path to something readable (relative to scripts/ or the stdlib)."""
+    path = Path(filename)
+    parts = path.parts
+    for anchor in ("scripts", "site-packages"):
+        if anchor in parts:
+            return str(Path(*parts[parts.index(anchor) + 1:]))
+    for i in range(len(parts) - 1, -1, -1):
+        if parts[i].startswith("python3"):
+            return str(Path(*parts[i + 1:]))
+    return filename
+
+
+class _MemoryStages:
+    """Stage hook: peak / retained memory and allocation diffs per stage."""
+
+    def __init__(self):
+        self.stages: Dict[str, Dict[str, Any]] = {}
+        self._open: Dict[tuple, tuple] = {}
+        self._lock = threading.Lock()
+        self._sampled: Dict[str, int] = {}
+        self.peak = 0  # Stages reset tracemalloc's peak, so the run's peak is kept here
+
+    def __call__(self, name: str, entering: bool):
+        key = (threading.get_ident(), name)
+        if entering:
+            with self._lock:
+                sample = self._sampled.get(name, 0) < SNAPSHOTS_PER_STAGE
+                if sample:
+                    self._sampled[name] = self._sampled.get(name, 0) + 1
+            snapshot = tracemalloc.take_snapshot() if sample else None
+            self.peak = max(self.peak, tracemalloc.get_traced_memory()[1])
+            tracemalloc.reset_peak()
+            self._open[key] = (tracemalloc.get_traced_memory()[0], snapshot)
+            return
+        opened = self._open.pop(key, None)
+        if opened is None:
+            return
+        before, snapshot = opened
+        current, peak = tracemalloc.get_traced_memory()
+        top = None
+        if snapshot is not None:
+            top = _top(tracemalloc.take_snapshot().compare_to(snapshot, "lineno"))
+        with self._lock:
+            stage = self.stages.setdefault(name, {"count": 0, "peak_kb_max": 0.0, "retained_kb_total": 0.0,
+                                                  "top": []})
+            self.peak = max(self.peak, peak)
+            stage["count"] += 1
+            stage["peak_kb_max"] = max(stage["peak_kb_max"], round((peak - before) / 1024, 1))
+            stage["retained_kb_total"] = round(stage["retained_kb_total"] + (current - before) / 1024, 1)
+            if top is not None and (not stage["top"] or sum(t["size_kb"] for t in top)
+                                    > sum(t["size_kb"] for t in stage["top"])):
+                stage["top"] = top  # Keep the heaviest sampled call
+
+
+@contextmanager
+def _profile_cpu(path: Path) -> Iterator[None]:
+    main = cProfile.Profile()
+    thread_profiles: List[cProfile.Profile] = []
+    lock = threading.Lock()
+
+    def start_thread_profile(*_):
+        # Runs as the first profile event in each new thread; enable() then
+        # replaces this hook with the thread's own profiler.
+        profile = cProfile.Profile()
+        with lock:
+            thread_profiles.append(profile)
+        profile.enable()
+
+    threading.setprofile(start_thread_profile)
+    main.enable()
+    try:
+        yield
+    finally:
+        main.disable()
+        threading.setprofile(None)
+        main.create_stats()
+        stats = pstats.Stats(main)
+        with lock:
+            for profile in thread_profiles:
+                profile.disable()
+                profile.create_stats()
+                if profile.stats:
+                    stats.add(profile)
+        stats.dump_stats(str(path))
+
+
+@contextmanager
+def _profile_memory(path: Path, script: str) -> Iterator[None]:
+    started_here = not tracemalloc.is_tracing()
+    if started_here:
+        tracemalloc.start()  # One frame: allocations are grouped by line
+    baseline = tracemalloc.take_snapshot()
+    stages = _MemoryStages()
+    trace.add_hook(stages)
+    try:
+        yield
+    finally:
+        trace.remove_hook(stages)
+        current, peak = tracemalloc.get_traced_memory()
+        report = {
+            "script": script,
+            "peak_kb": round(max(peak, stages.peak) / 1024, 1),
+            "retained_kb": round(current / 1024, 1),
+            "top": _top(tracemalloc.take_snapshot().compare_to(baseline, "lineno")),
+            "stages": stages.stages,
+        }
+        if started_here:
+            tracemalloc.stop()
+        path.write_text(json.dumps(report, indent=2) + "\n")
+
+
+@contextmanager
+def profiled(mode: Optional[str], script: str, directory: Optional[str] = None) -> Iterator[None]:
+    """Profile the block in mode ("cpu", "mem" or None for off) and report where the file went."""
+    mode = profile_mode(mode)
+    if mode is None:
+        yield
+        return
+    out_dir = output_dir(directory)
+    out_dir.mkdir(parents=True, exist_ok=True)
+    path = out_dir / f"{_base_name(script)}.{mode}.{'prof' if mode == 'cpu' else 'json'}"
+    try:
+        if mode == "cpu":
+            with _profile_cpu(path):
+                yield
+        else:
+            with _profile_memory(path, Path(script).name):
+                yield
+    finally:
+        print(f"Profile written to {path}", file=sys.stderr)
@@ -0,0 +1,135 @@
+"""Cross-process token-bucket rate limiting for date-planner.
+
+Each rate-limited host gets a bucket whose state lives in a small JSON
+file under ~/.cache/datekit/ratelimit. The file is guarded by an flock'd
+lock file, so concurrent skill invocations share one budget per host.
+
+Buckets hand out reservations: a caller always takes a token, letting the
+balance go negative, and then sleeps until its reserved slot comes up.
+Callers therefore queue in lock order instead of polling.
+"""
+
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Dict, Optional, Tuple
+
+from .cache import CACHE_DIR
+from .locks import file_lock
+
+STATE_DIR = CACHE_DIR / "ratelimit"
+
+# Provider name -> API host
+PROVIDER_HOSTS = {
+    "ticketmaster": "app.ticketmaster.com",
+    "google_places": "places.googleapis.com",
+}
+
+# Host -> (requests per second, burst size)
+DEFAULT_LIMITS: Dict[str, Tuple[float, int]] = {
+    "app.ticketmaster.com": (5.0, 5),  # Free tier: 5 calls/second
+    "places.googleapis.com": (10.0, 10),  # Default quota: 600 calls/minute
+}
+
+_limits: Dict[str, Tuple[float, int]] = dict(DEFAULT_LIMITS)
+_thread_lock = threading.Lock()
+_memory_state: Dict[str, Dict[str, float]] = {}
+
+
+def set_limit(host: str, rate: Optional[float], burst: Optional[int] = None):
+    """Set (or with rate=None, remove) the limit for a host."""
+    if not rate:
+        _limits.pop(host, None)
+        return
+    _limits[host] = (float(rate), max(1, int(burst if burst is not None else rate)))
+
+
+def set_provider_limit(provider: str, rate: Optional[float], burst: Optional[int] = None):
+    """Set the limit for a provider by name (e.g. "ticketmaster")."""
+    host = PROVIDER_HOSTS.get(provider)
+    if host:
+        set_limit(host, rate, burst)
+
+
+def get_limit(host: str) -> Optional[Tuple[float, int]]:
+    """Return (rate, burst) for a host, or None if it is not limited."""
+    return _limits.get(host)
+
+
+def _state_path(host: str) -> Path:
+    return STATE_DIR / f"{host}.json"
+
+
+@contextmanager
+def _locked(host: str):
+    """Hold the in-process lock and, where supported, the host's file lock.
+
+    Yields the shared state file path, or None to use a per-process bucket
+    (no file locking, or an unwritable cache dir).
+    """
+    with _thread_lock:
+        with file_lock(STATE_DIR / f"{host}.lock") as locked:
+            yield _state_path(host) if locked else None
+
+
+def _read_state(path: Optional[Path], host: str) -> Optional[Dict[str, float]]:
+    if path is None:
+        return _memory_state.get(host)
+    try:
+        with open(path) as f:
+            return json.load(f)
+    except (json.JSONDecodeError, OSError):
+        return None
+
+
+def _write_state(path: Optional[Path], host: str, state: Dict[str, float]):
+    if path is None:
+        _memory_state[host] = state
+        return
+    try:
+        tmp = path.with_suffix(f".{os.getpid()}.tmp")
+        with open(tmp, "w") as f:
+            json.dump(state, f)
+        os.replace(tmp, path)
+    except OSError:
+        _memory_state[host] = state
+
+
+def reserve(host: str, max_wait: Optional[float] = None) -> Optional[float]:
+    """Take a token for host and return how long to wait before using it.
+
+    With max_wait, a token that would need a longer wait is not taken and
+    None is returned instead.
+    """
+    limit = _limits.get(host)
+    if not limit:
+        return 0.0
+    rate, burst = limit
+
+    with _locked(host) as path:
+        now = time.time()
+        state = _read_state(path, host) or {"tokens": float(burst), "updated": now}
+        elapsed = max(0.0, now - state.get("updated", now))
+        tokens = min(float(burst), state.get("tokens", float(burst)) + elapsed * rate)
+        tokens -= 1.0
+        wait = 0.0 if tokens >= 0 else -tokens / rate
+        if max_wait is not None and wait > max_wait:
+            return None
+        _write_state(path, host, {"tokens": tokens, "updated": now})
+
+    return wait
+
+
+def acquire(host: str, max_wait: Optional[float] = None) -> Optional[float]:
+    """Block until host allows another request. Returns seconds waited.
+
+    Returns None without waiting (or taking a token) if that would take
+    longer than max_wait seconds.
+    """
+    wait = reserve(host, max_wait)
+    if wait:
+        time.sleep(wait)
+    return wait
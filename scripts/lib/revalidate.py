@@ -0,0 +1,36 @@
+"""Background refresh worker for lib.cache's "process" revalidate mode.
+
+lib.cache starts this detached, as `python -m lib.revalidate` from the
+scripts directory, when a CLI run that served soft-expired entries exits.
+It reads a JSON list of {"key", "ttl_hours", "module", "function",
+"kwargs"} (see cache.RefreshSpec) from stdin and refetches each key,
+skipping any that another thread or process is already fetching. Only
+those cache entries are written: the command that served them is not
+run again.
+"""
+
+import importlib
+import json
+import sys
+
+from . import cache
+
+
+def main():
+    try:
+        specs = json.load(sys.stdin)
+    except ValueError:
+        return
+    for spec in specs:
+        try:
+            with cache.key_lock(spec["key"], timeout=0) as locked:
+                if not locked:
+                    continue
+                fetch = getattr(importlib.import_module(spec["module"]), spec["function"])
+                cache.save_cache(spec["key"], fetch(**spec["kwargs"]), ttl_hours=spec["ttl_hours"])
+        except Exception:
+            continue  # Keep serving the stale copy; the next lookup retries
+
+
+if __name__ == "__main__":
+    main()
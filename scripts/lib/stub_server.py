@@ -0,0 +1,363 @@
+"""Local stand-in for the Ticketmaster Discovery and Places searchText APIs.
+
+Used by scripts/bench.py, and handy for offline runs: point the clients
+at it with
+
+    DATEKIT_TICKETMASTER_URL=http://127.0.0.1:PORT/discovery/v2
+    DATEKIT_PLACES_URL=http://127.0.0.1:PORT/v1/places:searchText
+
+Payloads are synthetic but shaped like the real APIs' responses,
+including the images, classifications and _embedded blobs the parsers
+throw away. They are deterministic per query, so repeated runs see the
+same data. Files in a recorded directory (events.json, venues.json,
+places.json) are served verbatim instead. Latency, 500s and 429s (with
+Retry-After) are injected at configurable rates.
+
+Endpoints: GET /discovery/v2/events.json, GET /discovery/v2/venues.json,
+POST /v1/places:searchText, and GET /__stats for request counts.
+"""
+
+import hashlib
+import json
+import random
+import threading
+import time
+from datetime import date, datetime, timedelta
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import Any, Dict, NamedTuple, Optional
+from urllib.parse import parse_qs, urlsplit
+
+# Venue searches for names starting with this return nothing
+NOT_FOUND_PREFIX = "Unlisted"
+
+
+class StubConfig(NamedTuple):
+    """How the stub behaves. Rates are fractions of data requests (0-1)."""
+    latency: float = 0.0  # Seconds added to every data request
+    jitter: float = 0.0  # Extra random 0..jitter seconds
+    error_rate: float = 0.0  # Answered with 500
+    throttle_rate: float = 0.0  # Answered with 429 + Retry-After
+    retry_after: float = 1.0
+    events_per_query: int = 200
+    places_per_query: int = 40
+    recorded_dir: Optional[str] = None
+    seed: int = 0
+
+
+def _digest(*parts: Any) -> str:
+    return hashlib.sha1("|".join(str(p) for p in parts).encode()).hexdigest()
+
+
+def _parse_day(value: Optional[str], default: date) -> date:
+    try:
+        return datetime.strptime(value[:10], "%Y-%m-%d").date() if value else default
+    except ValueError:
+        return default
+
+
+def make_event(query_key: str, index: int, day: date, classification: str = "Music") -> Dict[str, Any]:
+    """One event as the Discovery API returns it, bulk included."""
+    event_id = f"Z{_digest(query_key, index)[:15]}"
+    venue_id = f"KV{_digest('venue', index % 25)[:8]}"
+    images = [
+        {"ratio": ratio, "url": f"https://s1.ticketm.net/dam/a/{event_id}_{ratio}_{width}.jpg",
+         "width": width, "height": width * 9 // 16, "fallback": False}
+        for ratio, width in [("16_9", 2048), ("16_9", 1136), ("16_9", 640), ("3_2", 1024),
+                             ("3_2", 640), ("4_3", 305), ("16_9", 205), ("3_2", 305),
+                             ("16_9", 100), ("1_1", 1024)]
+    ]
+    segment = {"id": f"KZFzniwnSyZfZ7v7n{classification[0]}", "name": classification}
+    genre = {"id": f"KnvZfZ7vAe{index % 7}", "name": ["Rock", "Pop", "Jazz", "Alternative",
+                                                        "Comedy", "Drama", "Hip-Hop/Rap"][index % 7]}
+    return {
+        "name": f"{classification} Night {index}",
+        "type": "event",
+        "id": event_id,
+        "test": False,
+        "url": f"https://www.ticketmaster.com/event/{event_id}",
+        "locale": "en-us",
+        "images": images,
+        "sales": {
+            "public": {"startDateTime": "2026-01-01T18:00:00Z", "startTBD": False, "startTBA": False,
+                       "endDateTime": f"{day.isoformat()}T23:00:00Z"},
+            "presales": [{"startDateTime": "2025-12-30T15:00:00Z", "endDateTime": "2025-12-31T03:00:00Z",
+                          "name": name} for name in ("Artist Presale", "Venue Presale", "Spotify Presale")],
+        },
+        "dates": {
+            "start": {"localDate": day.isoformat(), "localTime": f"{19 + index % 3}:00:00",
+                      "dateTime": f"{day.isoformat()}T0{index % 3}:00:00Z", "dateTBD": False,
+                      "dateTBA": False, "timeTBA": False, "noSpecificTime": False},
+            "timezone": "America/Chicago",
+            "status": {"code": "cancelled" if index % 50 == 49 else "onsale"},
+            "spanMultipleDays": False,
+        },
+        "classifications": [{
+            "primary": True, "segment": segment, "genre": genre,
+            "subGenre": {"id": "KZazBEonSMnZfZ7v6F1", "name": "Pop"},
+            "type": {"id": "KZAyXgnZfZ7v7nI", "name": "Undefined"},
+            "subType": {"id": "KZFzBErXgnZfZ7v7lJ", "name": "Undefined"},
+            "family": False,
+        }],
+        "promoter": {"id": "494", "name": "PROMOTED BY VENUE", "description": "PROMOTED BY VENUE / NTL / US"},
+        "promoters": [{"id": "494", "name": "PROMOTED BY VENUE", "description": "PROMOTED BY VENUE / NTL / US"}],
+        "info": "All ages. " * 8,
+        "pleaseNote": "No re-entry. Bag policy is strictly enforced. " * 4,
+        "priceRanges": [{"type": "standard", "currency": "USD", "min": 20.0 + index % 40, "max": 60.0 + index % 90}],
+        "seatmap": {"staticUrl": f"https://maps.ticketmaster.com/maps/geometry/3/event/{event_id}/staticImage"},
+        "accessibility": {"ticketLimit": 4, "info": "Accessible seating available."},
+        "ticketLimit": {"info": "There is an 8 ticket limit for this event."},
+        "ageRestrictions": {"legalAgeEnforced": False},
+        "ticketing": {"safeTix": {"enabled": True}, "allInclusivePricing": {"enabled": False}},
+        "_links": {
+            "self": {"href": f"/discovery/v2/events/{event_id}?locale=en-us"},
+            "attractions": [{"href": f"/discovery/v2/attractions/K8v{index}?locale=en-us"}],
+            "venues": [{"href": f"/discovery/v2/venues/{venue_id}?locale=en-us"}],
+        },
+        "_embedded": {
+            "venues": [make_venue(f"Stub Venue {index % 25}", venue_id)],
+            "attractions": [{
+                "name": f"Artist {index}", "type": "attraction", "id": f"K8v{index}",
+                "url": f"https://www.ticketmaster.com/artist/{index}", "locale": "en-us",
+                "images": images[:4], "classifications": [{"primary": True, "segment": segment, "genre": genre}],
+                "upcomingEvents": {"ticketmaster": 3, "_total": 3, "_filtered": 0},
+                "_links": {"self": {"href": f"/discovery/v2/attractions/K8v{index}?locale=en-us"}},
+            }],
+        },
+    }
+
+
+def make_venue(name: str, venue_id: str) -> Dict[str, Any]:
+    """One venue as the Discovery API returns it."""
+    return {
+        "name": name, "type": "venue", "id": venue_id, "test": False, "locale": "en-us",
+        "url": f"https://www.ticketmaster.com/venue/{venue_id}",
+        "postalCode": "60614", "timezone": "America/Chicago",
+        "city": {"name": "Chicago"}, "state": {"name": "Illinois", "stateCode": "IL"},
+        "country": {"name": "United States Of America", "countryCode": "US"},
+        "address": {"line1": "123 N Stub St"},
+        "location": {"longitude": "-87.6298", "latitude": "41.8781"},
+        "markets": [{"name": "Chicagoland and Northern Illinois", "id": "3"}],
+        "dmas": [{"id": 249}, {"id": 373}],
+        "upcomingEvents": {"ticketmaster": 42, "_total": 42, "_filtered": 0},
+        "_links": {"self": {"href": f"/discovery/v2/venues/{venue_id}?locale=en-us"}},
+    }
+
+
+def make_events_page(query_key: str, page: int, size: int, total: int, start: date, end: date,
+                     classification: str = "Music") -> Dict[str, Any]:
+    """An events.json page: `total` events spread evenly over start..end, date-sorted."""
+    days = max(1, (end - start).days + 1)
+    first = page * size
+    indices = range(first, min(first + size, total))
+    data: Dict[str, Any] = {
+        "_links": {"self": {"href": f"/discovery/v2/events.json?page={page}&size={size}"}},
+        "page": {"size": size, "totalElements": total,
+                 "totalPages": (total + size - 1) // size if size else 0, "number": page},
+    }
+    if indices:
+        data["_embedded"] = {"events": [
+            make_event(query_key, i, start + timedelta(days=i * days // total), classification)
+            for i in indices
+        ]}
+    return data
+
+
+def make_place(query_key: str, index: int) -> Dict[str, Any]:
+    """One Places (New) result with every field the clients can ask for."""
+    place_id = f"ChIJ{_digest(query_key, index)[:23]}"
+    periods = [{"open": {"day": day, "hour": 11 + index % 3, "minute": 0},
+                "close": {"day": (day + 1) % 7 if index % 4 == 0 else day, "hour": 1 if index % 4 == 0 else 22,
+                          "minute": 0}} for day in range(7)]
+    return {
+        "id": place_id,
+        "displayName": {"text": f"Stub Kitchen {index}", "languageCode": "en"},
+        "formattedAddress": f"{100 + index} W Stub Ave, Chicago, IL 60614, USA",
+        "googleMapsUri": f"https://maps.google.com/?cid={int(_digest(place_id)[:12], 16)}",
+        "priceLevel": ["PRICE_LEVEL_INEXPENSIVE", "PRICE_LEVEL_MODERATE", "PRICE_LEVEL_EXPENSIVE"][index % 3],
+        "rating": round(3.5 + (index % 15) / 10, 1),
+        "userRatingCount": 50 + index * 7,
+        "websiteUri": f"https://stub-kitchen-{index}.example.com/",
+        "regularOpeningHours": {
+            "openNow": True, "periods": periods,
+            "weekdayDescriptions": [f"Day {d}: 11:00 AM - 10:00 PM" for d in range(7)],
+        },
+        "types": ["restaurant", "food", "point_of_interest", "establishment"],
+        "location": {"latitude": 41.9 + index / 1000, "longitude": -87.65 - index / 1000},
+    }
+
+
+class StubServer(ThreadingHTTPServer):
+    """Threaded stub server. start() serves from a daemon thread; close() stops it."""
+
+    daemon_threads = True
+
+    def __init__(self, config: StubConfig = StubConfig(), host: str = "127.0.0.1", port: int = 0):
+        super().__init__((host, port), _Handler)
+        self.config = config
+        self._rng = random.Random(config.seed)
+        self._lock = threading.Lock()
+        self.counts: Dict[str, int] = {}
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def base_url(self) -> str:
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def client_env(self) -> Dict[str, str]:
+        """Environment variables that point the API clients at this server."""
+        return {
+            "DATEKIT_TICKETMASTER_URL": f"{self.base_url}/discovery/v2",
+            "DATEKIT_PLACES_URL": f"{self.base_url}/v1/places:searchText",
+        }
+
+    def start(self) -> "StubServer":
+        self._thread = threading.Thread(target=self.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def close(self):
+        self.shutdown()
+        self.server_close()
+
+    def count(self, name: str):
+        with self._lock:
+            self.counts[name] = self.counts.get(name, 0) + 1
+
+    def roll(self) -> float:
+        with self._lock:
+            return self._rng.random()
+
+    def recorded(self, name: str) -> Optional[bytes]:
+        if not self.config.recorded_dir:
+            return None
+        path = Path(self.config.recorded_dir) / name
+        try:
+            return path.read_bytes()
+        except OSError:
+            return None
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"  # Keep-alive, as lib.connpool expects
+    server: StubServer
+
+    def log_message(self, format, *args):
+        pass
+
+    def _send(self, status: int, body: bytes, headers: Optional[Dict[str, str]] = None):
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _send_json(self, data: Any):
+        self._send(200, json.dumps(data).encode())
+
+    def _inject_faults(self, endpoint: str) -> bool:
+        """Apply latency, then maybe answer with a 429 or 500. True if answered."""
+        config = self.server.config
+        self.server.count(endpoint)
+        delay = config.latency + (self.server.roll() * config.jitter if config.jitter else 0.0)
+        if delay:
+            time.sleep(delay)
+        roll = self.server.roll()
+        if roll < config.throttle_rate:
+            self.server.count("429")
+            self._send(429, b'{"fault": "rate limited"}', {"Retry-After": f"{config.retry_after:g}"})
+            return True
+        if roll < config.throttle_rate + config.error_rate:
+            self.server.count("500")
+            self._send(500, b'{"fault": "internal error"}')
+            return True
+        return False
+
+    def do_GET(self):
+        parts = urlsplit(self.path)
+        params = {k: v[-1] for k, v in parse_qs(parts.query).items()}
+        if parts.path == "/__stats":
+            self._send_json(dict(self.server.counts))
+        elif parts.path.endswith("/events.json"):
+            if not self._inject_faults("events"):
+                self._events(params)
+        elif parts.path.endswith("/venues.json"):
+            if not self._inject_faults("venues"):
+                self._venues(params)
+        else:
+            self._send(404, b'{"fault": "not found"}')
+
+    def do_POST(self):
+        length = int(self.headers.get("Content-Length") or 0)
+        raw = self.rfile.read(length) if length else b""
+        if not urlsplit(self.path).path.endswith("places:searchText"):
+            self._send(404, b'{"fault": "not found"}')
+            return
+        if self._inject_faults("places"):
+            return
+        try:
+            body = json.loads(raw or b"{}")
+        except ValueError:
+            self._send(400, b'{"error": {"message": "Invalid JSON"}}')
+            return
+        self._places(body, self.headers.get("X-Goog-FieldMask", ""))
+
+    def _events(self, params: Dict[str, str]):
+        recorded = self.server.recorded("events.json")
+        if recorded is not None:
+            self._send(200, recorded)
+            return
+        today = date.today()
+        start = _parse_day(params.get("startDateTime"), today)
+        end = _parse_day(params.get("endDateTime"), start + timedelta(days=30))
+        query_key = _digest(*sorted((k, v) for k, v in params.items() if k not in ("apikey", "page", "size")))
+        self._send_json(make_events_page(
+            query_key,
+            page=int(params.get("page", 0)),
+            size=int(params.get("size", 20)),
+            total=self.server.config.events_per_query,
+            start=start,
+            end=max(start, end),
+            classification=params.get("classificationName", "Music"),
+        ))
+
+    def _venues(self, params: Dict[str, str]):
+        recorded = self.server.recorded("venues.json")
+        if recorded is not None:
+            self._send(200, recorded)
+            return
+        keyword = params.get("keyword", "")
+        if not keyword or keyword.startswith(NOT_FOUND_PREFIX):
+            self._send_json({"page": {"size": 0, "totalElements": 0, "totalPages": 0, "number": 0}})
+            return
+        self._send_json({
+            "_embedded": {"venues": [make_venue(keyword, f"KV{_digest(keyword)[:8]}")]},
+            "page": {"size": 5, "totalElements": 1, "totalPages": 1, "number": 0},
+        })
+
+    def _places(self, body: Dict[str, Any], field_mask: str):
+        recorded = self.server.recorded("places.json")
+        if recorded is not None:
+            self._send(200, recorded)
+            return
+        total = self.server.config.places_per_query
+        size = max(1, min(int(body.get("pageSize") or 20), 20))
+        offset = int(body.get("pageToken") or 0)
+        query_key = _digest(body.get("textQuery", ""), body.get("openNow", False))
+        places = [make_place(query_key, i) for i in range(offset, min(offset + size, total))]
+        fields = {f.split(".", 1)[1].split(".")[0] for f in field_mask.split(",") if f.startswith("places.")}
+        if fields:
+            places = [{k: v for k, v in p.items() if k in fields} for p in places]
+        data: Dict[str, Any] = {"places": places}
+        if offset + size < total:
+            data["nextPageToken"] = str(offset + size)
+        self._send_json(data)
+
+
+def serve(config: StubConfig, host: str = "127.0.0.1", port: int = 8765) -> StubServer:
+    """Start a stub server in the background and return it."""
+    return StubServer(config, host, port).start()
+
@@ -5,14 +5,18 @@ Free tier: 5000 calls/day, 5 calls/second.
 """
 
 import json
+import os
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
 from datetime import datetime, timedelta
-from typing import Any, Dict, List, Optional
+from typing import Any, Dict, Iterator, List, Optional, Tuple
 from urllib.parse import urlencode
 
-from . import http, cache
+from . import http, cache, event_cache, event_store, jsonstream, trace, venue_index
 from .env import get_config
 
-BASE_URL = "https://app.ticketmaster.com/discovery/v2"
+# Override to point at a stand-in server (see lib/stub_server.py)
+BASE_URL = os.environ.get("DATEKIT_TICKETMASTER_URL", "https://app.ticketmaster.com/discovery/v2").rstrip("/")
 
 
 def _get_api_key() -> Optional[str]:
@@ -20,6 +24,40 @@ def _get_api_key() -> Optional[str]:
     return config.get('TICKETMASTER_API_KEY')
 
 
+MAX_PAGE_SIZE = 200  # Largest page the Discovery API serves
+DEEP_PAGING_LIMIT = 1000  # Discovery API rejects page * size >= 1000
+
+
+def _event_params(
+    venue_id: Optional[str] = None,
+    keyword: Optional[str] = None,
+    classification_name: Optional[str] = None,
+    start_date: Optional[str] = None,
+    end_date: Optional[str] = None,
+    city: str = "",
+    state_code: str = "",
+    sort: str = "date,asc",
+) -> Dict[str, Any]:
+    """Build events.json query params (without apikey/size/page)."""
+    params: Dict[str, Any] = {"sort": sort}
+
+    if city:
+        params["city"] = city
+    if state_code:
+        params["stateCode"] = state_code
+    if venue_id:
+        params["venueId"] = venue_id
+    if keyword:
+        params["keyword"] = keyword
+    if classification_name:
+        params["classificationName"] = classification_name
+    if start_date:
+        params["startDateTime"] = f"{start_date}T00:00:00Z"
+    if end_date:
+        params["endDateTime"] = f"{end_date}T23:59:59Z"
+    return params
+
+
 def search_events(
     venue_id: Optional[str] = None,
     keyword: Optional[str] = None,
@@ -31,7 +69,11 @@ def search_events(
     size: int = 20,
     sort: str = "date,asc",
 ) -> Dict[str, Any]:
-    """Search Ticketmaster events.
+    """Search Ticketmaster events (first `size` events; see iter_events).
+
+    Date-windowed searches go through the range-aware event cache, so any
+    window inside an already-fetched one is answered locally and only
+    uncovered days are requested.
 
     Returns dict with 'events' list and 'total' count.
     """
@@ -39,6 +81,10 @@ def search_events(
     if not api_key:
         return {"error": "No TICKETMASTER_API_KEY configured. Add to ~/.config/datekit/.env", "events": []}
 
+    if start_date and end_date and sort == "date,asc":
+        return _search_events_range(venue_id, keyword, classification_name, start_date, end_date,
+                                    city, state_code, size)
+
     # Build cache key
     cache_key = cache.get_cache_key(
         f"tm-{venue_id}-{keyword}-{classification_name}-{city}",
@@ -46,42 +92,220 @@ def search_events(
         end_date or "",
         "ticketmaster"
     )
-    cached = cache.load_cache(cache_key, ttl_hours=6)
-    if cached:
-        return cached
 
     params = {
-        "apikey": api_key,
         "size": size,
-        "sort": sort,
+        **_event_params(venue_id, keyword, classification_name, start_date, end_date,
+                        city, state_code, sort),
     }
 
-    if city:
-        params["city"] = city
-    if state_code:
-        params["stateCode"] = state_code
-    if venue_id:
-        params["venueId"] = venue_id
-    if keyword:
-        params["keyword"] = keyword
-    if classification_name:
-        params["classificationName"] = classification_name
-    if start_date:
-        params["startDateTime"] = f"{start_date}T00:00:00Z"
-    if end_date:
-        params["endDateTime"] = f"{end_date}T23:59:59Z"
+    try:
+        return cache.cached_fetch(cache_key, lambda: _search(params),
+                                  refresh=cache.RefreshSpec(__name__, "_search", {"params": params}))
+    except http.HTTPError as e:
+        return {"error": str(e), "events": []}
+
+
+def _search(params: Dict[str, Any]) -> Dict[str, Any]:
+    """Fetch search_events' single page: {"events": [...], "total": int}."""
+    url = f"{BASE_URL}/events.json?{urlencode({'apikey': _get_api_key(), **params})}"
+    data, events = _get_events(url)
+    return {"events": events, "total": data.get("page", {}).get("totalElements", 0)}
+
+
+def _search_events_range(
+    venue_id: Optional[str],
+    keyword: Optional[str],
+    classification_name: Optional[str],
+    start_date: str,
+    end_date: str,
+    city: str,
+    state_code: str,
+    size: int,
+) -> Dict[str, Any]:
+    """search_events for a date window, backed by lib.event_cache."""
+    scope_key = cache.get_cache_key(
+        f"tm-range-{venue_id}-{keyword}-{classification_name}-{city}-{state_code}",
+        "", "",
+        "ticketmaster"
+    )
 
-    url = f"{BASE_URL}/events.json?{urlencode(params)}"
+    def fetch_range(gap_start: str, gap_end: str, max_events: Optional[int]):
+        # Whole pages until max_events are in hand (or the deep-paging cap);
+        # max_events=0 only wants totalElements, so ask for a single event
+        params = _event_params(venue_id, keyword, classification_name, gap_start, gap_end, city, state_code)
+        page_size = 1 if max_events == 0 else MAX_PAGE_SIZE
+        max_pages = (DEEP_PAGING_LIMIT - 1) // page_size + 1
+        found: List[Dict] = []
+        page = 0
+        while True:
+            data = _fetch_event_page(params, page, page_size, use_cache=False)
+            found.extend(data["events"])
+            page += 1
+            if (len(found) >= data["total"] or page >= min(data["total_pages"], max_pages)
+                    or (max_events is not None and len(found) >= max_events)):
+                return found, data["total"]
 
     try:
-        data = http.get(url)
-        events = _parse_events(data)
-        result = {"events": events, "total": data.get("page", {}).get("totalElements", 0)}
-        cache.save_cache(cache_key, result)
-        return result
+        result = event_cache.range_query(scope_key, start_date, end_date, fetch_range, limit=size)
     except http.HTTPError as e:
         return {"error": str(e), "events": []}
 
+    response = {"events": result["events"][:size], "total": result["total"]}
+    if result.get("stale"):
+        response["stale"] = True
+    return response
+
+
+def _fetch_event_page(params: Dict[str, Any], page: int, size: int,
+                      use_cache: bool = True) -> Dict[str, Any]:
+    """Fetch and parse one page of events.json, caching each page separately.
+
+    Returns {"events": [...], "total": int, "total_pages": int}.
+
+    Raises:
+        http.HTTPError: On request failure
+    """
+    api_key = _get_api_key()
+    if not api_key:
+        raise http.HTTPError("No TICKETMASTER_API_KEY configured. Add to ~/.config/datekit/.env")
+
+    query = "&".join(f"{k}={params[k]}" for k in sorted(params))
+    cache_key = cache.get_cache_key(f"tm-page-{query}", str(size), str(page), "ticketmaster")
+
+    if not use_cache:
+        return _event_page(params, page, size)
+    return cache.cached_fetch(
+        cache_key, lambda: _event_page(params, page, size),
+        refresh=cache.RefreshSpec(__name__, "_event_page", {"params": params, "page": page, "size": size}))
+
+
+def _event_page(params: Dict[str, Any], page: int, size: int) -> Dict[str, Any]:
+    """Fetch one page for _fetch_event_page (uncached)."""
+    url = f"{BASE_URL}/events.json?{urlencode({'apikey': _get_api_key(), 'size': size, 'page': page, **params})}"
+    data, events = _get_events(url)
+    page_info = data.get("page", {})
+    return {
+        "events": events,
+        "total": page_info.get("totalElements", 0),
+        "total_pages": page_info.get("totalPages", 0),
+    }
+
+
+class EventIterator:
+    """Lazily walks Ticketmaster result pages, yielding parsed events.
+
+    Pages are fetched only as iteration reaches them. With prefetch, the
+    next page is requested in a background thread while the caller works
+    through the current one. `total` is filled in once the first page
+    arrives.
+    """
+
+    def __init__(self, params: Dict[str, Any], page_size: int = 50,
+                 max_events: Optional[int] = None, prefetch: bool = False,
+                 use_cache: bool = True):
+        self.params = params
+        self.use_cache = use_cache
+        self.page_size = max(1, min(page_size, MAX_PAGE_SIZE))
+        self.max_events = max_events
+        self.prefetch = prefetch
+        self.total: Optional[int] = None
+        self._executor: Optional[ThreadPoolExecutor] = None
+
+    def _max_pages(self, total_pages: int) -> int:
+        return min(total_pages, (DEEP_PAGING_LIMIT - 1) // self.page_size + 1)
+
+    def _submit(self, page: int) -> Future:
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(max_workers=1)
+        return self._executor.submit(_fetch_event_page, self.params, page, self.page_size, self.use_cache)
+
+    def __iter__(self) -> Iterator[Dict]:
+        if self.max_events is not None and self.max_events <= 0:
+            return
+        yielded = 0
+        page = 0
+        next_page: Optional[Future] = None
+        try:
+            data = _fetch_event_page(self.params, page, self.page_size, self.use_cache)
+            self.total = data["total"]
+            last_page = self._max_pages(data["total_pages"]) - 1
+            while True:
+                remaining = None if self.max_events is None else self.max_events - yielded
+                more = page < last_page and (remaining is None or remaining > len(data["events"]))
+                if more and self.prefetch:
+                    next_page = self._submit(page + 1)
+
+                for event in data["events"]:
+                    yield event
+                    yielded += 1
+                    if self.max_events is not None and yielded >= self.max_events:
+                        return
+
+                if not more:
+                    return
+                page += 1
+                if next_page is not None:
+                    data, next_page = next_page.result(), None
+                else:
+                    data = _fetch_event_page(self.params, page, self.page_size, self.use_cache)
+        finally:
+            self.close()
+
+    def close(self):
+        """Stop any background prefetch."""
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+
+def iter_events(
+    venue_id: Optional[str] = None,
+    keyword: Optional[str] = None,
+    classification_name: Optional[str] = None,
+    start_date: Optional[str] = None,
+    end_date: Optional[str] = None,
+    city: str = "",
+    state_code: str = "",
+    sort: str = "date,asc",
+    page_size: int = 50,
+    max_events: Optional[int] = None,
+    prefetch: bool = False,
+    use_cache: bool = True,
+) -> EventIterator:
+    """Iterate over every matching event, page by page.
+
+    Unlike search_events, this follows page.totalPages (up to the API's
+    deep-paging limit of 1000 results) instead of stopping at one page.
+
+    Args:
+        page_size: Events per request (max 200)
+        max_events: Stop after this many events (None = all)
+        prefetch: Fetch the next page in the background while iterating
+        use_cache: Cache each page (callers with their own cache turn this off)
+
+    Raises (during iteration):
+        http.HTTPError: On missing API key or request failure
+    """
+    params = _event_params(venue_id, keyword, classification_name, start_date, end_date,
+                           city, state_code, sort)
+    return EventIterator(params, page_size=page_size, max_events=max_events, prefetch=prefetch,
+                         use_cache=use_cache)
+
+
+def collect_events(max_events: int, **filters) -> Dict[str, Any]:
+    """Gather up to max_events events across pages.
+
+    Takes the same filters as iter_events. Returns dict with 'events'
+    list and 'total' count, or 'error' string.
+    """
+    events = iter_events(max_events=max_events, page_size=min(max_events, MAX_PAGE_SIZE), **filters)
+    try:
+        result = list(events)
+    except http.HTTPError as e:
+        return {"error": str(e), "events": []}
+    return {"events": result, "total": events.total or 0}
+
 
 def get_venue_events(venue_id: str, days_ahead: int = 30) -> Dict[str, Any]:
     """Get upcoming events at a specific venue."""
@@ -101,12 +325,8 @@ def search_artist(artist_name: str, city: str = "", state_code: str = "") -> Dic
         "", "",
         "ticketmaster"
     )
-    cached = cache.load_cache(cache_key, ttl_hours=6)
-    if cached:
-        return cached
 
     params = {
-        "apikey": api_key,
         "keyword": artist_name,
         "size": 10,
         "sort": "date,asc",
@@ -117,23 +337,44 @@ def search_artist(artist_name: str, city: str = "", state_code: str = "") -> Dic
     if state_code:
         params["stateCode"] = state_code
 
-    url = f"{BASE_URL}/events.json?{urlencode(params)}"
-
     try:
-        data = http.get(url)
-        result = {"events": _parse_events(data)}
-        cache.save_cache(cache_key, result)
-        return result
+        return cache.cached_fetch(cache_key, lambda: _artist_events(params),
+                                  refresh=cache.RefreshSpec(__name__, "_artist_events", {"params": params}))
     except http.HTTPError as e:
         return {"error": str(e), "events": []}
 
 
-def search_venue_id(venue_name: str, state_code: str = "") -> Optional[str]:
-    """Search Ticketmaster for a venue and return its ID."""
+def _artist_events(params: Dict[str, Any]) -> Dict[str, Any]:
+    """Fetch search_artist's events (uncached)."""
+    url = f"{BASE_URL}/events.json?{urlencode({'apikey': _get_api_key(), **params})}"
+    return {"events": _get_events(url)[1]}
+
+
+VENUE_ID_TTL_HOURS = 24 * 30  # Venue IDs practically never change
+NOT_FOUND_TTL_HOURS = 24 * 7  # Re-check misses weekly in case the venue gets listed
+
+
+def lookup_venue_id(venue_name: str, state_code: str = "", use_cache: bool = True) -> Optional[str]:
+    """Search Ticketmaster for a venue and return its ID, or None if not found.
+
+    Results are cached, including "not found" (for NOT_FOUND_TTL_HOURS), so
+    bulk imports don't search for the same unlisted venue on every run.
+    Unlike search_venue_id, request failures raise http.HTTPError and are
+    not cached.
+    """
     api_key = _get_api_key()
     if not api_key:
         return None
 
+    cache_key = cache.get_cache_key(f"tm-venueid-{venue_name}-{state_code}", "", "", "ticketmaster")
+    if use_cache:
+        cached = cache.load_cache(cache_key, ttl_hours=VENUE_ID_TTL_HOURS)
+        if cached is not None:
+            if cached.get("id"):
+                return cached["id"]
+            if time.time() - cached.get("checked_at", 0) < NOT_FOUND_TTL_HOURS * 3600:
+                return None
+
     params = {
         "apikey": api_key,
         "keyword": venue_name,
@@ -145,36 +386,87 @@ def search_venue_id(venue_name: str, state_code: str = "") -> Optional[str]:
 
     url = f"{BASE_URL}/venues.json?{urlencode(params)}"
 
+    data = http.get(url)
+    venues = data.get("_embedded", {}).get("venues", [])
+    # Best name match; otherwise trust Ticketmaster's own relevance order
+    matches = venue_index.rank(venue_name, venues, slug=lambda v: "", limit=1)
+    venue_id = (matches[0]["venue"] if matches else venues[0])["id"] if venues else None
+
+    cache.save_cache(
+        cache_key,
+        {"id": venue_id, "checked_at": time.time()},
+        ttl_hours=VENUE_ID_TTL_HOURS if venue_id else NOT_FOUND_TTL_HOURS,
+    )
+    return venue_id
+
+
+def search_venue_id(venue_name: str, state_code: str = "") -> Optional[str]:
+    """Search Ticketmaster for a venue and return its ID."""
     try:
-        data = http.get(url)
-        venues = data.get("_embedded", {}).get("venues", [])
-        for v in venues:
-            if venue_name.lower() in v.get("name", "").lower():
-                return v["id"]
-        return venues[0]["id"] if venues else None
+        return lookup_venue_id(venue_name, state_code)
     except Exception:
         return None
 
 
+def _get_events(url: str) -> Tuple[Dict, List[Dict]]:
+    """GET an events.json URL and upsert its events into the local store.
+
+    Returns (the response minus its events, parsed events).
+    """
+    data, events, stored = http.get(url, parse=_parse_event_stream)
+    event_store.upsert_events(stored, events)
+    return data, events
+
+
+def _parse_event_stream(chunks: Iterator[bytes]) -> Tuple[Any, List[Dict], List[Dict]]:
+    """Decode an events.json body as it downloads (lib.http's parse hook).
+
+    Each event is projected to its parsed form, plus the few fields the
+    event store needs, as soon as it is complete, so memory tracks one
+    raw event rather than the page.
+
+    Returns (the response minus its events, parsed events, store views).
+    """
+    events: List[Dict] = []
+    stored: List[Dict] = []
+
+    def take(ev: Dict):
+        events.append(_parse_event(ev))
+        stored.append(event_store.slim(ev))
+
+    with trace.span("parse", stage="tm.stream") as span:
+        data = jsonstream.load(chunks, ("_embedded", "events"), take)
+        span["items"] = len(events)
+    return data, events, stored
+
+
 def _parse_events(data: Dict) -> List[Dict]:
     """Parse Ticketmaster API response into clean event dicts."""
     events = []
     embedded = data.get("_embedded", {})
-    for ev in embedded.get("events", []):
-        event = {
-            "name": ev.get("name"),
-            "date": ev.get("dates", {}).get("start", {}).get("localDate"),
-            "time": ev.get("dates", {}).get("start", {}).get("localTime"),
-            "venue": _extract_venue(ev),
-            "price_range": _extract_price(ev),
-            "url": ev.get("url"),
-            "genre": _extract_genre(ev),
-            "image": _extract_image(ev),
-        }
-        events.append(event)
+    with trace.span("parse", stage="tm.events") as span:
+        for ev in embedded.get("events", []):
+            events.append(_parse_event(ev))
+        span["items"] = len(events)
     return events
 
 
+def _parse_event(ev: Dict) -> Dict:
+    """Parse one Ticketmaster API event into a clean event dict."""
+    return {
+        "id": ev.get("id"),
+        "name": ev.get("name"),
+        "date": ev.get("dates", {}).get("start", {}).get("localDate"),
+        "time": ev.get("dates", {}).get("start", {}).get("localTime"),
+        "status": ev.get("dates", {}).get("status", {}).get("code"),
+        "venue": _extract_venue(ev),
+        "price_range": _extract_price(ev),
+        "url": ev.get("url"),
+        "genre": _extract_genre(ev),
+        "image": _extract_image(ev),
+    }
+
+
 def _extract_venue(ev: Dict) -> Dict:
     """Extract venue info from event."""
     venues = ev.get("_embedded", {}).get("venues", [])
@@ -0,0 +1,193 @@
+"""Spans and aggregate stats for HTTP, cache and parse stages.
+
+Off unless asked for, and a single check per call site when off:
+
+- DATEKIT_TRACE=path appends one JSON line per span to path. Lines are
+  written with single O_APPEND writes, so concurrent processes can share
+  one trace file.
+- The fetch scripts' --stats flag (stats()) also keeps the spans of that
+  run in memory and prints an aggregated summary to stderr at the end.
+  In the `datekit.py serve` daemon, runs that overlap see each other's
+  spans too.
+
+Span kinds and their fields:
+
+- http: one per attempt. method, host, status (or error), bytes, ms,
+  attempt (0-based), throttle (seconds waited for a rate-limit token) and
+  sleep (seconds of backoff / Retry-After before the next attempt).
+- cache: one per lookup. result (hit / stale / miss / fallback / expired),
+  key, provider, age_hours (of the entry found, if any), ms.
+- parse: one per stage. stage ("json", "tm.events", "tm.stream",
+  "gp.places"), items or bytes, ms. tm.stream decodes Ticketmaster event
+  pages while they download, so its ms includes transfer time.
+
+Stage hooks (add_hook) are told when each HTTP send and parse stage
+starts and ends; lib.profiling uses them for per-stage memory snapshots.
+"""
+
+import json
+import os
+import sys
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterator, List, Optional
+
+TRACE_PATH = os.environ.get("DATEKIT_TRACE") or None
+
+_lock = threading.Lock()
+_collectors: List[List[Dict[str, Any]]] = []
+_fd: Optional[int] = None
+# Called as hook(stage, entering) around stages; see stage()
+_hooks: List[Callable[[str, bool], None]] = []
+
+
+def active() -> bool:
+    """Whether spans are being recorded (check before building expensive fields)."""
+    return bool(TRACE_PATH or _collectors)
+
+
+def _write(span: Dict[str, Any]):
+    global _fd
+    line = (json.dumps(span, separators=(",", ":")) + "\n").encode()
+    try:
+        if _fd is None:
+            _fd = os.open(TRACE_PATH, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+        os.write(_fd, line)
+    except OSError:
+        pass  # Tracing must never break a fetch
+
+
+def record(kind: str, **fields):
+    """Record a finished span."""
+    if not (TRACE_PATH or _collectors):
+        return
+    span = {"ts": round(time.time(), 6), "kind": kind, **fields}
+    with _lock:
+        for collector in _collectors:
+            collector.append(span)
+        if TRACE_PATH:
+            _write({**span, "pid": os.getpid()})
+
+
+def add_hook(hook: Callable[[str, bool], None]):
+    """Call hook(stage, entering) as each stage starts (True) and ends (False)."""
+    _hooks.append(hook)
+
+
+def remove_hook(hook: Callable[[str, bool], None]):
+    if hook in _hooks:
+        _hooks.remove(hook)
+
+
+@contextmanager
+def stage(name: str) -> Iterator[None]:
+    """Mark a block as a stage for hooks only (no span is recorded)."""
+    if not _hooks:
+        yield
+        return
+    for hook in list(_hooks):
+        hook(name, True)
+    try:
+        yield
+    finally:
+        for hook in list(_hooks):
+            hook(name, False)
+
+
+@contextmanager
+def span(kind: str, **fields) -> Iterator[Dict[str, Any]]:
+    """Time a block as one span. Fields added to the yielded dict are recorded too.
+
+    Also a stage for hooks, named by its "stage" field (or kind).
+    """
+    if not (TRACE_PATH or _collectors or _hooks):
+        yield fields
+        return
+    started = time.perf_counter()
+    try:
+        with stage(fields.get("stage", kind)):
+            yield fields
+    finally:
+        if TRACE_PATH or _collectors:
+            record(kind, ms=round((time.perf_counter() - started) * 1000, 3), **fields)
+
+
+def _percentile(values: List[float], fraction: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * fraction))] if ordered else 0.0
+
+
+def summary(spans: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """Aggregate spans per HTTP host, cache provider and parse stage."""
+    hosts: Dict[str, Dict[str, Any]] = {}
+    latencies: Dict[str, List[float]] = {}
+    caches: Dict[str, Dict[str, Any]] = {}
+    stages: Dict[str, Dict[str, Any]] = {}
+
+    for s in spans:
+        if s["kind"] == "http":
+            h = hosts.setdefault(s.get("host", ""), {
+                "attempts": 0, "retries": 0, "errors": 0, "statuses": {}, "bytes": 0,
+                "throttle_s": 0.0, "sleep_s": 0.0,
+            })
+            h["attempts"] += 1
+            h["retries"] += 1 if s.get("attempt") else 0
+            if s.get("error"):
+                h["errors"] += 1
+            else:
+                status = str(s.get("status"))
+                h["statuses"][status] = h["statuses"].get(status, 0) + 1
+            h["bytes"] += s.get("bytes", 0)
+            h["throttle_s"] += s.get("throttle", 0.0)
+            h["sleep_s"] += s.get("sleep", 0.0)
+            latencies.setdefault(s.get("host", ""), []).append(s.get("ms", 0.0))
+        elif s["kind"] == "cache":
+            c = caches.setdefault(s.get("provider", ""), {"lookups": 0, "ms": 0.0})
+            c["lookups"] += 1
+            c[s.get("result", "")] = c.get(s.get("result", ""), 0) + 1
+            c["ms"] += s.get("ms", 0.0)
+        elif s["kind"] == "parse":
+            p = stages.setdefault(s.get("stage", ""), {"count": 0, "items": 0, "bytes": 0, "ms": 0.0, "max_ms": 0.0})
+            p["count"] += 1
+            p["items"] += s.get("items", 0)
+            p["bytes"] += s.get("bytes", 0)
+            p["ms"] += s.get("ms", 0.0)
+            p["max_ms"] = max(p["max_ms"], s.get("ms", 0.0))
+
+    for host, h in hosts.items():
+        ms = latencies[host]
+        h.update({
+            "ms_total": round(sum(ms), 1),
+            "ms_p50": round(_percentile(ms, 0.5), 1),
+            "ms_p95": round(_percentile(ms, 0.95), 1),
+            "ms_max": round(max(ms), 1),
+            "throttle_s": round(h["throttle_s"], 3),
+            "sleep_s": round(h["sleep_s"], 3),
+        })
+    for c in caches.values():
+        c["ms"] = round(c["ms"], 1)
+    for p in stages.values():
+        p["ms"] = round(p["ms"], 1)
+        p["max_ms"] = round(p["max_ms"], 1)
+    return {"http": hosts, "cache": caches, "parse": stages}
+
+
+@contextmanager
+def stats(enabled: bool = True) -> Iterator[None]:
+    """Collect this block's spans and print summary() to stderr when it ends (--stats)."""
+    if not enabled:
+        yield
+        return
+    collector: List[Dict[str, Any]] = []
+    started = time.monotonic()
+    with _lock:
+        _collectors.append(collector)
+    try:
+        yield
+    finally:
+        with _lock:
+            _collectors.remove(collector)
+        result = summary(collector)
+        result["wall_s"] = round(time.monotonic() - started, 3)
+        print(json.dumps({"stats": result}, indent=2), file=sys.stderr)
@@ -0,0 +1,243 @@
+"""Persisted venue lookup index for date-planner.
+
+venues.json is indexed into a SQLite sidecar under ~/.cache/datekit: a
+slug table (the hash map: primary-key lookups) plus a character trigram
+table for typo-tolerant name matching. Lookups then read only the rows
+they need instead of parsing and scanning the whole venue database.
+
+The sidecar records venues.json's mtime, size and SHA-256 and is rebuilt
+only when the file actually changed.
+"""
+
+import hashlib
+import json
+import re
+import threading
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+try:
+    import sqlite3
+except ImportError:  # Python built without sqlite: index in memory
+    sqlite3 = None
+
+from .cache import CACHE_DIR
+
+INDEX_DIR = CACHE_DIR / "venue-index"
+NGRAM = 3
+MIN_SCORE = 0.3  # Below this a candidate is noise, not a typo
+FUZZY_CANDIDATES = 50  # Trigram prefilter size before exact scoring
+
+SCHEMA = """
+    CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT);
+    CREATE TABLE IF NOT EXISTS venues (
+        slug TEXT PRIMARY KEY,
+        norm TEXT NOT NULL,
+        data TEXT NOT NULL
+    );
+    CREATE TABLE IF NOT EXISTS grams (
+        gram TEXT NOT NULL,
+        slug TEXT NOT NULL,
+        PRIMARY KEY (gram, slug)
+    ) WITHOUT ROWID;
+"""
+
+
+def normalize(text: str) -> str:
+    """Lowercase, turn punctuation and dashes into spaces, collapse runs."""
+    return " ".join(re.sub(r"[^a-z0-9]+", " ", (text or "").lower()).split())
+
+
+def ngrams(text: str, n: int = NGRAM) -> set:
+    """Character n-grams of normalized text, padded so word edges count."""
+    padded = f" {normalize(text)} "
+    if len(padded) <= n:
+        return {padded}
+    return {padded[i:i + n] for i in range(len(padded) - n + 1)}
+
+
+def score(query: str, slug: str, name: str) -> Tuple[float, str]:
+    """Score how well query matches a venue. Returns (score 0-1, match kind).
+
+    Exact slug beats exact name beats substring beats trigram similarity,
+    so ranking keeps the old exact-then-partial behavior and only falls
+    back to fuzzy matching for typos.
+    """
+    q = normalize(query)
+    if not q:
+        return 0.0, "none"
+    if query.lower() == (slug or "").lower():
+        return 1.0, "slug"
+    norm_name = normalize(name)
+    if q == norm_name:
+        return 0.95, "name"
+    for target in (norm_name, normalize(slug)):
+        if target and q in target:
+            return 0.8 + 0.1 * len(q) / len(target), "partial"
+    q_grams = ngrams(q)
+    n_grams = ngrams(norm_name)
+    shared = len(q_grams & n_grams)
+    return 0.8 * 2 * shared / (len(q_grams) + len(n_grams)), "fuzzy"
+
+
+def rank(
+    query: str,
+    items: Iterable[Dict],
+    name: Callable[[Dict], str] = lambda item: item.get("name", ""),
+    slug: Callable[[Dict], str] = lambda item: item.get("slug", ""),
+    limit: int = 5,
+    min_score: float = MIN_SCORE,
+) -> List[Dict[str, Any]]:
+    """Rank arbitrary dicts against query (no index; scores every item).
+
+    Returns [{"venue": item, "score": float, "match": kind}] best first.
+    """
+    scored = []
+    for item in items:
+        value, kind = score(query, slug(item), name(item))
+        if value >= min_score:
+            scored.append({"venue": item, "score": round(value, 3), "match": kind})
+    scored.sort(key=lambda c: -c["score"])
+    return scored[:limit]
+
+
+def _read_venues(venues_file: Path) -> List[Dict]:
+    with open(venues_file) as f:
+        data = json.load(f)
+    return data if isinstance(data, list) else data.get("venues", [])
+
+
+class VenueIndex:
+    """Slug and fuzzy-name lookups over one venues.json file."""
+
+    def __init__(self, venues_file: Path, index_path: Optional[Path] = None):
+        self.venues_file = Path(venues_file)
+        if index_path is None:
+            digest = hashlib.sha1(str(self.venues_file.resolve()).encode()).hexdigest()[:12]
+            index_path = INDEX_DIR / f"{digest}.db"
+        self.index_path = index_path
+        self._local = threading.local()
+        self._memory: Optional[List[Dict]] = None
+        self._stamp: Optional[str] = None
+        self._refresh()
+
+    def _conn(self) -> "sqlite3.Connection":
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            self.index_path.parent.mkdir(parents=True, exist_ok=True)
+            conn = sqlite3.connect(str(self.index_path), timeout=10, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.executescript(SCHEMA)
+            self._local.conn = conn
+        return conn
+
+    def _refresh(self):
+        """Rebuild the sidecar if venues.json changed since it was built."""
+        try:
+            st = self.venues_file.stat()
+        except OSError:
+            self._memory, self._stamp = [], None  # No venue database yet
+            return
+        stamp = f"{st.st_mtime_ns}:{st.st_size}"
+        if stamp == self._stamp:
+            return
+
+        if sqlite3 is None:
+            self._memory = _read_venues(self.venues_file)
+            self._stamp = stamp
+            return
+
+        try:
+            conn = self._conn()
+            meta = dict(conn.execute("SELECT key, value FROM meta").fetchall())
+            if meta.get("stamp") != stamp:
+                # mtime moved: only rebuild if the content did too
+                raw = self.venues_file.read_bytes()
+                digest = hashlib.sha256(raw).hexdigest()
+                if meta.get("sha256") != digest:
+                    self._rebuild(conn, json.loads(raw), digest)
+                conn.execute("INSERT OR REPLACE INTO meta VALUES ('stamp', ?)", (stamp,))
+            self._memory = None
+        except sqlite3.Error:
+            self._memory = _read_venues(self.venues_file)
+        self._stamp = stamp
+
+    def _rebuild(self, conn: "sqlite3.Connection", data: Any, digest: str):
+        venues = data if isinstance(data, list) else data.get("venues", [])
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            conn.execute("DELETE FROM venues")
+            conn.execute("DELETE FROM grams")
+            for v in venues:
+                slug = v.get("slug")
+                if not slug:
+                    continue
+                conn.execute(
+                    "INSERT OR REPLACE INTO venues (slug, norm, data) VALUES (?, ?, ?)",
+                    (slug, normalize(v.get("name", "")), json.dumps(v)),
+                )
+                conn.executemany(
+                    "INSERT OR IGNORE INTO grams VALUES (?, ?)",
+                    [(g, slug) for g in ngrams(v.get("name", ""))],
+                )
+            conn.execute("INSERT OR REPLACE INTO meta VALUES ('sha256', ?)", (digest,))
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+
+    def get(self, slug: str) -> Optional[Dict]:
+        """Return the venue with exactly this slug, or None."""
+        if self._memory is not None:
+            return next((v for v in self._memory if v.get("slug") == slug), None)
+        row = self._conn().execute("SELECT data FROM venues WHERE slug = ?", (slug,)).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def lookup(self, query: str, limit: int = 5, min_score: float = MIN_SCORE) -> List[Dict[str, Any]]:
+        """Rank venues matching a slug, name fragment or misspelled name.
+
+        Returns [{"venue": dict, "score": float, "match": "slug"|"name"|"partial"|"fuzzy"}]
+        best first, at most limit entries.
+        """
+        if self._memory is not None:
+            return rank(query, self._memory, limit=limit, min_score=min_score)
+
+        exact = self.get(query)
+        if exact:
+            return [{"venue": exact, "score": 1.0, "match": "slug"}]
+
+        q = normalize(query)
+        if not q:
+            return []
+        conn = self._conn()
+        grams = sorted(ngrams(q))
+        placeholders = ",".join("?" * len(grams))
+        rows = conn.execute(
+            "SELECT data FROM venues WHERE norm LIKE ? OR slug LIKE ? "
+            f"UNION SELECT data FROM venues WHERE slug IN ("
+            f"  SELECT slug FROM grams WHERE gram IN ({placeholders})"
+            f"  GROUP BY slug ORDER BY COUNT(*) DESC LIMIT ?)",
+            [f"%{q}%", f"%{q.replace(' ', '-')}%", *grams, FUZZY_CANDIDATES],
+        ).fetchall()
+        return rank(query, (json.loads(r[0]) for r in rows), limit=limit, min_score=min_score)
+
+    def find(self, query: str) -> Optional[Dict]:
+        """Best single match for query, or None."""
+        matches = self.lookup(query, limit=1)
+        return matches[0]["venue"] if matches else None
+
+
+_indexes: Dict[Path, VenueIndex] = {}
+_indexes_lock = threading.Lock()
+
+
+def open_index(venues_file: Path) -> VenueIndex:
+    """Return the (per-process shared) index for venues_file, refreshed if the file changed."""
+    venues_file = Path(venues_file)
+    with _indexes_lock:
+        index = _indexes.get(venues_file)
+        if index is None:
+            index = _indexes[venues_file] = VenueIndex(venues_file)
+        else:
+            index._refresh()
+        return index
@@ -0,0 +1,106 @@
+"""Seen-event state for incremental venue/artist watching.
+
+For each watched venue or artist the state keeps a compact snapshot of
+every event seen on the last check, keyed by Ticketmaster event id.
+diff_events() compares a fresh result against that snapshot and reports
+only what is new, changed (time or price) or cancelled.
+"""
+
+import json
+import os
+from datetime import date, datetime
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+# Fields whose change is worth reporting
+TRACKED_FIELDS = ("date", "time", "price_range", "status")
+CANCELLED_STATUSES = ("cancelled", "canceled")
+
+
+def load_state(path: Path) -> Dict[str, Any]:
+    """Load watch state, or an empty state if missing or unreadable."""
+    try:
+        with open(path) as f:
+            data = json.load(f)
+    except (json.JSONDecodeError, OSError):
+        data = {}
+    data.setdefault("venues", {})
+    data.setdefault("artists", {})
+    return data
+
+
+def save_state(path: Path, state: Dict[str, Any]):
+    """Write watch state atomically."""
+    tmp = path.with_name(f".{path.name}.{os.getpid()}.tmp")
+    with open(tmp, "w") as f:
+        json.dump(state, f, indent=2)
+    os.replace(tmp, path)
+
+
+def _snapshot(event: Dict) -> Dict:
+    snap = {"name": event.get("name"), "url": event.get("url")}
+    for field in TRACKED_FIELDS:
+        snap[field] = event.get(field)
+    return snap
+
+
+def diff_events(
+    previous: Optional[Dict[str, Any]],
+    events: List[Dict],
+    complete: bool = True,
+    window_end: Optional[str] = None,
+) -> Tuple[Dict[str, List], Dict[str, Any]]:
+    """Compare fresh events against the previous snapshot.
+
+    Args:
+        previous: Snapshot from the last check ({"events": {id: snap}}) or None
+        events: Parsed events from this check (must carry "id")
+        complete: Whether events is the full result; if not, events missing
+            from it are not reported as cancelled
+        window_end: Last date (YYYY-MM-DD) the query covered; seen events
+            after it are carried over rather than reported as cancelled
+
+    Returns:
+        (changes, snapshot): changes has "new", "changed" and "cancelled"
+        lists; snapshot is the state to store for the next check.
+    """
+    seen = (previous or {}).get("events", {})
+    today = date.today().isoformat()
+    current: Dict[str, Dict] = {}
+    changes: Dict[str, List] = {"new": [], "changed": [], "cancelled": []}
+
+    for event in events:
+        event_id = event.get("id")
+        if not event_id:
+            continue
+        snap = _snapshot(event)
+        current[event_id] = snap
+        old = seen.get(event_id)
+        if (event.get("status") or "").lower() in CANCELLED_STATUSES:
+            if not old or (old.get("status") or "").lower() not in CANCELLED_STATUSES:
+                changes["cancelled"].append(event)
+        elif old is None:
+            changes["new"].append(event)
+        else:
+            diffs = {
+                field: {"was": old.get(field), "now": snap[field]}
+                for field in TRACKED_FIELDS
+                if field != "status" and old.get(field) != snap[field]
+            }
+            if diffs:
+                changes["changed"].append({"event": event, "changes": diffs})
+
+    for event_id, old in seen.items():
+        if event_id in current:
+            continue
+        event_date = old.get("date") or ""
+        if event_date and event_date < today:
+            continue  # Already happened: drop silently
+        if not complete or (window_end and event_date > window_end):
+            current[event_id] = old  # Outside what we looked at: keep tracking
+            continue
+        if (old.get("status") or "").lower() not in CANCELLED_STATUSES:
+            changes["cancelled"].append({"id": event_id, **old})
+
+    snapshot = {"checked_at": datetime.now().isoformat(timespec="seconds"), "events": current}
+    return changes, snapshot
@@ -0,0 +1,163 @@
+#!/usr/bin/env python3
+"""Fetch everything for one date plan in a single, deadline-bounded pass.
+
+Runs every Ticketmaster category, watched venue/artist and Places
+cuisine search concurrently (see lib/plan_engine.py) and returns whatever
+is ready when the deadline hits. Replaces running fetch_events.py,
+fetch_classes.py and Places lookups one after another.
+
+Usage:
+    python3 plan_fetch.py --days 3 --category music --category comedy --cuisine Thai --cuisine ramen
+    python3 plan_fetch.py --days 7 --watchlist --cuisine tapas --neighborhood "Silver Lake" --deadline 10
+    python3 plan_fetch.py --days 2 --venue the-echoplex --class-category pottery
+    python3 plan_fetch.py --request plan.json        # same options as a JSON object
+"""
+
+import argparse
+import json
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent))
+from fetch_events import ALL_CATEGORIES, fetch_by_artist, fetch_by_category, fetch_by_venue, load_watchlist
+from lib import cache, trace
+from lib.env import get_city
+from lib.google_places import merge_searches, search_label, search_restaurants
+from lib.plan_engine import DEFAULT_DEADLINE, Job, run_plan
+from lib.scrapers import class_search_queries
+
+CLASS_CATEGORIES = ["martial-arts", "cooking", "pottery", "art", "general"]
+
+
+def build_jobs(plan: dict) -> list:
+    """Turn a plan request into engine jobs.
+
+    plan keys: city, state, days, categories, venues, artists, watchlist
+    (bool), cuisines, neighborhoods, class_categories, max_places.
+    """
+    city = plan.get("city", "")
+    state_code = plan.get("state", "")
+    days = plan.get("days", 7)
+    jobs = []
+
+    for category in plan.get("categories", []):
+        jobs.append(Job(f"events:{category}", "ticketmaster",
+                        lambda c=category: fetch_by_category(c, days, city=city, state_code=state_code)))
+
+    venues = list(plan.get("venues", []))
+    artists = list(plan.get("artists", []))
+    if plan.get("watchlist"):
+        watchlist = load_watchlist()
+        for entry in watchlist["watched_venues"]:
+            slug = entry.get("slug") if isinstance(entry, dict) else entry
+            if slug and slug not in venues:
+                venues.append(slug)
+        for entry in watchlist["watched_artists"]:
+            name = entry.get("name") if isinstance(entry, dict) else entry
+            if name and name not in artists:
+                artists.append(name)
+    for slug in venues:
+        jobs.append(Job(f"venue:{slug}", "ticketmaster", lambda s=slug: fetch_by_venue(s, days)))
+    for name in artists:
+        jobs.append(Job(f"artist:{name}", "ticketmaster",
+                        lambda n=name: fetch_by_artist(n, city=city, state_code=state_code)))
+
+    neighborhoods = plan.get("neighborhoods") or [None]
+    max_places = plan.get("max_places", 10)
+    for cuisine in plan.get("cuisines", []):
+        for hood in neighborhoods:
+            jobs.append(Job(f"places:{search_label(cuisine, hood)}", "google_places",
+                            lambda q=cuisine, n=hood: search_restaurants(q, city=city, neighborhood=n,
+                                                                         max_results=max_places)))
+
+    for category in plan.get("class_categories", []):
+        jobs.append(Job(f"classes:{category}", "local",
+                        lambda c=category: {"search_queries": class_search_queries(c, city)}))
+
+    return jobs
+
+
+def assemble(plan_result: dict) -> dict:
+    """Group engine results by kind: events, venues, artists, restaurants, classes."""
+    output = {"events": {}, "venues": {}, "artists": {}, "restaurants": {}, "classes": {}}
+    places = {}
+    for key, result in plan_result["results"].items():
+        kind, _, name = key.partition(":")
+        if kind == "places":
+            places[name] = result
+        else:
+            section = {"events": "events", "venue": "venues", "artist": "artists", "classes": "classes"}[kind]
+            output[section][name] = result
+    if places:
+        output["restaurants"] = merge_searches(places)
+    output["timed_out"] = plan_result["timed_out"]
+    output["elapsed"] = plan_result["elapsed"]
+    return output
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Fetch all data for a date plan concurrently")
+    parser.add_argument("--request", help="JSON file with the plan request ('-' for stdin)")
+    parser.add_argument("--city", help="City (default: from preferences.json)")
+    parser.add_argument("--state", help="State code (e.g., CA, NY)")
+    parser.add_argument("--days", type=int, help="Days ahead to search (default: 7)")
+    parser.add_argument("--category", action="append", choices=ALL_CATEGORIES + ["all"],
+                        help="Ticketmaster event category (repeatable)")
+    parser.add_argument("--venue", action="append", help="Venue slug (repeatable)")
+    parser.add_argument("--artist", action="append", help="Artist name (repeatable)")
+    parser.add_argument("--watchlist", action="store_true", help="Include every watched venue and artist")
+    parser.add_argument("--cuisine", action="append", help="Places restaurant search (repeatable)")
+    parser.add_argument("--neighborhood", action="append",
+                        help="Neighborhood for cuisine searches (repeatable)")
+    parser.add_argument("--max-places", type=int, help="Max places per cuisine search (default: 10)")
+    parser.add_argument("--class-category", action="append", choices=CLASS_CATEGORIES,
+                        help="Class search queries to include (repeatable)")
+    parser.add_argument("--deadline", type=float, default=DEFAULT_DEADLINE,
+                        help=f"Seconds before returning partial results (default: {DEFAULT_DEADLINE:g})")
+    parser.add_argument("--format", choices=["json", "compact"], default="compact",
+                        help="Output format (default: compact)")
+    parser.add_argument("--stats", action="store_true",
+                        help="Print HTTP, cache and parse timings to stderr when done")
+    args = parser.parse_args()
+
+    plan = {}
+    if args.request:
+        with (sys.stdin if args.request == "-" else open(args.request)) as f:
+            plan = json.load(f)
+    flags = {
+        "city": args.city,
+        "state": args.state,
+        "days": args.days,
+        "categories": args.category,
+        "venues": args.venue,
+        "artists": args.artist,
+        "watchlist": args.watchlist or None,
+        "cuisines": args.cuisine,
+        "neighborhoods": args.neighborhood,
+        "max_places": args.max_places,
+        "class_categories": args.class_category,
+    }
+    plan.update({k: v for k, v in flags.items() if v is not None})
+    plan.setdefault("city", get_city() or "")
+    if "all" in plan.get("categories", []):
+        plan["categories"] = ALL_CATEGORIES
+
+    jobs = build_jobs(plan)
+    if not jobs:
+        parser.error("Nothing to fetch: give --category, --venue, --artist, --watchlist, --cuisine "
+                     "or --class-category (or a --request file)")
+
+    # Refresh soft-expired cache entries in a detached child, not in this run
+    cache.set_revalidate_mode("process")
+
+    with trace.stats(args.stats):
+        output = assemble(run_plan(jobs, deadline=args.deadline))
+
+        if args.format == "json":
+            print(json.dumps(output, indent=2))
+        else:
+            print(json.dumps(output, separators=(',', ':')))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,150 @@
+#!/usr/bin/env python3
+"""Summarize a --profile run, or compare two.
+
+Takes the files the fetch scripts write with --profile (see
+lib/profiling.py): .cpu.prof (cProfile) or .mem.json (tracemalloc).
+Both files in a comparison must be the same kind. Prints JSON.
+
+Usage:
+    python3 profile_summary.py ~/.cache/datekit/profiles/fetch_events-...cpu.prof
+    python3 profile_summary.py before.cpu.prof after.cpu.prof --sort cumtime
+    python3 profile_summary.py before.mem.json after.mem.json
+"""
+
+import argparse
+import json
+import pstats
+import sys
+from pathlib import Path
+from typing import Any, Dict, Optional
+
+sys.path.insert(0, str(Path(__file__).parent))
+from lib.profiling import short_path
+
+SORT_KEYS = ("tottime", "cumtime", "calls")
+
+
+def _is_cpu(path: str) -> bool:
+    return path.endswith(".prof")
+
+
+def cpu_functions(path: str) -> Dict[str, Dict[str, Any]]:
+    """Per-function calls / tottime / cumtime from a pstats file."""
+    stats = pstats.Stats(path)
+    functions = {}
+    for (filename, line, name), (_, calls, tottime, cumtime, _) in stats.stats.items():
+        label = f"{short_path(filename)}:{line}({name})" if line else name
+        functions[label] = {"calls": calls, "tottime": tottime, "cumtime": cumtime}
+    return functions
+
+
+def _rounded(entry: Dict[str, Any]) -> Dict[str, Any]:
+    return {k: round(v, 4) if isinstance(v, float) else v for k, v in entry.items()}
+
+
+def summarize_cpu(path: str, sort: str, limit: int) -> Dict[str, Any]:
+    functions = cpu_functions(path)
+    top = sorted(functions.items(), key=lambda item: item[1][sort], reverse=True)[:limit]
+    return {
+        "file": path,
+        "total_s": round(sum(f["tottime"] for f in functions.values()), 4),
+        "functions": len(functions),
+        "top": [{"function": label, **_rounded(entry)} for label, entry in top],
+    }
+
+
+def compare_cpu(before: str, after: str, sort: str, limit: int) -> Dict[str, Any]:
+    """Functions whose sort metric moved the most (positive delta = slower / more calls)."""
+    old, new = cpu_functions(before), cpu_functions(after)
+    empty = {"calls": 0, "tottime": 0.0, "cumtime": 0.0}
+    rows = []
+    for label in old.keys() | new.keys():
+        a, b = old.get(label, empty), new.get(label, empty)
+        rows.append({
+            "function": label,
+            "before": a[sort] if isinstance(a[sort], int) else round(a[sort], 4),
+            "after": b[sort] if isinstance(b[sort], int) else round(b[sort], 4),
+            "delta": round(b[sort] - a[sort], 4),
+        })
+    rows.sort(key=lambda row: abs(row["delta"]), reverse=True)
+    total_before = sum(f["tottime"] for f in old.values())
+    total_after = sum(f["tottime"] for f in new.values())
+    return {
+        "before": before,
+        "after": after,
+        "sort": sort,
+        "total_s": {"before": round(total_before, 4), "after": round(total_after, 4),
+                    "change_pct": _change_pct(total_before, total_after)},
+        "top": rows[:limit],
+    }
+
+
+def _change_pct(before: float, after: float) -> Optional[float]:
+    return round((after - before) / before * 100, 1) if before else None
+
+
+def summarize_mem(path: str, limit: int) -> Dict[str, Any]:
+    with open(path) as f:
+        report = json.load(f)
+    report["top"] = report.get("top", [])[:limit]
+    for stage in report.get("stages", {}).values():
+        stage["top"] = stage.get("top", [])[:limit]
+    return {"file": path, **report}
+
+
+def compare_mem(before: str, after: str, limit: int) -> Dict[str, Any]:
+    """Run-wide and per-stage peak / retained KB, before vs after."""
+    with open(before) as f, open(after) as g:
+        old, new = json.load(f), json.load(g)
+
+    def delta(a: Dict[str, Any], b: Dict[str, Any], key: str) -> Dict[str, Any]:
+        x, y = a.get(key, 0), b.get(key, 0)
+        return {"before": x, "after": y, "delta": round(y - x, 1), "change_pct": _change_pct(x, y)}
+
+    stages = {}
+    for name in sorted(old.get("stages", {}).keys() | new.get("stages", {}).keys()):
+        a, b = old.get("stages", {}).get(name, {}), new.get("stages", {}).get(name, {})
+        stages[name] = {
+            "count": {"before": a.get("count", 0), "after": b.get("count", 0)},
+            "peak_kb_max": delta(a, b, "peak_kb_max"),
+            "retained_kb_total": delta(a, b, "retained_kb_total"),
+        }
+    return {
+        "before": before,
+        "after": after,
+        "peak_kb": delta(old, new, "peak_kb"),
+        "retained_kb": delta(old, new, "retained_kb"),
+        "stages": stages,
+        "top_after": new.get("top", [])[:limit],
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Summarize or compare --profile output")
+    parser.add_argument("files", nargs="+", metavar="FILE", help="One profile to summarize, or two to compare")
+    parser.add_argument("--sort", choices=SORT_KEYS, default="tottime",
+                        help="CPU profiles: rank functions by this (default: tottime)")
+    parser.add_argument("--limit", type=int, default=20, help="Rows to show (default: 20)")
+    args = parser.parse_args()
+
+    if len(args.files) > 2:
+        parser.error("give one profile to summarize or two to compare")
+    if len(args.files) == 2 and _is_cpu(args.files[0]) != _is_cpu(args.files[1]):
+        parser.error("can't compare a CPU profile with a memory profile")
+    for path in args.files:
+        if not Path(path).is_file():
+            parser.error(f"no such file: {path}")
+
+    if len(args.files) == 1:
+        path = args.files[0]
+        result = summarize_cpu(path, args.sort, args.limit) if _is_cpu(path) else summarize_mem(path, args.limit)
+    elif _is_cpu(args.files[0]):
+        result = compare_cpu(*args.files, args.sort, args.limit)
+    else:
+        result = compare_mem(*args.files, args.limit)
+
+    print(json.dumps(result, indent=2))
+
+
+if __name__ == "__main__":
+    main()